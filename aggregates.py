@@ -0,0 +1,65 @@
+"""
+Incrementally maintained dashboard aggregates.
+
+RecentRecords keeps the newest records of a collection (by a sortable field
+such as created_date) in a bounded min-heap, so "recent patients" costs
+O(size) per page view instead of sorting every patient.  Counts such as
+active treatments or today's appointments come from the FieldIndex
+buckets, which already hold one entry per record per value.
+"""
+
+import heapq
+import threading
+
+
+class RecentRecords:
+    """The newest records by one field, maintained with the FieldIndex protocol"""
+
+    def __init__(self, field, size=5, slack=4):
+        self.field = field
+        self.size = size
+        self.capacity = size * slack  # spare entries absorb deletions
+        self._heap = []  # min-heap of (value, record_id); smallest is evicted first
+        self._values = {}  # record_id -> value for records in the heap
+        self._stale = False  # deletions left fewer than size entries
+        self._lock = threading.Lock()
+
+    def add(self, record_id, record):
+        value = getattr(record, self.field, '') or ''
+        if record_id in self._values:
+            if self._values[record_id] == value:
+                return
+            self.remove(record_id)
+        if len(self._heap) < self.capacity:
+            heapq.heappush(self._heap, (value, record_id))
+            self._values[record_id] = value
+        elif (value, record_id) > self._heap[0]:
+            _, evicted = heapq.heapreplace(self._heap, (value, record_id))
+            del self._values[evicted]
+            self._values[record_id] = value
+
+    def remove(self, record_id):
+        value = self._values.pop(record_id, None)
+        if value is None:
+            return
+        self._heap.remove((value, record_id))
+        heapq.heapify(self._heap)
+        if len(self._heap) < self.size:
+            # Records older than the evicted ones may now belong in the top
+            self._stale = True
+
+    def rebuild(self, records):
+        newest = heapq.nlargest(self.capacity,
+                                ((getattr(r, self.field, '') or '', rid) for rid, r in records.items()))
+        self._heap = list(newest)
+        heapq.heapify(self._heap)
+        self._values = {rid: value for value, rid in newest}
+        self._stale = False
+
+    def newest(self, records):
+        """Return up to size records, newest first"""
+        with self._lock:
+            if self._stale:
+                self.rebuild(records)
+            top = heapq.nlargest(self.size, self._heap)
+        return [records[rid] for _, rid in top if rid in records]
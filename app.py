@@ -1,7 +1,20 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for
-import json
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from availability import MAX_SEARCH_DAYS, IntervalIndex, check_date, check_duration, check_time
+from columnar import AppointmentColumns
+from concurrency import FileLock, RWLock
+import metrics
+from metrics import timed_section
+from page_cache import PageCache, cached_page
+from search_index import PatientSearchIndex
+from snapshots import FragmentCache, load_newest, read_json_object, write_atomic
+from write_behind import WriteBehind, durable_requested, install_signal_handlers, write_delay
 
 app = Flask(__name__)
 
@@ -77,34 +90,144 @@ class Appointment:
         }
 
 class SchedulerData:
-    def __init__(self):
+    def __init__(self, data_file='np_scheduler_data.json', write_delay=None):
+        self.data_file = data_file
         self.patients = {}
         self.appointments = {}
         self.next_patient_id = 1
         self.next_apt_id = 1
+        self.slots = IntervalIndex(provider_field=None, duration_field='duration')
+        self.columns = AppointmentColumns(provider_field=None, duration_field='duration')
+        self.search = PatientSearchIndex(('name', 'email'), ('phone',), sort_key=lambda p: p.name)
+        # Encoded records for saves; handlers invalidate what they change
+        self.fragments = FragmentCache()
+        # Readers hold lock.read() while iterating.  Mutations go through
+        # transaction(), which also holds the inter-process file lock so
+        # several worker processes can share the data file.
+        self.lock = RWLock()
+        self._save_lock = threading.Lock()
+        self._file_lock = FileLock(os.path.splitext(data_file)[0] + '.lock')
+        self._stamp = None  # (inode, mtime, size) of the file we last loaded
+        # Bumped by every mutation and reload; cached pages from an older
+        # generation are stale
+        self.generation = 0
+        self.modified = time.time()
+        # With a write_delay, saves are left to a background thread; until
+        # it has written them this process keeps the file lock (_held), so
+        # other processes cannot read stale data or hand out the same ids
+        self._held = None
+        self._writer = WriteBehind(self.flush, write_delay) if write_delay else None
         self.load_data()
     
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.data_file)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    
+    def refresh(self):
+        """Reload the data file if another process has saved since we read it"""
+        if self._file_stamp() == self._stamp:
+            return
+        with self._file_lock.hold():
+            if self._file_stamp() != self._stamp:
+                self.load_data()
+    
+    @contextmanager
+    def transaction(self, durable=False):
+        """Run one mutation against up-to-date data and save it.
+        
+        Holds the file lock from reload to save so another process cannot
+        hand out the same ids.  Set txn.changed = False to skip the save;
+        txn.saved reports whether the save succeeded.  With write-behind
+        the save is queued (txn.saved is True) unless durable is set, in
+        which case it is written and fsynced before returning.
+        """
+        txn = SimpleNamespace(changed=True, saved=False)
+        with self._save_lock:
+            queued = self._held is not None
+            handle = self._held or self._file_lock.acquire()
+            self._held = None
+            try:
+                # While a save is queued our data is newer than the file
+                if not queued and self._file_stamp() != self._stamp:
+                    self.load_data()
+                with self.lock.write():
+                    yield txn
+                    if txn.changed:
+                        self._touch()
+                if txn.changed:
+                    if self._writer is not None and not durable:
+                        txn.saved = queued = True
+                    else:
+                        txn.saved = self._write()
+                        queued = not txn.saved and self._writer is not None  # retried later
+            finally:
+                if queued:
+                    self._held = handle
+                    self._writer.request()
+                else:
+                    self._file_lock.release(handle)
+    
+    def flush(self):
+        """Write a queued save; the write-behind thread calls this"""
+        with self._save_lock:
+            return self._held is None or self._write_held()
+    
+    def close(self):
+        """Write any queued save and stop the write-behind thread"""
+        if self._writer is not None:
+            self._writer.close()
+        return self.flush()
+    
+    def _touch(self):
+        """Record a data change; caller holds the write lock"""
+        self.generation += 1
+        self.modified = time.time()
+    
     def save_data(self):
-        data = {
-            'patients': {pid: p.to_dict() for pid, p in self.patients.items()},
-            'appointments': {aid: a.to_dict() for aid, a in self.appointments.items()},
-            'next_patient_id': self.next_patient_id,
-            'next_apt_id': self.next_apt_id
-        }
+        with self._save_lock:
+            if self._held is not None:
+                return self._write_held()
+            with self._file_lock.hold():
+                return self._write()
+    
+    def _write_held(self):
+        """Write the queued save and release the file lock; caller holds _save_lock"""
+        if not self._write():
+            return False
+        self._file_lock.release(self._held)
+        self._held = None
+        return True
+    
+    def _write(self):
+        with self.lock.read(), timed_section('serialize', 'save_data'):
+            # Only records invalidated since the last save are re-encoded
+            _, text = self.fragments.encode(
+                {'patients': self.patients.items(), 'appointments': self.appointments.items()},
+                self.fragments.take_dirty(),
+                {'next_patient_id': self.next_patient_id, 'next_apt_id': self.next_apt_id})
         
         try:
-            with open('np_scheduler_data.json', 'w') as f:
-                json.dump(data, f, indent=2)
+            # Temp file, fsync and rename: a crash never truncates the data file
+            with timed_section('store_write', 'save_data'):
+                write_atomic(self.data_file, lambda f: f.write(text))
+            self._stamp = self._file_stamp()
             return True
         except Exception as e:
             print(f"Save error: {e}")
             return False
     
     def load_data(self):
+        patients = {}
+        appointments = {}
         try:
-            if os.path.exists('np_scheduler_data.json'):
-                with open('np_scheduler_data.json', 'r') as f:
-                    data = json.load(f)
+            stamp = self._file_stamp()
+            data, source = load_newest(self.data_file, read_json_object)
+            if source not in (None, self.data_file):
+                print(f"Load warning: {self.data_file} is unreadable; using {source}")
+            if data is not None:
                 
                 # Load patients
                 for pid, p_data in data.get('patients', {}).items():
@@ -117,7 +240,7 @@ class SchedulerData:
                         p_data.get('insurance', '')
                     )
                     patient.notes = p_data.get('notes', '')
-                    self.patients[int(pid)] = patient
+                    patients[int(pid)] = patient
                 
                 # Load appointments
                 for aid, a_data in data.get('appointments', {}).items():
@@ -131,46 +254,80 @@ class SchedulerData:
                         a_data.get('status', 'Scheduled')
                     )
                     appointment.notes = a_data.get('notes', '')
-                    self.appointments[int(aid)] = appointment
+                    appointments[int(aid)] = appointment
                 
-                self.next_patient_id = data.get('next_patient_id', 1)
-                self.next_apt_id = data.get('next_apt_id', 1)
+                slots = IntervalIndex(provider_field=None, duration_field='duration')
+                slots.rebuild(appointments)
+                columns = AppointmentColumns(provider_field=None, duration_field='duration')
+                columns.rebuild(appointments)
+                search = PatientSearchIndex(('name', 'email'), ('phone',), sort_key=lambda p: p.name)
+                search.rebuild(patients)
+                
+                with self.lock.write():
+                    self.patients = patients
+                    self.appointments = appointments
+                    self.slots = slots
+                    self.columns = columns
+                    self.search = search
+                    self.fragments.clear()
+                    self.next_patient_id = data.get('next_patient_id', 1)
+                    self.next_apt_id = data.get('next_apt_id', 1)
+                    self._touch()
+            self._stamp = stamp
         
         except Exception as e:
             print(f"Load error: {e}")
 
-# Global scheduler data instance
-scheduler_data = SchedulerData()
+# Request, template and data timings on GET /metrics; registered first so
+# request timings include the refresh hook below
+metrics.install(app, 'scheduler', gauges={
+    'page_cache_hits': ('Rendered pages served from the page cache', lambda: page_cache.hits),
+    'page_cache_misses': ('Page cache lookups that had to render', lambda: page_cache.misses),
+    'data_generation': ('Data changes applied since startup', lambda: scheduler_data.generation),
+    'pending_writes': ('Saves applied in memory but not yet written',
+                       lambda: int(scheduler_data._held is not None)),
+})
+
+# Global scheduler data instance; saves are written behind the responses
+# unless ORTHO_WRITE_DELAY_MS=0
+scheduler_data = SchedulerData(write_delay=write_delay())
+
+# Rendered schedule pages, reused until the data changes
+page_cache = PageCache()
+
+@app.before_request
+def refresh_data():
+    """Pick up saves made by other worker processes"""
+    scheduler_data.refresh()
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @app.route('/schedule')
-"""
-Handles the '/schedule' route to display appointment schedules.
-Depending on the 'view' query parameter, this function supports two modes:
-- 'day': Displays appointments for a single selected date.
-- 'range': Displays appointments for a 4-week range starting from the selected date.
-Query Parameters:
-    view (str): Determines the view type ('day' or 'range'). Defaults to 'day'.
-    date (str): The selected date in 'YYYY-MM-DD' format. Defaults to today's date.
-Returns:
-    Renders the 'schedule.html' template with the following context:
-        - For 'range' view:
-            range_appointments (dict): Appointments grouped by date within the range.
-            selected_date (str): The selected start date.
-            view_type (str): The current view type.
-            start_date (str): The start date of the range.
-            end_date (str): The end date of the range.
-        - For 'day' view:
-            appointments (list): List of appointments for the selected date.
-            selected_date (str): The selected date.
-            view_type (str): The current view type.
-"""
+@cached_page(page_cache, scheduler_data)
 def schedule():
-    from datetime import timedelta
-    
+    """
+    Handles the '/schedule' route to display appointment schedules.
+    Depending on the 'view' query parameter, this function supports two modes:
+    - 'day': Displays appointments for a single selected date.
+    - 'range': Displays appointments for a 4-week range starting from the selected date.
+    Query Parameters:
+        view (str): Determines the view type ('day' or 'range'). Defaults to 'day'.
+        date (str): The selected date in 'YYYY-MM-DD' format. Defaults to today's date.
+    Returns:
+        Renders the 'schedule.html' template with the following context:
+            - For 'range' view:
+                range_appointments (dict): Appointments grouped by date within the range.
+                selected_date (str): The selected start date.
+                view_type (str): The current view type.
+                start_date (str): The start date of the range.
+                end_date (str): The end date of the range.
+            - For 'day' view:
+                appointments (list): List of appointments for the selected date.
+                selected_date (str): The selected date.
+                view_type (str): The current view type.
+    """
     view_type = request.args.get('view', 'day')  # 'day' or 'range'
     selected_date = request.args.get('date', datetime.now().strftime("%Y-%m-%d"))
     
@@ -179,24 +336,19 @@ def schedule():
         start_date = datetime.strptime(selected_date, "%Y-%m-%d")
         end_date = start_date + timedelta(weeks=4)
         
-        # Get appointments for date range
+        # Get appointments for date range, already ordered by date and time
         range_appointments = {}
-        for apt in scheduler_data.appointments.values():
-            apt_date = datetime.strptime(apt.date, "%Y-%m-%d")
-            if start_date <= apt_date <= end_date:
+        with scheduler_data.lock.read():
+            with timed_section('scan', 'schedule_range'):
+                ids = scheduler_data.columns.ids_between(selected_date, end_date.strftime("%Y-%m-%d"))
+            for apt_id in ids:
+                apt = scheduler_data.appointments[apt_id]
                 patient = scheduler_data.patients.get(apt.patient_id)
                 if patient:
                     apt_dict = apt.to_dict()
                     apt_dict['patient_name'] = patient.name
                     apt_dict['patient_phone'] = patient.phone
-                    
-                    if apt.date not in range_appointments:
-                        range_appointments[apt.date] = []
-                    range_appointments[apt.date].append(apt_dict)
-        
-        # Sort appointments within each date
-        for date in range_appointments:
-            range_appointments[date].sort(key=lambda x: x['time'])
+                    range_appointments.setdefault(apt.date, []).append(apt_dict)
         
         return render_template('schedule.html', 
                              range_appointments=range_appointments,
@@ -205,10 +357,16 @@ def schedule():
                              start_date=start_date.strftime("%Y-%m-%d"),
                              end_date=end_date.strftime("%Y-%m-%d"))
     else:
-        # Single day view (existing functionality)
+        # Single day view, ordered by time
         day_appointments = []
-        for apt in scheduler_data.appointments.values():
-            if apt.date == selected_date:
+        with scheduler_data.lock.read():
+            try:
+                with timed_section('scan', 'schedule_day'):
+                    ids = scheduler_data.columns.ids_between(selected_date, selected_date)
+            except ValueError:
+                ids = []
+            for apt_id in ids:
+                apt = scheduler_data.appointments[apt_id]
                 patient = scheduler_data.patients.get(apt.patient_id)
                 if patient:
                     apt_dict = apt.to_dict()
@@ -216,9 +374,6 @@ def schedule():
                     apt_dict['patient_phone'] = patient.phone
                     day_appointments.append(apt_dict)
         
-        # Sort by time
-        day_appointments.sort(key=lambda x: x['time'])
-        
         return render_template('schedule.html', 
                              appointments=day_appointments, 
                              selected_date=selected_date,
@@ -229,25 +384,39 @@ def patients():
     search = request.args.get('search', '').lower()
     
     # Filter patients based on search
-    filtered_patients = []
-    for patient in scheduler_data.patients.values():
-        if (not search or 
-            search in patient.name.lower() or 
-            search in patient.phone or 
-            search in patient.email.lower()):
-            filtered_patients.append(patient.to_dict())
-    
-    # Sort by name
-    filtered_patients.sort(key=lambda x: x['name'])
+    with scheduler_data.lock.read():
+        if search:
+            _, ids = scheduler_data.search.search(search)
+            filtered_patients = [scheduler_data.patients[pid].to_dict() for pid in ids]
+        else:
+            filtered_patients = [p.to_dict() for p in scheduler_data.patients.values()]
+            # Sort by name
+            filtered_patients.sort(key=lambda x: x['name'])
     
     return render_template('patients.html', 
                          patients=filtered_patients, 
                          search=search)
 
+@app.route('/api/patients/search')
+def search_patients():
+    query = request.args.get('q', '')
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'offset and limit must be integers'}), 400
+    
+    with scheduler_data.lock.read():
+        total, ids = scheduler_data.search.search(query, offset, limit)
+        patients = [scheduler_data.patients[pid].to_dict() for pid in ids]
+    
+    return jsonify({'success': True, 'total': total, 'offset': offset, 'patients': patients})
+
 @app.route('/appointments')
 def appointments():
     # Get all patients for dropdown
-    patients = [p.to_dict() for p in scheduler_data.patients.values()]
+    with scheduler_data.lock.read():
+        patients = [p.to_dict() for p in scheduler_data.patients.values()]
     patients.sort(key=lambda x: x['name'])
     
     # Generate time slots
@@ -264,57 +433,70 @@ def add_patient():
     if not data.get('name', '').strip():
         return jsonify({'success': False, 'error': 'Name is required'}), 400
     
-    patient = Patient(
-        scheduler_data.next_patient_id,
-        data['name'].strip(),
-        data.get('phone', '').strip(),
-        data.get('email', '').strip(),
-        data.get('dob', '').strip(),
-        data.get('insurance', '').strip()
-    )
-    
-    scheduler_data.patients[scheduler_data.next_patient_id] = patient
-    scheduler_data.next_patient_id += 1
-    
-    if scheduler_data.save_data():
+    with scheduler_data.transaction(durable_requested()) as txn:
+        patient = Patient(
+            scheduler_data.next_patient_id,
+            data['name'].strip(),
+            data.get('phone', '').strip(),
+            data.get('email', '').strip(),
+            data.get('dob', '').strip(),
+            data.get('insurance', '').strip()
+        )
+        scheduler_data.patients[scheduler_data.next_patient_id] = patient
+        scheduler_data.search.add(scheduler_data.next_patient_id, patient)
+        scheduler_data.fragments.invalidate('patients', scheduler_data.next_patient_id)
+        scheduler_data.next_patient_id += 1
+    
+    if txn.saved:
         return jsonify({'success': True, 'patient': patient.to_dict()})
     else:
         return jsonify({'success': False, 'error': 'Failed to save data'}), 500
 
 @app.route('/api/patients/<int:patient_id>', methods=['PUT'])
 def edit_patient(patient_id):
-    if patient_id not in scheduler_data.patients:
-        return jsonify({'success': False, 'error': 'Patient not found'}), 404
-    
     data = request.get_json()
-    patient = scheduler_data.patients[patient_id]
     
     if not data.get('name', '').strip():
         return jsonify({'success': False, 'error': 'Name is required'}), 400
     
-    patient.name = data['name'].strip()
-    patient.phone = data.get('phone', '').strip()
-    patient.email = data.get('email', '').strip()
-    patient.dob = data.get('dob', '').strip()
-    patient.insurance = data.get('insurance', '').strip()
-    
-    if scheduler_data.save_data():
+    with scheduler_data.transaction(durable_requested()) as txn:
+        patient = scheduler_data.patients.get(patient_id)
+        if patient is None:
+            txn.changed = False
+            return jsonify({'success': False, 'error': 'Patient not found'}), 404
+        
+        patient.name = data['name'].strip()
+        patient.phone = data.get('phone', '').strip()
+        patient.email = data.get('email', '').strip()
+        patient.dob = data.get('dob', '').strip()
+        patient.insurance = data.get('insurance', '').strip()
+        scheduler_data.search.add(patient_id, patient)
+        scheduler_data.fragments.invalidate('patients', patient_id)
+    
+    if txn.saved:
         return jsonify({'success': True, 'patient': patient.to_dict()})
     else:
         return jsonify({'success': False, 'error': 'Failed to save data'}), 500
 
 @app.route('/api/patients/<int:patient_id>', methods=['DELETE'])
 def delete_patient(patient_id):
-    if patient_id not in scheduler_data.patients:
-        return jsonify({'success': False, 'error': 'Patient not found'}), 404
-    
-    del scheduler_data.patients[patient_id]
-    
-    if scheduler_data.save_data():
+    with scheduler_data.transaction(durable_requested()) as txn:
+        if scheduler_data.patients.pop(patient_id, None) is None:
+            txn.changed = False
+            return jsonify({'success': False, 'error': 'Patient not found'}), 404
+        scheduler_data.search.remove(patient_id)
+        scheduler_data.fragments.invalidate('patients', patient_id)
+    
+    if txn.saved:
         return jsonify({'success': True})
     else:
         return jsonify({'success': False, 'error': 'Failed to save data'}), 500
 
+def check_slot(data):
+    """Return the date, time and duration present in data, checked; raises ValueError"""
+    checks = {'date': check_date, 'time': check_time, 'duration': check_duration}
+    return {field: check(data[field], field) for field, check in checks.items() if field in data}
+
 @app.route('/api/appointments', methods=['POST'])
 def add_appointment():
     data = request.get_json()
@@ -324,43 +506,128 @@ def add_appointment():
         if not data.get(field):
             return jsonify({'success': False, 'error': f'{field} is required'}), 400
     
-    patient_id = int(data['patient_id'])
-    if patient_id not in scheduler_data.patients:
+    try:
+        patient_id = int(data['patient_id'])
+    except (TypeError, ValueError):
         return jsonify({'success': False, 'error': 'Invalid patient'}), 400
+    try:
+        slot = check_slot(dict({'duration': 30}, **data))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    with scheduler_data.transaction(durable_requested()) as txn:
+        if patient_id not in scheduler_data.patients:
+            txn.changed = False
+            return jsonify({'success': False, 'error': 'Invalid patient'}), 400
+        
+        appointment = Appointment(
+            scheduler_data.next_apt_id,
+            patient_id,
+            slot['date'],
+            slot['time'],
+            slot['duration'],
+            data.get('reason', '')
+        )
+        conflicts = scheduler_data.slots.conflicts([(appointment.apt_id, appointment)])
+        if conflicts:
+            txn.changed = False
+            return jsonify({'success': False,
+                            'error': 'Time slot conflicts with an existing appointment',
+                            'conflicts': conflicts[appointment.apt_id]}), 409
+        
+        scheduler_data.appointments[scheduler_data.next_apt_id] = appointment
+        scheduler_data.slots.add(appointment.apt_id, appointment)
+        scheduler_data.columns.add(appointment.apt_id, appointment)
+        scheduler_data.fragments.invalidate('appointments', appointment.apt_id)
+        scheduler_data.next_apt_id += 1
     
-    appointment = Appointment(
-        scheduler_data.next_apt_id,
-        patient_id,
-        data['date'],
-        data['time'],
-        int(data.get('duration', 30)),
-        data.get('reason', '')
-    )
-    
-    scheduler_data.appointments[scheduler_data.next_apt_id] = appointment
-    scheduler_data.next_apt_id += 1
-    
-    if scheduler_data.save_data():
+    if txn.saved:
         return jsonify({'success': True, 'appointment': appointment.to_dict()})
     else:
         return jsonify({'success': False, 'error': 'Failed to save data'}), 500
 
 @app.route('/api/appointments/<int:apt_id>', methods=['PUT'])
 def edit_appointment(apt_id):
-    if apt_id not in scheduler_data.appointments:
-        return jsonify({'success': False, 'error': 'Appointment not found'}), 404
-    
     data = request.get_json()
-    appointment = scheduler_data.appointments[apt_id]
     
-    appointment.status = data.get('status', appointment.status)
-    appointment.notes = data.get('notes', appointment.notes)
+    # Checked up front: a slot the index cannot read would drop the
+    # appointment from the calendar and from every later conflict check
+    try:
+        changes = check_slot(data)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    changes.update({field: data[field] for field in ('status', 'notes') if field in data})
+    
+    with scheduler_data.transaction(durable_requested()) as txn:
+        appointment = scheduler_data.appointments.get(apt_id)
+        if appointment is None:
+            txn.changed = False
+            return jsonify({'success': False, 'error': 'Appointment not found'}), 404
+        
+        # Rebooking (a new date or time, or un-cancelling) must not double-book
+        updated = SimpleNamespace(**dict(appointment.to_dict(), **changes))
+        try:
+            conflicts = scheduler_data.slots.conflicts([(apt_id, updated)])
+        except ValueError as e:  # stored before slots were checked; needs a new date or time
+            txn.changed = False
+            return jsonify({'success': False, 'error': str(e)}), 400
+        if conflicts:
+            txn.changed = False
+            return jsonify({'success': False,
+                            'error': 'Time slot conflicts with an existing appointment',
+                            'conflicts': conflicts[apt_id]}), 409
+        
+        for field, value in changes.items():
+            setattr(appointment, field, value)
+        scheduler_data.slots.add(apt_id, appointment)  # cancelling frees the slot
+        scheduler_data.columns.add(apt_id, appointment)
+        scheduler_data.fragments.invalidate('appointments', apt_id)
     
-    if scheduler_data.save_data():
+    if txn.saved:
         return jsonify({'success': True, 'appointment': appointment.to_dict()})
     else:
         return jsonify({'success': False, 'error': 'Failed to save data'}), 500
 
+@app.route('/api/availability')
+def availability():
+    start_date = request.args.get('start', datetime.now().strftime("%Y-%m-%d"))
+    try:
+        end_date = request.args.get(
+            'end', (datetime.strptime(start_date, "%Y-%m-%d") + timedelta(days=13)).strftime("%Y-%m-%d"))
+        duration = int(request.args.get('duration', 30))
+        limit = min(int(request.args.get('limit', 10)), 100)
+        step = int(request.args.get('step', 30))
+        days = (datetime.strptime(end_date, "%Y-%m-%d") - datetime.strptime(start_date, "%Y-%m-%d")).days + 1
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid date or number'}), 400
+    if duration <= 0 or step <= 0:
+        return jsonify({'success': False, 'error': 'duration and step must be positive'}), 400
+    if not 1 <= days <= MAX_SEARCH_DAYS:
+        return jsonify({'success': False,
+                        'error': f'the range must cover 1 to {MAX_SEARCH_DAYS} days'}), 400
+    
+    with scheduler_data.lock.read():
+        slots = list(scheduler_data.slots.free_slots(
+            None, start_date, end_date, duration, limit=limit, step=step,
+            not_before=datetime.now()))
+    
+    return jsonify({'success': True,
+                    'slots': [{'date': date, 'time': time} for date, time in slots]})
+
+@app.route('/api/appointments/stats')
+def appointment_stats():
+    """Appointment counts, utilization and no-show rate for a date range"""
+    start_date = request.args.get('start', datetime.now().strftime("%Y-%m-%d"))
+    try:
+        end_date = request.args.get(
+            'end', (datetime.strptime(start_date, "%Y-%m-%d") + timedelta(days=27)).strftime("%Y-%m-%d"))
+        with scheduler_data.lock.read():
+            stats = scheduler_data.columns.stats(start_date, end_date)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid date'}), 400
+    
+    return jsonify({'success': True, 'start': start_date, 'end': end_date, 'stats': stats})
+
 @app.route('/api/appointments/<int:apt_id>')
 def get_appointment(apt_id):
     if apt_id not in scheduler_data.appointments:
@@ -376,4 +643,5 @@ def get_appointment(apt_id):
     return jsonify({'success': True, 'appointment': apt_dict})
 
 if __name__ == '__main__':
+    install_signal_handlers()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,220 @@
+"""
+Appointment interval index for double-booking checks and free-slot search.
+
+Booked appointments are grouped per (provider, date) into lists sorted by
+start minute.  An overlap check is a bisect into one day's list plus a short
+walk back bounded by the longest appointment that day, so it does not
+depend on how many appointments the practice has in total.
+"""
+
+import re
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+
+# Appointments with these statuses do not occupy their slot
+FREE_STATUSES = {'cancelled'}
+
+DAY_START = 8 * 60   # 08:00, matches the booking form's time slots
+DAY_END = 18 * 60    # 18:00
+
+# Longest date range the availability APIs search; free_slots walks it day by day
+MAX_SEARCH_DAYS = 92
+
+
+class SchedulingConflict(Exception):
+    """Raised when an appointment overlaps one already booked"""
+
+    def __init__(self, conflicts):
+        # conflicts: {appointment_id: [ids of the appointments it overlaps]}
+        self.conflicts = conflicts
+        super().__init__('Time slot conflicts with an existing appointment')
+
+
+def parse_minutes(time_string):
+    """'HH:MM' -> minutes after midnight"""
+    hours, minutes = time_string.split(':')[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+TIME_RE = re.compile(r'([01]\d|2[0-3]):[0-5]\d')
+MAX_DURATION = 24 * 60
+
+
+def check_date(text, field='date'):
+    """Return text if it is a real 'YYYY-MM-DD' date; raise ValueError otherwise"""
+    try:
+        valid = datetime.strptime(text, "%Y-%m-%d").strftime("%Y-%m-%d") == text
+    except (TypeError, ValueError):
+        valid = False
+    if not valid:
+        raise ValueError(f'{field} must be a YYYY-MM-DD date')
+    return text
+
+
+def check_time(text, field='time'):
+    """Return text if it is an 'HH:MM' 24-hour time; raise ValueError otherwise"""
+    if not isinstance(text, str) or not TIME_RE.fullmatch(text):
+        raise ValueError(f'{field} must be a 24-hour HH:MM time')
+    return text
+
+
+def check_duration(value, field='duration'):
+    """Return value as whole minutes between 1 and a day; raise ValueError otherwise"""
+    try:
+        minutes = int(value)
+    except (TypeError, ValueError):
+        minutes = 0
+    if not 0 < minutes <= MAX_DURATION:
+        raise ValueError(f'{field} must be between 1 and {MAX_DURATION} minutes')
+    return minutes
+
+
+class IntervalIndex:
+    """Booked intervals per (provider, date), sorted by start minute.
+
+    Follows the FieldIndex protocol (add/remove/rebuild) so the data
+    managers can maintain it alongside their other indexes.
+    """
+
+    def __init__(self, provider_field='provider', duration_field='duration_minutes'):
+        self.provider_field = provider_field
+        self.duration_field = duration_field
+        self._days = {}  # (provider, date) -> sorted [(start, end, record_id)]
+        self._longest = {}  # (provider, date) -> longest booked duration
+        self._entries = {}  # record_id -> (key, (start, end, record_id))
+
+    def interval(self, record):
+        """Return ((provider, date), start, end) for a record, or None if it frees its slot.
+
+        Raises ValueError if a booked record's date, time or duration
+        cannot be read; the APIs check new appointments before this.
+        """
+        if (getattr(record, 'status', '') or '').lower() in FREE_STATUSES:
+            return None
+        try:
+            date = check_date(record.date)
+            start = parse_minutes(check_time(record.time))
+            duration = int(getattr(record, self.duration_field) or 0)
+        except (AttributeError, TypeError, ValueError) as e:
+            raise ValueError(f'Unreadable appointment slot: {e}')
+        provider = getattr(record, self.provider_field) if self.provider_field else None
+        return (provider, date), start, start + max(duration, 1)
+
+    def _stored_interval(self, record):
+        # Records saved before dates and times were checked stay loadable,
+        # but cannot be placed on the calendar
+        try:
+            return self.interval(record)
+        except ValueError:
+            return None
+
+    def add(self, record_id, record):
+        self.remove(record_id)
+        interval = self._stored_interval(record)
+        if interval is None:
+            return
+        key, start, end = interval
+        entry = (start, end, record_id)
+        insort(self._days.setdefault(key, []), entry)
+        self._longest[key] = max(self._longest.get(key, 0), end - start)
+        self._entries[record_id] = (key, entry)
+
+    def remove(self, record_id):
+        if record_id not in self._entries:
+            return
+        key, entry = self._entries.pop(record_id)
+        day = self._days[key]
+        del day[bisect_left(day, entry)]
+        if not day:
+            del self._days[key]
+            del self._longest[key]
+
+    def rebuild(self, records):
+        self._days.clear()
+        self._longest.clear()
+        self._entries.clear()
+        for record_id, record in records.items():
+            interval = self._stored_interval(record)
+            if interval is None:
+                continue
+            key, start, end = interval
+            entry = (start, end, record_id)
+            self._days.setdefault(key, []).append(entry)
+            self._longest[key] = max(self._longest.get(key, 0), end - start)
+            self._entries[record_id] = (key, entry)
+        for day in self._days.values():
+            day.sort()
+
+    def overlapping(self, key, start, end, ignore=None):
+        """Return ids of booked intervals on key that overlap [start, end)"""
+        day = self._days.get(key)
+        if not day:
+            return []
+        earliest = start - self._longest[key]
+        found = []
+        i = bisect_left(day, (end,)) - 1
+        while i >= 0 and day[i][0] > earliest:
+            s, e, record_id = day[i]
+            if e > start and record_id != ignore:
+                found.append(record_id)
+            i -= 1
+        return found
+
+    def conflicts(self, items):
+        """Return {record_id: [overlapping ids]} for (record_id, record) items.
+
+        Items are also checked against each other, so a batch cannot
+        double-book a slot it fills itself.  Raises ValueError for an item
+        whose slot cannot be read rather than letting it through unchecked.
+        """
+        batch = IntervalIndex(self.provider_field, self.duration_field)
+        found = {}
+        for record_id, record in items:
+            interval = self.interval(record)
+            if interval is None:
+                continue
+            key, start, end = interval
+            ids = self.overlapping(key, start, end, ignore=record_id)
+            ids += batch.overlapping(key, start, end, ignore=record_id)
+            if ids:
+                found[record_id] = ids
+            else:
+                batch.add(record_id, record)
+        return found
+
+    def free_slots(self, provider, start_date, end_date, duration, limit=10,
+                   step=30, day_start=DAY_START, day_end=DAY_END, not_before=None):
+        """Yield up to limit (date, 'HH:MM') starts of free slots of duration minutes.
+
+        Dates are 'YYYY-MM-DD' strings, inclusive.  not_before is a datetime
+        before which no slot is offered (usually now).
+        """
+        current = datetime.strptime(start_date, "%Y-%m-%d")
+        last = datetime.strptime(end_date, "%Y-%m-%d")
+        if not_before is not None:
+            current = max(current, datetime.combine(not_before.date(), datetime.min.time()))
+        found = 0
+        while current <= last and found < limit:
+            date = current.strftime("%Y-%m-%d")
+            first = day_start
+            if not_before is not None and current.date() == not_before.date():
+                now = not_before.hour * 60 + not_before.minute
+                first = max(first, day_start + -(-(now - day_start) // step) * step)
+
+            booked = self._days.get((provider, date), [])
+            busy_until = 0  # end of the latest booking starting before the candidate
+            i = 0
+            for slot in range(first, day_end - duration + 1, step):
+                while i < len(booked) and booked[i][0] < slot + duration:
+                    busy_until = max(busy_until, booked[i][1])
+                    i += 1
+                if busy_until <= slot:
+                    yield date, format_minutes(slot)
+                    found += 1
+                    if found >= limit:
+                        return
+            current += timedelta(days=1)
@@ -0,0 +1,32 @@
+"""
+Setup shared by the benchmark scripts; import it before any app module.
+
+Puts the repository root on sys.path and points ORTHO_DATABASE at a file
+in a fresh temporary directory, removed at exit, whatever the caller's
+environment says: importing orthodontics_app opens that store, and a
+benchmark must never load or write the practice's real data.
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+DATA_DIR = tempfile.mkdtemp(prefix='ortho_bench_')
+DATA_FILE = os.path.join(DATA_DIR, 'orthodontics_data.json')
+os.environ['ORTHO_DATABASE'] = DATA_FILE
+atexit.register(shutil.rmtree, DATA_DIR, ignore_errors=True)
+
+
+def timed(func, repeat=1):
+    """Call func repeat times; return (seconds per call, last result)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
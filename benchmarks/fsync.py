@@ -0,0 +1,101 @@
+"""
+Durability benchmark: what fsync costs and how much batching hides it.
+
+Snapshot writes of a synthetic practice (app.py's schema, --patients
+patients) three ways:
+
+    in place  - open(path, 'w') + json.dump, the old SchedulerData save
+    rename    - temp file + os.replace, no fsync
+    atomic    - snapshots.write_atomic: temp file, fsync, rotate, rename,
+                directory fsync
+
+Journal appends (one JSON line per change) without fsync, with one fsync
+per change, and with one fsync per batch of --batches changes, the way
+the write-behind thread flushes a burst.  Run it on the disk the data
+lives on; tmpfs and some containers make fsync nearly free.
+
+    python benchmarks/fsync.py
+    python benchmarks/fsync.py --patients 5000 --changes 500 --dir /var/lib/ortho
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from _common import timed
+from journal import Journal
+from sample_data import practice, scheduler_practice
+from snapshots import write_atomic
+
+
+def in_place(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def rename(path, data):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def atomic(path, data):
+    write_atomic(path, lambda f: json.dump(data, f, indent=2))
+
+
+def append(path, entries, batch, sync):
+    """Append entries batch at a time; return seconds per change"""
+    journal = Journal(path)
+    start = time.perf_counter()
+    for i in range(0, len(entries), batch):
+        journal.append_many(entries[i:i + batch], sync=sync)
+    elapsed = time.perf_counter() - start
+    os.remove(path)
+    return elapsed / len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cost of fsync for snapshots and journal appends')
+    parser.add_argument('--patients', type=int, default=1000, help='snapshot size')
+    parser.add_argument('--changes', type=int, default=200, help='journal entries per run')
+    parser.add_argument('--batches', type=int, nargs='+', default=[1, 10, 50, 200])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--dir', help='directory to write in (default: a temp dir)')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='ortho_fsync_', dir=args.dir)
+    try:
+        data = {'patients': {}, 'appointments': {}}
+        for collection, record_id, record in scheduler_practice(args.patients):
+            data[collection][str(record_id)] = record
+        path = os.path.join(directory, 'np_scheduler_data.json')
+        in_place(path, data)
+        size = os.path.getsize(path)
+        print(f"Snapshot: {len(data['patients']):,} patients, {len(data['appointments']):,} "
+              f"appointments, {size / 1e6:.1f} MB")
+        for name, write in (('in place', in_place), ('rename', rename), ('atomic', atomic)):
+            elapsed, _ = timed(lambda: write(path, data), args.repeat)
+            print(f"  {name:<9} {elapsed * 1000:>9.2f} ms")
+
+        entries = []
+        for collection, record_id, record in practice(args.changes):
+            if collection == 'patients':
+                entries.append(('put', collection, record_id, record))
+                if len(entries) == args.changes:
+                    break
+        journal = os.path.join(directory, 'bench.journal')
+        print(f"Journal: {len(entries)} changes")
+        print(f"  {'no fsync':<16} {append(journal, entries, 1, False) * 1000:>9.3f} ms/change")
+        for batch in args.batches:
+            per_change = append(journal, entries, batch, True)
+            print(f"  {f'fsync every {batch}':<16} {per_change * 1000:>9.3f} ms/change "
+                  f"({1 / per_change:>9,.0f} changes/s)")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
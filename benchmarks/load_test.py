@@ -0,0 +1,205 @@
+"""
+Load test for orthodontics_app.py through Flask's test client (no network).
+
+Drives the API flows demo.py walks through (add a patient, schedule an
+appointment, create a treatment plan) and the main read pages against a
+synthetic practice from sample_data.py, from --concurrency threads, and
+reports latency percentiles and throughput per scenario:
+
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --patients 20000 --requests 500 --concurrency 8
+    python benchmarks/load_test.py --scenarios schedule_week patient_search
+
+--save-baseline stores the results (default benchmarks/baseline.json);
+later runs with the same --patients and --concurrency compare against it
+and exit with status 1 if a scenario's p95 grew by more than --tolerance.
+Baselines are machine-specific, so record one on the machine that checks.
+--durable sends every request with "X-Durable: 1", so writes are fsynced
+before their response instead of written behind it.
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from _common import DATA_FILE
+import orthodontics_app
+from sample_data import FIRST_NAMES, write_orthodontics
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Dates in the last year of the synthetic practice's history (it ends 2025-12-31)
+DATES = [f'2025-{month:02d}-{day:02d}' for month in range(1, 13) for day in range(1, 29)]
+
+
+def patient_payload(rnd, i):
+    return {
+        'first_name': rnd.choice(FIRST_NAMES), 'last_name': f'Load{i}',
+        'date_of_birth': '1995-03-10', 'phone': f'(555) 444-{i % 10000:04d}',
+        'email': f'load{i}@email.com', 'insurance_provider': 'SmileCare Insurance',
+        'referral_source': 'Google Search', 'notes': 'Interested in Invisalign',
+    }
+
+
+def appointment_payload(rnd, i, patient_id):
+    # A provider per request keeps double-booking checks from rejecting rows
+    return {
+        'patient_id': patient_id, 'date': rnd.choice(DATES), 'time': '14:00',
+        'duration_minutes': 60, 'appointment_type': 'Consultation',
+        'provider': f'Dr. Load {i}', 'notes': 'Initial consultation',
+    }
+
+
+def plan_payload(rnd, patient_id):
+    return {
+        'patient_id': patient_id, 'diagnosis': 'Moderate crowding with mild overbite',
+        'treatment_type': 'Invisalign', 'start_date': rnd.choice(DATES),
+        'estimated_duration_months': 12, 'total_cost': 4800.0, 'insurance_coverage': 1200.0,
+        'payment_plan': 'Monthly payments of $300', 'treatment_goals': 'Correct crowding',
+        'appliances_needed': ['Invisalign aligners'], 'phases': ['Initial alignment', 'Retention'],
+        'status': 'Planned', 'notes': '',
+    }
+
+
+# scenario -> (client, rnd, i, patient_ids) -> response
+SCENARIOS = {
+    'add_patient': lambda c, rnd, i, ids: c.post('/api/patients', json=patient_payload(rnd, i)),
+    'add_appointment': lambda c, rnd, i, ids: c.post(
+        '/api/appointments', json=appointment_payload(rnd, i, rnd.choice(ids))),
+    'add_treatment_plan': lambda c, rnd, i, ids: c.post(
+        '/api/treatment-plans', json=plan_payload(rnd, rnd.choice(ids))),
+    'schedule_day': lambda c, rnd, i, ids: c.get(f'/schedule?date={rnd.choice(DATES)}'),
+    'schedule_week': lambda c, rnd, i, ids: c.get(f'/schedule?view=week&date={rnd.choice(DATES)}'),
+    'patient_search': lambda c, rnd, i, ids: c.get(
+        f'/patients?search={rnd.choice(FIRST_NAMES)[:rnd.randint(2, 4)]}'),
+    'patient_detail': lambda c, rnd, i, ids: c.get(f'/patient/{rnd.choice(ids)}'),
+    'outcomes': lambda c, rnd, i, ids: c.get('/outcomes'),
+}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def run_scenario(name, requests, concurrency, patient_ids, seed, durable=False):
+    """Send requests calls of one scenario from concurrency threads; return its stats"""
+    scenario = SCENARIOS[name]
+    latencies, failures = [], []
+    lock = threading.Lock()
+    local = threading.local()
+    workers = itertools.count()
+
+    def one(i):
+        if not hasattr(local, 'client'):
+            local.client = orthodontics_app.app.test_client()
+            if durable:
+                local.client.environ_base['HTTP_X_DURABLE'] = '1'
+            local.rnd = random.Random(seed * 1000 + next(workers))
+        start = time.perf_counter()
+        response = scenario(local.client, local.rnd, i, patient_ids)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if response.status_code not in (200, 304):
+                failures.append(response.status_code)
+
+    wall = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - wall
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'failures': len(failures),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'throughput': round(requests / wall, 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regression messages, p95 against the baseline's p95"""
+    regressions = []
+    for name, stats in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        limit = before['p95_ms'] * (1 + tolerance)
+        if stats['p95_ms'] > limit:
+            regressions.append(f"{name}: p95 {stats['p95_ms']:.2f} ms > {limit:.2f} ms "
+                               f"(baseline {before['p95_ms']:.2f} ms + {tolerance:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency and throughput of the main API flows and pages')
+    parser.add_argument('--patients', type=int, default=1000, help='synthetic practice size')
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--durable', action='store_true', help='write every change before its response')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95 growth, e.g. 0.25 = 25%%')
+    args = parser.parse_args()
+
+    try:
+        # The app opened DATA_FILE (empty) on import; reload it once it holds the practice
+        write_orthodontics(DATA_FILE, args.patients, args.seed, force=True)
+        orthodontics_app.data_manager.load_data()
+        patient_ids = list(orthodontics_app.data_manager.patients)
+        print(f"{len(patient_ids):,} patients, {len(orthodontics_app.data_manager.appointments):,} "
+              f"appointments, concurrency {args.concurrency}")
+
+        print(f"{'scenario':<20} {'p50':>9} {'p95':>9} {'p99':>9} {'req/s':>8} {'failed':>7}")
+        results = {}
+        for name in args.scenarios:
+            stats = results[name] = run_scenario(name, args.requests, args.concurrency,
+                                                 patient_ids, args.seed, args.durable)
+            print(f"{name:<20} {stats['p50_ms']:>6.2f} ms {stats['p95_ms']:>6.2f} ms "
+                  f"{stats['p99_ms']:>6.2f} ms {stats['throughput']:>8.1f} {stats['failures']:>7}")
+    finally:
+        orthodontics_app.data_manager.close()
+        orthodontics_app.data_manager.store.close()
+
+    settings = {'patients': args.patients, 'concurrency': args.concurrency, 'durable': args.durable}
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'settings': settings, 'recorded': datetime.now().isoformat(timespec='seconds'),
+                       'results': results}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    failed = any(stats['failures'] for stats in results.values())
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('settings') != settings:
+            print(f"Baseline was recorded with {baseline.get('settings')}; not comparing")
+        else:
+            regressions = compare(results, baseline['results'], args.tolerance)
+            for message in regressions:
+                print(f"REGRESSION {message}")
+            failed = failed or bool(regressions)
+            if not regressions:
+                print(f"No p95 regressions against {args.baseline}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
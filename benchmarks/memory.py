@@ -0,0 +1,57 @@
+"""
+Memory benchmark: bytes per record for the data model classes.
+
+Builds records from JSON-decoded rows the way the data manager does and
+measures what stays allocated (record plus its field values) with
+tracemalloc, comparing plain dataclasses (the previous models) against
+the slotted classes with interned fields.
+
+    python benchmarks/memory.py
+    python benchmarks/memory.py --records 200000
+"""
+
+import argparse
+import json
+import tracemalloc
+from dataclasses import fields, make_dataclass
+
+import _common  # noqa: F401
+from orthodontics_app import COLLECTIONS
+from startup import synthetic_data
+
+
+def plain_class(cls):
+    """A __dict__-based dataclass with the same fields, like the old models"""
+    return make_dataclass(cls.__name__ + 'Plain', [(field.name, field.type) for field in fields(cls)])
+
+
+def bytes_per_record(cls, lines):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = [cls(**json.loads(line)) for line in lines]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del records
+    return used / len(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare bytes per record before and after slotting')
+    parser.add_argument('--records', type=int, default=100000)
+    args = parser.parse_args()
+
+    data = synthetic_data(args.records)
+    print(f"{'collection':<14} {'records':>9} {'plain':>10} {'slotted':>10} {'saved':>7}")
+    for name, records in data.items():
+        if not records:
+            continue
+        lines = [json.dumps(record) for record in records.values()]
+        cls = COLLECTIONS[name]
+        plain = bytes_per_record(plain_class(cls), lines)
+        compact = bytes_per_record(cls, lines)
+        print(f"{name:<14} {len(lines):>9,} {plain:>8.0f} B {compact:>8.0f} B "
+              f"{(1 - compact / plain) * 100:>6.0f}%")
+
+
+if __name__ == '__main__':
+    main()
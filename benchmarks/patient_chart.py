@@ -0,0 +1,95 @@
+"""
+Patient chart benchmark: four lookups and sorts vs. patient_chart().
+
+Loads a synthetic practice of --patients patients, gives one of them a
+long-running case of --visits adjustment visits (an appointment, a
+treatment record and a progress photo each), and times assembling that
+patient's chart, and an ordinary patient's, two ways:
+
+    find + sort   - one find() per section and a sort of its results
+                    (the previous patient detail page)
+    patient_chart - data_manager.patient_chart(), each section read in
+                    order from a per-patient sorted index
+
+    python benchmarks/patient_chart.py
+    python benchmarks/patient_chart.py --patients 20000 --visits 1000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import date, timedelta
+
+from _common import timed
+from orthodontics_app import COLLECTIONS, OrthodonticsDataManager
+from sample_data import practice
+from storage import JsonStore
+
+
+def long_case(data, visits):
+    """Add `visits` weekly visits to a patient who has all three kinds; return their id"""
+    first = {}
+    for collection in ('appointments', 'treatment_records', 'progress_photos'):
+        for record_id, record in data[collection].items():
+            first.setdefault(record['patient_id'], {}).setdefault(collection, (record_id, record))
+    patient_id = next(pid for pid, kinds in first.items() if len(kinds) == 3)
+    start = date.fromisoformat('2015-01-05')
+    for n in range(visits):
+        day = (start + timedelta(weeks=n)).isoformat()
+        for collection, (template_id, template) in first[patient_id].items():
+            record_id = str(uuid.uuid4())
+            record = {field: record_id if value == template_id else value
+                      for field, value in template.items()}
+            data[collection][record_id] = dict(record, date=day)
+    return patient_id
+
+
+def find_and_sort(manager, patient_id):
+    appointments = manager.find('appointments', 'patient_id', patient_id)
+    appointments.sort(key=lambda x: f"{x.date} {x.time}")
+    records = manager.find('treatment_records', 'patient_id', patient_id)
+    records.sort(key=lambda x: x.date, reverse=True)
+    photos = manager.find('progress_photos', 'patient_id', patient_id)
+    photos.sort(key=lambda x: x.date, reverse=True)
+    return {'patient': manager.patients[patient_id],
+            'treatment_plans': manager.find('treatment_plans', 'patient_id', patient_id),
+            'appointments': appointments,
+            'treatment_records': records,
+            'progress_photos': photos}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cost of assembling one patient chart')
+    parser.add_argument('--patients', type=int, default=5000)
+    parser.add_argument('--visits', type=int, default=500, help='visits added to the long case')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='ortho_bench_')
+    try:
+        data = {name: {} for name in COLLECTIONS}
+        for collection, record_id, record in practice(args.patients):
+            data[collection][record_id] = record
+        long_id = long_case(data, args.visits)
+        typical_id = next(pid for pid in data['patients'] if pid != long_id)
+        data_file = os.path.join(directory, 'orthodontics_data.json')
+        JsonStore(data_file).write_checkpoint(data)
+        manager = OrthodonticsDataManager(store=JsonStore(data_file))
+
+        print(f"{'patient':<8} {'records':>8} {'find + sort':>13} {'patient_chart':>15}")
+        for name, patient_id in (('typical', typical_id), ('long', long_id)):
+            chart = manager.patient_chart(patient_id)
+            records = sum(len(chart[section]) for section in chart if section != 'patient')
+            old, expected = timed(lambda: find_and_sort(manager, patient_id), args.repeat)
+            new, chart = timed(lambda: manager.patient_chart(patient_id), args.repeat)
+            for section in ('appointments', 'treatment_records', 'progress_photos'):
+                assert [r.date for r in chart[section]] == [r.date for r in expected[section]]
+            print(f"{name:<8} {records:>8,} {old * 1e6:>10.1f} µs {new * 1e6:>12.1f} µs")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
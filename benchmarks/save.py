@@ -0,0 +1,77 @@
+"""
+Snapshot serialization benchmark: full re-encode vs. cached fragments.
+
+Loads a synthetic practice of --patients patients and times encoding its
+checkpoint the old way (to_dict() and json.dumps(indent=2) for every
+record) and with snapshots.FragmentCache after changing 1, 100 and 1000
+appointments, which re-encodes only those records.
+
+    python benchmarks/save.py
+    python benchmarks/save.py --patients 20000
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import _common  # noqa: F401
+from orthodontics_app import COLLECTIONS, OrthodonticsDataManager
+from sample_data import write_orthodontics
+from snapshots import FragmentCache
+from storage import JsonStore
+
+
+def snapshot_items(manager):
+    for name in COLLECTIONS:
+        manager.all(name)  # build lazy collections
+    return {name: list(getattr(manager, name).items()) for name in COLLECTIONS}
+
+
+def full(collections):
+    data = {name: {rid: r.to_dict() for rid, r in items} for name, items in collections.items()}
+    return json.dumps(data, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Checkpoint serialization cost vs. change size')
+    parser.add_argument('--patients', type=int, default=5000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='ortho_bench_')
+    try:
+        data_file = os.path.join(directory, 'orthodontics_data.json')
+        write_orthodontics(data_file, args.patients)
+        manager = OrthodonticsDataManager(store=JsonStore(data_file))
+        collections = snapshot_items(manager)
+        total = sum(len(items) for items in collections.values())
+        print(f"{total:,} records")
+
+        start = time.perf_counter()
+        expected = full(collections)
+        print(f"{'full re-encode':<24} {(time.perf_counter() - start) * 1000:>9.1f} ms")
+
+        cache = FragmentCache()
+        start = time.perf_counter()
+        text = cache.encode(collections, cache.take_dirty())[1]
+        print(f"{'fragments, first save':<24} {(time.perf_counter() - start) * 1000:>9.1f} ms")
+        assert text == expected
+
+        appointment_ids = [rid for rid, _ in collections['appointments']]
+        for changed in (1, 100, 1000):
+            for rid in appointment_ids[:changed]:
+                manager.appointments[rid].notes += '.'
+                cache.invalidate('appointments', rid)
+            start = time.perf_counter()
+            text = cache.encode(collections, cache.take_dirty())[1]
+            elapsed = time.perf_counter() - start
+            assert text == full(collections)
+            print(f"{f'fragments, {changed} changed':<24} {elapsed * 1000:>9.1f} ms")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Record serialization microbenchmark for the six orthodontics models.
+
+Times, per record, dataclasses.asdict (the old to_dict) against the
+generated to_dict(), and cls(**data) (the old load path, no validation)
+against the generated from_dict(), which also checks every field's type:
+
+    python benchmarks/serialization.py
+    python benchmarks/serialization.py --patients 2000 --repeat 10
+"""
+
+import argparse
+import time
+from dataclasses import asdict
+
+import _common  # noqa: F401
+from orthodontics_app import COLLECTIONS
+from sample_data import practice
+
+
+def per_record(func, items, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            func(item)
+    return (time.perf_counter() - start) / (repeat * len(items)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='asdict/constructor vs. generated serializers')
+    parser.add_argument('--patients', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = {name: [] for name in COLLECTIONS}
+    for collection, _, record in practice(args.patients):
+        rows[collection].append(record)
+
+    print(f"{'model':<16} {'records':>8} {'asdict':>9} {'to_dict':>9} {'':>6} "
+          f"{'cls(**d)':>9} {'from_dict':>9} {'':>6}  (µs per record)")
+    for name, cls in COLLECTIONS.items():
+        dicts = rows[name]
+        if not dicts:
+            continue
+        records = [cls.from_dict(data) for data in dicts]
+        assert all(record.to_dict() == asdict(record) for record in records)
+        old_dump = per_record(asdict, records, args.repeat)
+        new_dump = per_record(cls.to_dict, records, args.repeat)
+        old_load = per_record(lambda data: cls(**data), dicts, args.repeat)
+        new_load = per_record(cls.from_dict, dicts, args.repeat)
+        print(f"{cls.__name__:<16} {len(dicts):>8,} {old_dump:>9.2f} {new_dump:>9.2f} "
+              f"{old_dump / new_dump:>5.1f}x {old_load:>9.2f} {new_load:>9.2f} "
+              f"{old_load / new_load:>5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
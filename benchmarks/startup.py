@@ -0,0 +1,90 @@
+"""
+Startup benchmark: JSON snapshot vs. binary (marshal) snapshot.
+
+Writes a synthetic practice of each size with JsonStore.write_checkpoint,
+then times loading the raw collections from either format and a full
+OrthodonticsDataManager start (records built and indexes rebuilt).
+
+    python benchmarks/startup.py                    # 10k, 100k and 1M records
+    python benchmarks/startup.py --sizes 10000 50000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+
+from _common import timed
+from orthodontics_app import OrthodonticsDataManager
+from storage import JsonStore
+
+FIRST_NAMES = ['John', 'Emily', 'Michael', 'Sarah', 'David', 'Anna', 'James', 'Maria']
+LAST_NAMES = ['Smith', 'Davis', 'Johnson', 'Lee', 'Brown', 'Garcia', 'Miller', 'Wilson']
+
+
+def synthetic_data(total, seed=1):
+    """Return a snapshot dict with about total records: 1 patient per 4 appointments"""
+    rnd = random.Random(seed)
+    data = {'patients': {}, 'treatment_plans': {}, 'appointments': {},
+            'treatment_records': {}, 'progress_photos': {}, 'outcomes': {}}
+    patients = max(total // 5, 1)
+    for i in range(patients):
+        pid = f'p{i}'
+        data['patients'][pid] = {
+            'patient_id': pid, 'first_name': rnd.choice(FIRST_NAMES),
+            'last_name': rnd.choice(LAST_NAMES), 'date_of_birth': '2010-05-15',
+            'phone': f'(555) {rnd.randint(0, 999):03d}-{rnd.randint(0, 9999):04d}',
+            'email': f'patient{i}@email.com', 'address': '123 Main St',
+            'emergency_contact': '', 'emergency_phone': '',
+            'insurance_provider': 'Delta Dental', 'insurance_id': f'DD{i}',
+            'medical_history': '', 'allergies': 'None known', 'referral_source': '',
+            'created_date': f'2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}T10:00:00', 'notes': '',
+        }
+    for i in range(total - patients):
+        aid = f'a{i}'
+        data['appointments'][aid] = {
+            'appointment_id': aid, 'patient_id': f'p{rnd.randrange(patients)}',
+            'date': f'2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}',
+            'time': f'{8 + i % 10:02d}:{(i // 10) % 2 * 30:02d}', 'duration_minutes': 30,
+            'appointment_type': 'Adjustment', 'provider': f'Dr. {i % 97}',
+            'status': 'Scheduled', 'notes': '', 'treatment_notes': '',
+            'next_appointment_recommended': '',
+        }
+    return data
+
+
+def run(total):
+    directory = tempfile.mkdtemp(prefix='ortho_bench_')
+    try:
+        data_file = os.path.join(directory, 'orthodontics_data.json')
+        JsonStore(data_file).write_checkpoint(synthetic_data(total))
+
+        json_load, _ = timed(lambda: JsonStore(data_file, binary_snapshot=False).load())
+        binary_load, _ = timed(lambda: JsonStore(data_file).load())
+        json_start, _ = timed(lambda: OrthodonticsDataManager(
+            store=JsonStore(data_file, binary_snapshot=False)))
+        binary_start, _ = timed(lambda: OrthodonticsDataManager(store=JsonStore(data_file)))
+
+        json_mb = os.path.getsize(data_file) / 1e6
+        binary_mb = os.path.getsize(os.path.join(directory, 'orthodontics_data.marshal')) / 1e6
+        print(f"{total:>9,} | {json_mb:7.1f} MB {binary_mb:7.1f} MB | "
+              f"{json_load:7.2f}s {binary_load:7.2f}s | {json_start:7.2f}s {binary_start:7.2f}s")
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare JSON and binary snapshot load times')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    print(f"{'records':>9} | {'json':>10} {'binary':>10} | "
+          f"{'json':>8} {'binary':>8} | {'json':>8} {'binary':>8}")
+    print(f"{'':>9} | {'file size':^21} | {'store load':^17} | {'manager start':^17}")
+    for total in args.sizes:
+        run(total)
+
+
+if __name__ == '__main__':
+    main()
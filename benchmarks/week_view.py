@@ -0,0 +1,85 @@
+"""
+Week/month view benchmark: per-day queries vs. one appointments_between() pass.
+
+Loads a synthetic practice with --appointments appointments and times
+collecting a week's and a month's appointments, joined with their
+patients, three ways:
+
+    scan    - one pass over every appointment per day (7 x N for a week)
+    by day  - one date-index lookup per day (the previous week view)
+    between - data_manager.appointments_between(), one slice of the
+              by_time index for the whole range
+
+    python benchmarks/week_view.py
+    python benchmarks/week_view.py --appointments 200000 --repeat 50
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from _common import timed
+from orthodontics_app import OrthodonticsDataManager
+from startup import synthetic_data
+from storage import JsonStore
+
+
+def dates(start_date, days):
+    first = datetime.strptime(start_date, "%Y-%m-%d")
+    return [(first + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+
+
+def by_scan(manager, days):
+    result = {}
+    for date in days:
+        result[date] = sorted(((apt, manager.patients.get(apt.patient_id))
+                               for apt in manager.all('appointments') if apt.date == date),
+                              key=lambda pair: pair[0].time)
+    return result
+
+
+def by_day(manager, days):
+    result = {}
+    for date in days:
+        result[date] = sorted(((apt, manager.patients.get(apt.patient_id))
+                               for apt in manager.find('appointments', 'date', date)),
+                              key=lambda pair: pair[0].time)
+    return result
+
+
+def between(manager, days):
+    return manager.appointments_between(days[0], days[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare week and month view queries')
+    parser.add_argument('--appointments', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='ortho_bench_')
+    try:
+        data_file = os.path.join(directory, 'orthodontics_data.json')
+        # synthetic_data makes one patient per four appointments
+        JsonStore(data_file).write_checkpoint(synthetic_data(args.appointments * 5 // 4))
+        manager = OrthodonticsDataManager(store=JsonStore(data_file))
+        print(f"{len(manager.appointments):,} appointments, {len(manager.patients):,} patients")
+
+        print(f"{'view':<6} {'found':>6} {'scan':>10} {'by day':>10} {'between':>10}")
+        for view, length in (('week', 7), ('month', 28)):
+            days = dates('2025-03-01', length)
+            found = sum(len(day) for day in between(manager, days).values())
+            times = []
+            for query in (by_scan, by_day, between):
+                elapsed, result = timed(lambda: query(manager, days), args.repeat)
+                assert sum(len(day) for day in result.values()) == found
+                times.append(elapsed)
+            print(f"{view:<6} {found:>6,} " + ' '.join(f"{t * 1000:>7.2f} ms" for t in times))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""
+Column-oriented copy of the appointments for date-range queries and stats.
+
+Each appointment is one row across parallel columns: epoch day (date
+ordinal), start minute, duration, and small integer codes for status and
+provider.  Dates and times are parsed once, when a record is added, so a
+day, week or range view is a comparison on integers rather than a
+strptime per appointment per request.  Utilization and no-show figures
+come from the same masks.
+
+With NumPy installed the columns are NumPy arrays and every query is a
+vectorized mask.  Without it they are array.array columns scanned in one
+pass, which gives the same results.  Rows are removed by moving the last
+row into the gap, so the columns stay dense.
+"""
+
+from array import array
+from datetime import date
+
+from availability import DAY_END, DAY_START, FREE_STATUSES, parse_minutes
+
+try:
+    import numpy as np
+except ImportError:  # optional; the array.array fallback gives the same results
+    np = None
+
+NO_SHOW_STATUSES = {'no show', 'no-show', 'no_show'}
+
+# column -> (array typecode, NumPy dtype)
+COLUMNS = {
+    'day': ('l', 'int64'),       # date.toordinal()
+    'start': ('h', 'int16'),     # minutes after midnight
+    'duration': ('h', 'int16'),  # minutes
+    'status': ('h', 'int16'),    # index into self.statuses
+    'provider': ('h', 'int16'),  # index into self.providers
+}
+
+
+def epoch_day(date_string):
+    """'YYYY-MM-DD' -> date ordinal"""
+    return date.fromisoformat(date_string).toordinal()
+
+
+class AppointmentColumns:
+    """Appointments as parallel integer columns, maintained with the FieldIndex protocol"""
+
+    def __init__(self, provider_field='provider', duration_field='duration_minutes'):
+        self.provider_field = provider_field
+        self.duration_field = duration_field
+        self.ids = []  # row -> record id
+        self._rows = {}  # record id -> row
+        self.statuses = []  # status code -> status string
+        self.providers = []  # provider code -> provider
+        self._status_codes = {}
+        self._provider_codes = {}
+        self._reset(0)
+
+    def _reset(self, capacity):
+        if np is not None:
+            self._cols = {name: np.zeros(max(capacity, 16), dtype)
+                          for name, (_, dtype) in COLUMNS.items()}
+        else:
+            self._cols = {name: array(code) for name, (code, _) in COLUMNS.items()}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _code(self, codes, values, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def row(self, record):
+        """Return (day, start, duration, status, provider) for a record, or None if undated"""
+        try:
+            day = epoch_day(record.date)
+            start = parse_minutes(record.time)
+            duration = int(getattr(record, self.duration_field) or 0)
+        except (AttributeError, TypeError, ValueError):
+            return None
+        status = self._code(self._status_codes, self.statuses, getattr(record, 'status', '') or '')
+        provider = getattr(record, self.provider_field) if self.provider_field else None
+        provider = self._code(self._provider_codes, self.providers, provider)
+        return day, start, duration, status, provider
+
+    def add(self, record_id, record):
+        self.remove(record_id)
+        values = self.row(record)
+        if values is None:
+            return
+        n = len(self.ids)
+        cols = self._cols
+        if np is not None:
+            if n == len(cols['day']):
+                for name in COLUMNS:
+                    cols[name] = np.concatenate([cols[name], np.zeros_like(cols[name])])
+            for name, value in zip(COLUMNS, values):
+                cols[name][n] = value
+        else:
+            for name, value in zip(COLUMNS, values):
+                cols[name].append(value)
+        self._rows[record_id] = n
+        self.ids.append(record_id)
+
+    def remove(self, record_id):
+        row = self._rows.pop(record_id, None)
+        if row is None:
+            return
+        last = len(self.ids) - 1
+        if row != last:
+            moved = self.ids[last]
+            self.ids[row] = moved
+            self._rows[moved] = row
+            for column in self._cols.values():
+                column[row] = column[last]
+        self.ids.pop()
+        if np is None:
+            for column in self._cols.values():
+                column.pop()
+
+    def rebuild(self, records):
+        self.ids, self._rows = [], {}
+        self.statuses, self.providers = [], []
+        self._status_codes, self._provider_codes = {}, {}
+        rows = []
+        for record_id, record in records.items():
+            values = self.row(record)
+            if values is not None:
+                self._rows[record_id] = len(self.ids)
+                self.ids.append(record_id)
+                rows.append(values)
+        if np is not None:
+            self._reset(len(rows))
+            if rows:
+                table = np.array(rows, dtype='int64')
+                for i, name in enumerate(COLUMNS):
+                    self._cols[name][:len(rows)] = table[:, i]
+        else:
+            self._reset(0)
+            for i, name in enumerate(COLUMNS):
+                self._cols[name].extend(values[i] for values in rows)
+
+    def _selected(self, start_date, end_date, provider=None):
+        """Rows dated start_date..end_date (inclusive), optionally for one provider"""
+        first, last = epoch_day(start_date), epoch_day(end_date)
+        code = self._provider_codes.get(provider) if provider is not None else None
+        n = len(self.ids)
+        if provider is not None and code is None:
+            n = 0
+        if np is not None:
+            day = self._cols['day'][:n]
+            mask = (day >= first) & (day <= last)
+            if code is not None:
+                mask &= self._cols['provider'][:n] == code
+            return np.flatnonzero(mask)
+        day, providers = self._cols['day'], self._cols['provider']
+        return [row for row in range(n)
+                if first <= day[row] <= last and (code is None or providers[row] == code)]
+
+    def ids_between(self, start_date, end_date, provider=None):
+        """Ids of appointments dated start_date..end_date, ordered by date and start time"""
+        rows = self._selected(start_date, end_date, provider)
+        if np is not None:
+            order = np.lexsort((self._cols['start'][rows], self._cols['day'][rows]))
+            return [self.ids[row] for row in rows[order].tolist()]
+        day, start = self._cols['day'], self._cols['start']
+        rows.sort(key=lambda row: (day[row], start[row]))
+        return [self.ids[row] for row in rows]
+
+    def stats(self, start_date, end_date, provider=None, day_start=DAY_START, day_end=DAY_END):
+        """Appointment counts, utilization and no-show rate for a date range.
+
+        Utilization is booked minutes (appointments that hold their slot)
+        over opening hours for every day in the range, per provider when
+        providers are tracked and none is given.
+        """
+        rows = self._selected(start_date, end_date, provider)
+        free = [code for code, status in enumerate(self.statuses) if status.lower() in FREE_STATUSES]
+        no_show = [code for code, status in enumerate(self.statuses) if status.lower() in NO_SHOW_STATUSES]
+        if np is not None:
+            status = self._cols['status'][rows]
+            counts = np.bincount(status, minlength=len(self.statuses)).tolist()
+            booked = int(self._cols['duration'][rows][~np.isin(status, free)].sum())
+        else:
+            status, duration = self._cols['status'], self._cols['duration']
+            counts = [0] * len(self.statuses)
+            booked = 0
+            for row in rows:
+                counts[status[row]] += 1
+                if status[row] not in free:
+                    booked += duration[row]
+
+        days = epoch_day(end_date) - epoch_day(start_date) + 1
+        providers = 1 if provider is not None or not self.provider_field else max(len(self.providers), 1)
+        capacity = max(days, 0) * (day_end - day_start) * providers
+        total = len(rows)
+        missed = sum(counts[code] for code in no_show)
+        # The rate is over appointments that were due: cancellations excluded
+        due = total - sum(counts[code] for code in free)
+        return {
+            'appointments': total,
+            'by_status': {self.statuses[code]: count for code, count in enumerate(counts) if count},
+            'booked_minutes': booked,
+            'capacity_minutes': capacity,
+            'utilization': round(booked / capacity, 4) if capacity else 0.0,
+            'no_shows': missed,
+            'no_show_rate': round(missed / due, 4) if due else 0.0,
+        }
+
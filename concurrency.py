@@ -0,0 +1,107 @@
+"""
+Locking helpers shared by the Flask apps.
+"""
+
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: FileLock only excludes threads of this process
+    fcntl = None
+
+
+class RWLock:
+    """Reader/writer lock: many concurrent readers or one writer.
+
+    Waiting writers take priority over new readers so a steady stream of
+    page views cannot starve a save.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class FileLock:
+    """Exclusive advisory lock on a file, shared by every process using it.
+
+    Each hold() opens its own descriptor, so the lock also excludes other
+    threads of the same process.  It is not reentrant.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fallback = threading.Lock() if fcntl is None else None
+
+    @contextmanager
+    def hold(self):
+        if self._fallback is not None:
+            with self._fallback:
+                yield
+            return
+        with open(self.path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield  # closing the file releases the lock
+
+    def acquire(self):
+        """Wait for the lock; return a handle to release(), from any thread"""
+        if self._fallback is not None:
+            self._fallback.acquire()
+            return self._fallback
+        f = open(self.path, 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        except BaseException:
+            f.close()
+            raise
+        return f
+
+    def try_acquire(self):
+        """Take the lock without waiting; return a handle to release() or None"""
+        if self._fallback is not None:
+            return self._fallback if self._fallback.acquire(blocking=False) else None
+        f = open(self.path, 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return None
+        return f
+
+    def release(self, handle):
+        if handle is self._fallback:
+            handle.release()
+        else:
+            handle.close()
@@ -0,0 +1,30 @@
+"""
+Shared pytest setup.
+
+Importing orthodontics_app opens the store named by ORTHO_DATABASE, so it
+is pointed at a throwaway directory before any test module imports it;
+the suite never touches the data files in the working tree.  Writes are
+synchronous so tests can reopen a store right after a save.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+os.environ['ORTHO_DATABASE'] = os.path.join(tempfile.mkdtemp(prefix='ortho_test_'),
+                                            'orthodontics_data.json')
+os.environ['ORTHO_WRITE_DELAY_MS'] = '0'
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    """Path for a fresh JSON data file"""
+    return str(tmp_path / 'orthodontics_data.json')
+
+
+@pytest.fixture
+def client():
+    """Test client for the orthodontics app's global data manager"""
+    from orthodontics_app import app
+    return app.test_client()
@@ -0,0 +1,131 @@
+"""
+Streaming export of practice data as NDJSON or CSV.
+
+Rows are consumed from a generator and written out in small chunks, so an
+export never builds the whole collection (or its serialised form) in
+memory.  Used by GET /api/export/<collection> and from the command line:
+
+    python export.py appointments --format csv --from 2025-01-01 --to 2025-01-31
+    python export.py treatment_records --patient <patient_id> -o records.ndjson
+
+The CLI reads the store named by --data (default: $ORTHO_DATABASE or
+orthodontics_data.json); with the SQLite backend it streams from disk.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+from storage import COLLECTION_NAMES, open_store
+
+# Export format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+}
+
+CHUNK_SIZE = 64 * 1024  # characters buffered before a chunk is yielded
+
+
+def date_range(start=None, end=None):
+    """Turn inclusive 'YYYY-MM-DD' bounds into (start, before) for filtering.
+
+    before is the day after end, so ISO timestamps on the last day still
+    match.  Raises ValueError for malformed dates.
+    """
+    if start:
+        datetime.strptime(start, "%Y-%m-%d")
+    before = None
+    if end:
+        before = (datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    return start or None, before
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, separators=(',', ':'))
+    return value
+
+
+def ndjson_chunks(rows):
+    """Yield NDJSON text for an iterable of dicts, CHUNK_SIZE at a time"""
+    buffer, size = [], 0
+    for row in rows:
+        line = json.dumps(row, separators=(',', ':')) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def csv_chunks(rows, columns=None):
+    """Yield CSV text for an iterable of dicts, CHUNK_SIZE at a time.
+
+    Without columns the header comes from the first row.  Lists and dicts
+    are written as JSON inside their cell.
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    if columns is None:
+        columns = list(first) if first is not None else []
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    if first is not None:
+        writer.writerow([_cell(first.get(column)) for column in columns])
+        for row in rows:
+            writer.writerow([_cell(row.get(column)) for column in columns])
+            if out.tell() >= CHUNK_SIZE:
+                yield out.getvalue()
+                out.seek(0)
+                out.truncate()
+    yield out.getvalue()
+
+
+def export_chunks(rows, export_format, columns=None):
+    """Yield the text of rows in one of EXPORT_FORMATS"""
+    if export_format == 'csv':
+        return csv_chunks(rows, columns)
+    return ndjson_chunks(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export practice data as NDJSON or CSV')
+    parser.add_argument('collection', choices=COLLECTION_NAMES)
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='ndjson')
+    parser.add_argument('--data', default=os.environ.get('ORTHO_DATABASE', 'orthodontics_data.json'),
+                        help='data file or sqlite:/// URL')
+    parser.add_argument('--patient', help='only records of this patient id')
+    parser.add_argument('--from', dest='start', help='first date, YYYY-MM-DD')
+    parser.add_argument('--to', dest='end', help='last date, YYYY-MM-DD')
+    parser.add_argument('-o', '--output', help='output file (default: stdout)')
+    args = parser.parse_args()
+
+    try:
+        start, before = date_range(args.start, args.end)
+    except ValueError:
+        parser.error('--from and --to must be YYYY-MM-DD dates')
+
+    store = open_store(args.data)
+    rows = (record for _, record in store.scan(args.collection, args.patient, start, before))
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        for chunk in export_chunks(rows, args.format):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
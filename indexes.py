@@ -0,0 +1,158 @@
+"""
+In-memory secondary indexes for OrthodonticsDataManager.
+
+A FieldIndex maps the value of one record field (patient_id, date, status,
+...) to the ids of the records carrying that value, so lookups cost
+O(result size) instead of a scan over the whole collection.
+
+A SortedIndex keeps records ordered by a sort key (optionally split into
+groups such as status) for keyset pagination: a page starts after the
+(sort_key, record_id) of the last row of the previous page, so fetching
+any page costs a bisect plus the page size.
+"""
+
+import base64
+import json
+from bisect import bisect_left, bisect_right, insort
+
+
+class FieldIndex:
+    def __init__(self, field, key=None):
+        self.field = field
+        self.key = key  # optional normalisation, e.g. str.lower
+        self._ids = {}  # value -> {record_id: None}, insertion ordered
+        self._values = {}  # record_id -> indexed value, for updates/deletes
+
+    def _normalise(self, value):
+        if self.key is not None and value is not None:
+            return self.key(value)
+        return value
+
+    def add(self, record_id, record):
+        """Index a record, replacing any entry for an older version of it"""
+        value = self._normalise(getattr(record, self.field, None))
+        if record_id in self._values:
+            if self._values[record_id] == value:
+                return
+            self.remove(record_id)
+        self._ids.setdefault(value, {})[record_id] = None
+        self._values[record_id] = value
+
+    def remove(self, record_id):
+        if record_id not in self._values:
+            return
+        value = self._values.pop(record_id)
+        ids = self._ids.get(value)
+        if ids is not None:
+            ids.pop(record_id, None)
+            if not ids:
+                del self._ids[value]
+
+    def get(self, value):
+        """Return the ids of records whose field equals value"""
+        return list(self._ids.get(self._normalise(value), ()))
+
+    def count(self, value):
+        return len(self._ids.get(self._normalise(value), ()))
+
+    def clear(self):
+        self._ids.clear()
+        self._values.clear()
+
+    def rebuild(self, records):
+        self.clear()
+        for record_id, record in records.items():
+            self.add(record_id, record)
+
+
+class SortedIndex:
+    def __init__(self, sort_key, group_field=None, group_key=None):
+        self.sort_key = sort_key  # record -> sortable string
+        self.group_field = group_field
+        self.group_key = group_key  # optional normalisation of the group value
+        self._lists = {}  # group -> sorted [(sort_key, record_id)]
+        self._entries = {}  # record_id -> (group, entry)
+
+    def _group(self, record):
+        if self.group_field is None:
+            return None
+        value = getattr(record, self.group_field, None)
+        if self.group_key is not None and value is not None:
+            value = self.group_key(value)
+        return value
+
+    def add(self, record_id, record):
+        group = self._group(record)
+        entry = (self.sort_key(record) or '', record_id)
+        if self._entries.get(record_id) == (group, entry):
+            return
+        self.remove(record_id)
+        insort(self._lists.setdefault(group, []), entry)
+        self._entries[record_id] = (group, entry)
+
+    def remove(self, record_id):
+        if record_id not in self._entries:
+            return
+        group, entry = self._entries.pop(record_id)
+        entries = self._lists[group]
+        del entries[bisect_left(entries, entry)]
+        if not entries:
+            del self._lists[group]
+
+    def rebuild(self, records):
+        self._lists = {}
+        self._entries = {}
+        for record_id, record in records.items():
+            group = self._group(record)
+            entry = (self.sort_key(record) or '', record_id)
+            self._lists.setdefault(group, []).append(entry)
+            self._entries[record_id] = (group, entry)
+        for entries in self._lists.values():
+            entries.sort()
+
+    def count(self, group=None):
+        return len(self._lists.get(group, ()))
+
+    def page(self, after=None, limit=50, reverse=False, group=None):
+        """Return (entries, more) for up to limit entries following after.
+
+        after is the last (sort_key, record_id) entry of the previous page,
+        or a 1-tuple (sort_key,) to start at a key.  reverse walks the
+        order from the end.
+        """
+        entries = self._lists.get(group, [])
+        if reverse:
+            end = len(entries) if after is None else bisect_left(entries, after)
+            start = max(end - limit, 0)
+            return entries[start:end][::-1], start > 0
+        start = 0 if after is None else bisect_right(entries, after)
+        return entries[start:start + limit], start + limit < len(entries)
+
+    def ids(self, group=None, reverse=False):
+        """Return every record id of a group, in sort order (or reversed)"""
+        entries = self._lists.get(group, ())
+        return [record_id for _, record_id in (reversed(entries) if reverse else entries)]
+
+    def between(self, low, high, group=None):
+        """Return the entries whose sort key k satisfies low <= k < high, in order"""
+        entries = self._lists.get(group, [])
+        return entries[bisect_left(entries, (low,)):bisect_left(entries, (high,))]
+
+
+def encode_cursor(entry):
+    """Turn a (sort_key, record_id) entry into an opaque URL-safe cursor"""
+    raw = json.dumps(list(entry), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        entry = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Invalid cursor: {e}')
+    if (not isinstance(entry, list) or len(entry) != 2
+            or not all(isinstance(part, str) for part in entry)):
+        raise ValueError('Invalid cursor')
+    return tuple(entry)
@@ -0,0 +1,152 @@
+"""
+Append-only journal of per-record mutations.
+
+Each line of the journal is one JSON object describing a single change:
+
+    {"op": "put", "collection": "patients", "id": "...", "record": {...}}
+    {"op": "delete", "collection": "patients", "id": "..."}
+
+Replaying the journal on top of the last snapshot reproduces the current
+state.  Entries are idempotent, so replaying an entry that is already part
+of the snapshot is harmless.
+
+Several processes may share one journal.  Appends must happen under an
+inter-process lock after catching up with read_new(); the journal tracks
+how far into the live file this process has read (inode and byte offset)
+so only entries written by other processes are replayed.
+"""
+
+import json
+import os
+
+
+class Journal:
+    def __init__(self, path):
+        self.path = path
+        self.rotated_path = path + '.1'
+        self.entries = 0  # entries in the live journal since the last compaction
+        self.inode = None  # live journal file this process has read from
+        self.offset = 0  # bytes of that file already applied
+
+    def append(self, op, collection, record_id, record=None):
+        """Append a single mutation to the journal"""
+        self.append_many([(op, collection, record_id, record)])
+
+    def append_many(self, entries, sync=False):
+        """Append several mutations with a single write; sync also fsyncs them"""
+        lines = []
+        for op, collection, record_id, record in entries:
+            entry = {'op': op, 'collection': collection, 'id': record_id}
+            if record is not None:
+                entry['record'] = record
+            lines.append(json.dumps(entry, separators=(',', ':')) + '\n')
+        data = ''.join(lines).encode('utf-8')
+
+        # Opened per write so a journal rotated by another process is never
+        # appended to after it has been moved aside.
+        with open(self.path, 'a+b') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b'\n':
+                    data = b'\n' + data  # fence off a line torn by a crash
+            f.write(data)
+            f.flush()
+            if sync:
+                os.fsync(f.fileno())
+            st = os.fstat(f.fileno())
+        self.inode, self.offset = st.st_ino, st.st_size
+        self.entries += len(lines)
+
+    def _read(self, path, offset):
+        """Return (entries, end offset) for complete lines after offset"""
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        entries = []
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # torn by a crash mid-append
+            entries.append((entry['op'], entry['collection'], entry['id'], entry.get('record')))
+        return entries, offset + end
+
+    def replay(self):
+        """Return (op, collection, id, record) for every journaled mutation.
+
+        The rotated journal (left behind by an interrupted or in-progress
+        compaction) is replayed before the live one.
+        """
+        entries = []
+        if os.path.exists(self.rotated_path):
+            entries += self._read(self.rotated_path, 0)[0]
+        self.inode, self.offset, self.entries = None, 0, 0
+        if os.path.exists(self.path):
+            self.inode = os.stat(self.path).st_ino
+            live, self.offset = self._read(self.path, 0)
+            self.entries = len(live)
+            entries += live
+        return entries
+
+    def has_new(self):
+        """Cheap check for entries this process has not read yet"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return self.inode is not None
+        return st.st_ino != self.inode or st.st_size != self.offset
+
+    def read_new(self):
+        """Return entries appended by other processes since the last read.
+
+        Returns None if the journal was replaced in a way that cannot be
+        followed, in which case the caller should reload everything.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            st = None
+
+        entries = []
+        if self.inode is not None and (st is None or st.st_ino != self.inode):
+            # Another process rotated the journal; finish the old file first
+            try:
+                if os.stat(self.rotated_path).st_ino != self.inode:
+                    return None
+            except FileNotFoundError:
+                return None
+            entries += self._read(self.rotated_path, self.offset)[0]
+            self.inode, self.offset, self.entries = None, 0, 0
+
+        if st is not None:
+            if self.inode is None:
+                self.inode, self.offset = st.st_ino, 0
+            if st.st_size > self.offset:
+                new, self.offset = self._read(self.path, self.offset)
+                self.entries += len(new)
+                entries += new
+        return entries
+
+    def rotate(self):
+        """Move the live journal aside so new mutations start a fresh file.
+
+        Returns True if there was anything to rotate.
+        """
+        self.inode, self.offset, self.entries = None, 0, 0
+        if not os.path.exists(self.path):
+            return False
+        if os.path.exists(self.rotated_path):
+            # A previous compaction failed; keep its entries ahead of ours.
+            with open(self.rotated_path, 'ab') as dst, open(self.path, 'rb') as src:
+                dst.write(src.read())
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self.rotated_path)
+        return True
+
+    def discard_rotated(self):
+        """Drop the rotated journal once its entries are in the snapshot"""
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
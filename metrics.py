@@ -0,0 +1,216 @@
+"""
+Request timing and hot-path instrumentation for both Flask apps.
+
+install(app) records every request's latency per route in a histogram,
+times each Jinja template render, and serves everything on GET /metrics
+in the Prometheus text format.  The data managers mark their hot paths
+with @timed(section) or `with timed_section(section, operation)`:
+
+    scan         reading records and indexes for a page or API call
+    serialize    turning records into dicts / JSON
+    store_write  store and journal I/O for a save
+    checkpoint   writing a full snapshot
+    fsync        forcing a snapshot and its rename to disk
+
+so a slow page can be split into data access, serialization, disk and
+template time.  Histograms are per process, like any Prometheus client.
+
+Setting ORTHO_PROFILE_DIR enables per-request profiling: a request sent
+with the header "X-Profile: 1" runs under cProfile and the stats are saved
+as <route>-<time>.prof in that directory (named in the response's
+X-Profile header); read them with `python -m pstats`.  One request is
+profiled at a time.
+"""
+
+import cProfile
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import Response, before_render_template, g, request, template_rendered
+
+# Upper bounds in seconds, as in the Prometheus client libraries
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one series per label combination"""
+
+    def __init__(self, name, help_text, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *label_values):
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted(self._series.items())
+            series = [(values, list(counts)) for values, counts in series]
+        for values, counts in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labels, values, f'le="{bound}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labels, values, 'le="+Inf"')
+            lines.append(f'{self.name}_bucket{labels} {counts[-1]}')
+            labels = _format_labels(self.labels, values)
+            lines.append(f'{self.name}_sum{labels} {counts[-2]:.6f}')
+            lines.append(f'{self.name}_count{labels} {counts[-1]}')
+        return lines
+
+
+class Registry:
+    """Histograms plus per-app gauges read from callables at scrape time"""
+
+    def __init__(self):
+        self.histograms = []
+        self.gauges = {}  # name -> (help, [(app, func)])
+
+    def histogram(self, name, help_text, labels=()):
+        histogram = Histogram(name, help_text, labels)
+        self.histograms.append(histogram)
+        return histogram
+
+    def gauge(self, name, help_text, app_name, func):
+        self.gauges.setdefault(name, (help_text, []))[1].append((app_name, func))
+
+    def render(self):
+        lines = []
+        for histogram in self.histograms:
+            lines.extend(histogram.render())
+        for name, (help_text, series) in sorted(self.gauges.items()):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+            lines += [f'{name}{{app="{_escape(app_name)}"}} {func()}' for app_name, func in series]
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Time to handle a request, by route',
+    ('app', 'route', 'method', 'status'))
+SECTION_SECONDS = REGISTRY.histogram(
+    'data_section_duration_seconds', 'Time spent in data manager hot paths',
+    ('section', 'operation'))
+RENDER_SECONDS = REGISTRY.histogram(
+    'template_render_duration_seconds', 'Time to render a Jinja template',
+    ('template',))
+
+
+@contextmanager
+def timed_section(section, operation):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        SECTION_SECONDS.observe(time.perf_counter() - start, section, operation)
+
+
+def timed(section):
+    """Decorator: record each call of the function under section"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                SECTION_SECONDS.observe(time.perf_counter() - start, section, func.__name__)
+        return wrapper
+    return decorator
+
+
+_profiling = threading.Lock()  # cProfile allows one active profiler per process
+
+
+def install(app, name=None, gauges=None):
+    """Time every request and template render of app and serve GET /metrics.
+
+    gauges maps metric name -> (help, func) for values read at scrape
+    time, such as page cache hits.
+    """
+    app_name = name or app.name
+    for gauge_name, (help_text, func) in (gauges or {}).items():
+        REGISTRY.gauge(gauge_name, help_text, app_name, func)
+    profile_dir = os.environ.get('ORTHO_PROFILE_DIR')
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+        if profile_dir and request.headers.get('X-Profile') == '1' and _profiling.acquire(blocking=False):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def _record(response):
+        start = g.pop('metrics_start', None)
+        if start is None or request.endpoint in ('metrics', 'static'):
+            return response
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        REQUEST_SECONDS.observe(time.perf_counter() - start, app_name, route, request.method,
+                                response.status_code)
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _profiling.release()
+            os.makedirs(profile_dir, exist_ok=True)
+            slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'index'
+            path = os.path.join(profile_dir, f'{slug}-{time.strftime("%Y%m%d-%H%M%S")}-{id(profiler):x}.prof')
+            profiler.dump_stats(path)
+            response.headers['X-Profile'] = path
+        return response
+
+    @app.teardown_request
+    def _stop_profiler(error=None):
+        # after_request is skipped when a view raises; never leave the profiler on
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _profiling.release()
+
+    def _render_started(sender, template, context, **extra):
+        g.setdefault('metrics_renders', []).append(time.perf_counter())
+
+    def _render_finished(sender, template, context, **extra):
+        starts = g.get('metrics_renders')
+        if starts:
+            RENDER_SECONDS.observe(time.perf_counter() - starts.pop(), template.name or '<string>')
+
+    before_render_template.connect(_render_started, app, weak=False)
+    template_rendered.connect(_render_finished, app, weak=False)
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
@@ -3,13 +3,31 @@ Orthodontics Practice Management System
 A comprehensive system for managing orthodontic patients, treatments, scheduling, and outcomes.
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, make_response
+import calendar
 import json
 import os
 from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
 from typing import List, Dict, Optional
 import uuid
+import threading
+import time
+
+from aggregates import RecentRecords
+from availability import (MAX_SEARCH_DAYS, IntervalIndex, SchedulingConflict, check_date, check_duration,
+                          check_time)
+from concurrency import RWLock
+from export import EXPORT_FORMATS, date_range, export_chunks
+from indexes import FieldIndex, SortedIndex, decode_cursor, encode_cursor
+import metrics
+from metrics import timed, timed_section
+from page_cache import PageCache, cached_page
+from records import RecordView, field_types, intern_fields, serialized, slotted
+from search_index import PatientSearchIndex
+from snapshots import FragmentCache
+from storage import SQLITE_COLUMNS, JsonStore, open_store, record_matches
+from write_behind import WriteBehind, durable_requested, install_signal_handlers, write_delay
 
 app = Flask(__name__)
 
@@ -38,6 +56,8 @@ def strftime_filter(date_string, format_string):
         return date_string
 
 # Data Models
+@serialized
+@slotted
 @dataclass
 class Patient:
     patient_id: str
@@ -57,13 +77,15 @@ class Patient:
     created_date: str
     notes: str = ""
     
+    def __post_init__(self):
+        intern_fields(self, ('insurance_provider', 'referral_source'))
+    
     @property
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
-    
-    def to_dict(self):
-        return asdict(self)
 
+@serialized
+@slotted
 @dataclass
 class TreatmentPlan:
     plan_id: str
@@ -82,10 +104,11 @@ class TreatmentPlan:
     notes: str = ""
     created_date: str = ""
     
-    def to_dict(self):
-        data = asdict(self)
-        return data
+    def __post_init__(self):
+        intern_fields(self, ('treatment_type', 'status', 'payment_plan'))
 
+@serialized
+@slotted
 @dataclass
 class Appointment:
     appointment_id: str
@@ -100,9 +123,11 @@ class Appointment:
     treatment_notes: str = ""
     next_appointment_recommended: str = ""
     
-    def to_dict(self):
-        return asdict(self)
+    def __post_init__(self):
+        intern_fields(self, ('appointment_type', 'provider', 'status', 'date', 'time'))
 
+@serialized
+@slotted
 @dataclass
 class TreatmentRecord:
     record_id: str
@@ -119,9 +144,11 @@ class TreatmentRecord:
     next_steps: str
     provider: str
     
-    def to_dict(self):
-        return asdict(self)
+    def __post_init__(self):
+        intern_fields(self, ('treatment_type', 'provider'))
 
+@serialized
+@slotted
 @dataclass
 class ProgressPhoto:
     photo_id: str
@@ -131,9 +158,11 @@ class ProgressPhoto:
     file_path: str
     description: str
     
-    def to_dict(self):
-        return asdict(self)
+    def __post_init__(self):
+        intern_fields(self, ('photo_type',))
 
+@serialized
+@slotted
 @dataclass
 class Outcome:
     outcome_id: str
@@ -147,168 +176,857 @@ class Outcome:
     follow_up_schedule: str
     notes: str
     
-    def to_dict(self):
-        return asdict(self)
+    def __post_init__(self):
+        intern_fields(self, ('retention_appliance',))
+
+# Collection name -> record class, in snapshot order
+COLLECTIONS = {
+    'patients': Patient,
+    'treatment_plans': TreatmentPlan,
+    'appointments': Appointment,
+    'treatment_records': TreatmentRecord,
+    'progress_photos': ProgressPhoto,
+    'outcomes': Outcome,
+}
+
+# Collection name -> fields with a secondary index (field -> normalisation)
+INDEXED_FIELDS = {
+    'patients': {},
+    'treatment_plans': {'patient_id': None, 'status': str.lower},
+    'appointments': {'patient_id': None, 'date': None},
+    'treatment_records': {'patient_id': None},
+    'progress_photos': {'patient_id': None},
+    'outcomes': {'patient_id': None},
+}
+
+# Collections only a few pages read; they are built on first access (and,
+# with an indexed store, read per patient until then)
+LAZY_COLLECTIONS = ('treatment_records', 'progress_photos', 'outcomes')
+
+# Rows per page for the list pages and list API
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Longest date range GET /api/calendar returns
+MAX_CALENDAR_DAYS = 92
+
+# Collections whose writes are checked against every process's data
+# (appointments, for double booking) are never queued: another worker
+# must see them before it checks its own
+SYNCHRONOUS_COLLECTIONS = ('appointments',)
+
+# Patient chart sections: collection -> (per-patient SortedIndex, newest first)
+CHART_SECTIONS = {
+    'treatment_plans': ('by_patient_start', False),
+    'appointments': ('by_patient_time', False),
+    'treatment_records': ('by_patient_date', True),
+    'progress_photos': ('by_patient_date', True),
+}
 
 class OrthodonticsDataManager:
-    def __init__(self, data_file='orthodontics_data.json'):
+    def __init__(self, data_file='orthodontics_data.json', compact_after=500, store=None,
+                 write_delay=None):
         self.data_file = data_file
+        self.store = store or JsonStore(data_file, compact_after=compact_after)
         self.patients = {}
         self.treatment_plans = {}
         self.appointments = {}
         self.treatment_records = {}
         self.progress_photos = {}
         self.outcomes = {}
+        self.indexes = {}
+        # Lazy collections not built yet -> their raw record dicts, or None
+        # when the store can read them on demand
+        self._unloaded = {}
+        self._materialized = set()  # lazy collections built since startup
+        # Bumped by every change to the in-memory data; cached pages
+        # rendered at an older generation are stale
+        self.generation = 0
+        self.modified = time.time()
+        # Writers are serialised by _write_lock and do their store I/O under it;
+        # _rw is only held exclusively while the in-memory dicts are updated,
+        # so readers never wait on disk.
+        self._rw = RWLock()
+        self._write_lock = threading.Lock()
+        self._checkpointing = threading.Lock()
+        # Changes applied in memory but not yet written to the store, in
+        # order; with a write_delay a background thread writes them in bursts
+        self._pending = []
+        # Encoded records for checkpoints; only changed ones are re-encoded
+        self._fragments = FragmentCache()
+        self._writer = WriteBehind(self.flush, write_delay) if write_delay else None
         self.load_data()
     
-    def save_data(self):
-        """Save all data to JSON file"""
-        data = {
-            'patients': {pid: p.to_dict() for pid, p in self.patients.items()},
-            'treatment_plans': {tid: tp.to_dict() for tid, tp in self.treatment_plans.items()},
-            'appointments': {aid: a.to_dict() for aid, a in self.appointments.items()},
-            'treatment_records': {rid: tr.to_dict() for rid, tr in self.treatment_records.items()},
-            'progress_photos': {pid: pp.to_dict() for pid, pp in self.progress_photos.items()},
-            'outcomes': {oid: o.to_dict() for oid, o in self.outcomes.items()}
-        }
+    def save_record(self, collection, record_id, record, durable=False):
+        """Insert or replace a single record and persist the change"""
+        return self.save_records(collection, [(record_id, record)], durable)
+    
+    def save_records(self, collection, items, durable=False):
+        """Insert or replace several records with a single store write.
         
-        try:
-            with open(self.data_file, 'w') as f:
-                json.dump(data, f, indent=2)
+        Raises SchedulingConflict if an appointment would double-book its
+        provider, or ValueError if its date, time or duration cannot be
+        read; nothing is written in either case.  See _persist for when
+        the write happens.
+        """
+        with timed_section('serialize', 'save_records'):
+            rows = [(record_id, record.to_dict()) for record_id, record in items]
+        with self._write_lock, self.store.lock():
+            self._refresh()
+            if collection == 'appointments':
+                conflicts = self.indexes['appointments']['slots'].conflicts(items)
+                if conflicts:
+                    raise SchedulingConflict(conflicts)
+            if collection in self._unloaded:
+                items = rows  # kept as raw dicts until the collection is built
+            # Memory and indexes first, so a record they reject is never stored
+            undo = self._apply([('put', collection, record_id, record) for record_id, record in items])
+            if not self._persist(collection, [('put', collection, rid, row) for rid, row in rows],
+                                 durable):
+                self._apply(undo)
+                return False
+        self._after_write()
+        return True
+    
+    def delete_record(self, collection, record_id, durable=False):
+        """Remove a single record and persist the change"""
+        with self._write_lock, self.store.lock():
+            self._refresh()
+            undo = self._apply([('delete', collection, record_id, None)])
+            if not self._persist(collection, [('delete', collection, record_id, None)], durable):
+                self._apply(undo)
+                return False
+        self._after_write()
+        return True
+    
+    def _persist(self, collection, changes, durable):
+        """Queue changes for the store, writing them now unless write-behind applies.
+        
+        Changes are written before returning (fsynced if durable) when
+        there is no background writer, when durable is set, when the
+        collection is only read back from the store, or when it is in
+        SYNCHRONOUS_COLLECTIONS (always fsynced).  Returns False if that
+        write failed; caller holds the write and store locks.
+        """
+        durable = durable or collection in SYNCHRONOUS_COLLECTIONS
+        self._pending.extend(changes)
+        if (self._writer is not None and not durable
+                and self._unloaded.get(collection, True) is not None):
             return True
+        if self._write_pending(sync=durable):
+            return True
+        del self._pending[-len(changes):]
+        return False
+    
+    def _write_pending(self, sync=False):
+        """Write queued changes to the store; caller holds the write and store locks"""
+        if not self._pending:
+            return True
+        try:
+            with timed_section('store_write', 'write'):
+                self.store.write(self._pending, sync=sync)
         except Exception as e:
             print(f"Save error: {e}")
             return False
+        self._pending = []
+        return True
     
-    def load_data(self):
-        """Load data from JSON file"""
+    def _after_write(self):
+        if self._pending:
+            self._writer.request()
+        else:
+            self._maybe_checkpoint()
+    
+    def flush(self):
+        """Write (and fsync) every queued change; the write-behind thread calls this"""
+        if not self._pending:
+            return True
+        with self._write_lock, self.store.lock():
+            self._refresh()
+            ok = self._write_pending(sync=True)
+        if ok:
+            self._maybe_checkpoint()
+        return ok
+    
+    def close(self):
+        """Write queued changes and stop the write-behind thread"""
+        if self._writer is not None:
+            self._writer.close()
+        return self.flush()
+    
+    def _apply(self, changes):
+        """Apply (op, collection, id, record) changes to memory and indexes.
+        
+        All or nothing: if an index rejects a record, the changes made so
+        far are undone and the error is raised.  Returns the changes that
+        undo these ones.
+        """
+        undo = []
+        with self._rw.write():
+            self._touch()
+            try:
+                for change in changes:
+                    # Taken first, so a change that fails halfway is undone too
+                    undo.append(self._inverse(*change))
+                    self._apply_change(*change)
+            except Exception:
+                for change in reversed(undo):
+                    self._apply_change(*change)
+                raise
+        undo.reverse()
+        return undo
+    
+    def _inverse(self, op, collection, record_id, record):
+        if collection in self._unloaded:
+            records = self._unloaded[collection] or {}
+        else:
+            records = getattr(self, collection)
+        previous = records.get(record_id)
+        if previous is None:
+            return ('delete', collection, record_id, None)
+        return ('put', collection, record_id, previous)
+    
+    def _apply_change(self, op, collection, record_id, record):
+        """Apply one change; caller holds the write lock"""
+        self._fragments.invalidate(collection, record_id)
+        if collection in self._unloaded:
+            raw = self._unloaded[collection]
+            if raw is not None:
+                if op == 'put':
+                    raw[record_id] = record
+                else:
+                    raw.pop(record_id, None)
+            return
+        records = getattr(self, collection)
+        indexes = self.indexes[collection].values()
+        if op == 'put':
+            records[record_id] = record
+            for index in indexes:
+                index.add(record_id, record)
+        else:
+            records.pop(record_id, None)
+            for index in indexes:
+                index.remove(record_id)
+    
+    def _build(self, collection, record_id, r_data):
+        cls = COLLECTIONS[collection]
         try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r') as f:
-                    data = json.load(f)
-                
-                # Load patients
-                for pid, p_data in data.get('patients', {}).items():
-                    self.patients[pid] = Patient(**p_data)
-                
-                # Load treatment plans
-                for tid, tp_data in data.get('treatment_plans', {}).items():
-                    self.treatment_plans[tid] = TreatmentPlan(**tp_data)
-                
-                # Load appointments
-                for aid, a_data in data.get('appointments', {}).items():
-                    self.appointments[aid] = Appointment(**a_data)
-                
-                # Load treatment records
-                for rid, tr_data in data.get('treatment_records', {}).items():
-                    self.treatment_records[rid] = TreatmentRecord(**tr_data)
-                
-                # Load progress photos
-                for pid, pp_data in data.get('progress_photos', {}).items():
-                    self.progress_photos[pid] = ProgressPhoto(**pp_data)
+            return cls.from_dict(r_data)
+        except TypeError as e:
+            error = e
+        try:
+            # Keep whatever the constructor accepts, so no stored record is dropped
+            record = cls(**r_data)
+        except TypeError:
+            print(f"Load error: {collection}/{record_id}: {error}")
+            return None
+        print(f"Load warning: {collection}/{record_id}: {error}; kept as stored")
+        return record
+    
+    @staticmethod
+    def _new_indexes():
+        indexes = {name: {field: FieldIndex(field, key) for field, key in fields.items()}
+                   for name, fields in INDEXED_FIELDS.items()}
+        # Booked time per provider and day, for double-booking checks
+        indexes['appointments']['slots'] = IntervalIndex('provider', 'duration_minutes')
+        # Newest patients for the dashboard
+        indexes['patients']['recent'] = RecentRecords('created_date', size=5)
+        # Type-ahead search over names, emails and phone digits
+        indexes['patients']['search'] = PatientSearchIndex(
+            ('first_name', 'last_name', 'email'), ('phone',),
+            sort_key=lambda p: f"{p.last_name}, {p.first_name}")
+        # Keyset pagination orders for the list pages and API
+        indexes['patients']['by_name'] = SortedIndex(lambda p: f"{p.last_name}, {p.first_name}")
+        indexes['appointments']['by_time'] = SortedIndex(lambda a: f"{a.date} {a.time}")
+        indexes['appointments']['by_patient_time'] = SortedIndex(
+            lambda a: f"{a.date} {a.time}", group_field='patient_id')
+        indexes['treatment_plans']['by_start'] = SortedIndex(lambda tp: tp.start_date)
+        indexes['treatment_plans']['by_status_start'] = SortedIndex(
+            lambda tp: tp.start_date, group_field='status', group_key=str.lower)
+        indexes['treatment_plans']['by_patient_start'] = SortedIndex(
+            lambda tp: tp.start_date, group_field='patient_id')
+        indexes['treatment_records']['by_patient_date'] = SortedIndex(
+            lambda tr: tr.date, group_field='patient_id')
+        indexes['progress_photos']['by_patient_date'] = SortedIndex(
+            lambda pp: pp.date, group_field='patient_id')
+        # Outcomes still in progress sort as newest
+        indexes['outcomes']['by_completion'] = SortedIndex(
+            lambda o: o.completion_date or '9999-12-31')
+        return indexes
+    
+    def _replace_all(self, data):
+        """Swap in a complete data set loaded from the store"""
+        loaded = {}
+        unloaded = {}
+        for name in COLLECTIONS:
+            if name in LAZY_COLLECTIONS and name not in self._materialized:
+                # Still lazy: keep the raw dicts unless the store can re-read them
+                unloaded[name] = None if self.store.lazy_loading else data.get(name, {})
+                continue
+            records = {}
+            for rid, r_data in data.get(name, {}).items():
+                record = self._build(name, rid, r_data)
+                if record is not None:
+                    records[rid] = record
+            loaded[name] = records
+        
+        indexes = self._new_indexes()
+        for name, records in loaded.items():
+            for index in indexes[name].values():
+                index.rebuild(records)
+        
+        with self._rw.write():
+            for name, records in loaded.items():
+                setattr(self, name, records)
+            for name in unloaded:
+                setattr(self, name, {})
+            self.indexes = indexes
+            self._unloaded = unloaded
+            self._fragments.clear()
+            self._touch()
+    
+    def _touch(self):
+        """Record a data change; caller holds the write lock"""
+        self.generation += 1
+        self.modified = time.time()
+    
+    def _materialize(self, collection):
+        """Build a lazy collection and its indexes the first time it is needed whole"""
+        if collection not in self._unloaded:
+            return
+        with self._write_lock:
+            if collection not in self._unloaded:
+                return
+            if self._unloaded[collection] is None:
+                with self.store.lock():
+                    self._refresh()
+                    raw = self.store.load([collection])[collection]
+            else:
+                raw = self._unloaded[collection]
+            
+            records = {}
+            for rid, r_data in raw.items():
+                record = self._build(collection, rid, r_data)
+                if record is not None:
+                    records[rid] = record
+            indexes = self._new_indexes()[collection]
+            for index in indexes.values():
+                index.rebuild(records)
+            
+            with self._rw.write():
+                setattr(self, collection, records)
+                self.indexes[collection] = indexes
+                del self._unloaded[collection]
+                self._materialized.add(collection)
+    
+    def _refresh(self):
+        """Apply writes made by other processes; caller holds the store lock"""
+        full, changes = self.store.changes()
+        if full is not None:
+            self._replace_all(full)
+            changes = list(self._pending)  # queued changes are not in the store yet
+        if changes:
+            built = []
+            for op, collection, record_id, r_data in changes:
+                if collection in self._unloaded:
+                    built.append((op, collection, record_id, r_data))
+                elif op == 'put':
+                    record = self._build(collection, record_id, r_data)
+                    if record is None:
+                        continue
+                    built.append((op, collection, record_id, record))
+                else:
+                    built.append((op, collection, record_id, None))
+            self._apply(built)
+    
+    def refresh(self):
+        """Pick up changes other worker processes wrote to the shared store.
+        
+        Costs a stat (JSON) or a pragma (SQLite) when nothing changed, and
+        is skipped while this process is writing, since writes refresh first.
+        """
+        if not self.store.has_changes():
+            return
+        if not self._write_lock.acquire(blocking=False):
+            return
+        try:
+            with self.store.lock():
+                self._refresh()
+        finally:
+            self._write_lock.release()
+    
+    def _maybe_checkpoint(self):
+        if self.store.needs_checkpoint() and not self._checkpointing.locked():
+            threading.Thread(target=self.save_data, daemon=True).start()
+    
+    def save_data(self):
+        """Checkpoint the store (for JSON, a full snapshot that truncates the journal)"""
+        with self._checkpointing:
+            try:
+                with self._write_lock, self.store.lock():
+                    self._refresh()
+                    if not self.store.begin_checkpoint():
+                        return True
+                    collections = {name: list(getattr(self, name).items())
+                                   for name in COLLECTIONS if name not in self._unloaded}
+                    # Lazy collections that were never built are still raw dicts
+                    collections.update((name, list((records or {}).items()))
+                                       for name, records in self._unloaded.items())
+                    changes = self._fragments.take_dirty()
                 
-                # Load outcomes
-                for oid, o_data in data.get('outcomes', {}).items():
-                    self.outcomes[oid] = Outcome(**o_data)
-                    
-        except Exception as e:
-            print(f"Load error: {e}")
+                with timed_section('serialize', 'checkpoint'):
+                    data, text = self._fragments.encode(collections, changes)
+                with timed_section('checkpoint', 'write_checkpoint'):
+                    self.store.write_checkpoint(data, text)
+            except Exception as e:
+                print(f"Save error: {e}")
+                self._fragments.clear()  # the taken changes were not all encoded
+                return False
+            finally:
+                self.store.end_checkpoint()
+            return True
+    
+    def load_data(self):
+        """Load the collections from the store and rebuild the indexes.
+        
+        With a store that reads on demand, LAZY_COLLECTIONS are left on
+        disk; otherwise their raw dicts are kept and built on first use.
+        """
+        with self.store.lock():
+            if self.store.lazy_loading:
+                data = self.store.load([name for name in COLLECTIONS if name not in LAZY_COLLECTIONS])
+            else:
+                data = self.store.load()
+        self._replace_all(data)
+    
+    @timed('scan')
+    def find(self, collection, field, value):
+        """Return the records of a collection whose indexed field equals value"""
+        if collection in self._unloaded:
+            if field == 'patient_id' and self._unloaded[collection] is None:
+                # One patient's rows straight from the store's index
+                rows = self.store.load_patient(collection, value)
+                records = (self._build(collection, rid, r_data) for rid, r_data in rows.items())
+                return [record for record in records if record is not None]
+            self._materialize(collection)
+        with self._rw.read():
+            records = getattr(self, collection)
+            ids = self.indexes[collection][field].get(value)
+            return [records[rid] for rid in ids]
+    
+    def count(self, collection, field, value):
+        """Count the records of a collection whose indexed field equals value"""
+        self._materialize(collection)
+        with self._rw.read():
+            return self.indexes[collection][field].count(value)
+    
+    @timed('scan')
+    def search_patients(self, query, offset=0, limit=None):
+        """Return (total matches, [Patient]) for a search, best matches first"""
+        with self._rw.read():
+            total, ids = self.indexes['patients']['search'].search(query, offset, limit)
+            return total, [self.patients[pid] for pid in ids]
+    
+    @timed('scan')
+    def page(self, collection, order, after=None, limit=PAGE_SIZE, reverse=False, group=None):
+        """Return ([records], next cursor or None) for one keyset page of a SortedIndex"""
+        self._materialize(collection)
+        with self._rw.read():
+            records = getattr(self, collection)
+            entries, more = self.indexes[collection][order].page(after, limit, reverse, group)
+            next_cursor = encode_cursor(entries[-1]) if more and entries else None
+            return [records[rid] for _, rid in entries], next_cursor
+    
+    @timed('scan')
+    def outcome_stats(self):
+        """Return completed count and average ratings over every outcome"""
+        self._materialize('outcomes')
+        with self._rw.read():
+            completed = 0
+            rating_total = 0
+            satisfaction = []
+            for outcome in self.outcomes.values():
+                if outcome.completion_date:
+                    completed += 1
+                rating_total += outcome.treatment_success_rating
+                if outcome.patient_satisfaction:
+                    satisfaction.append(outcome.patient_satisfaction)
+            count = len(self.outcomes)
+        return {
+            'completed_treatments': completed,
+            'avg_success_rating': rating_total / count if count else 0,
+            'avg_satisfaction': sum(satisfaction) / len(satisfaction) if satisfaction else 0,
+        }
+    
+    @timed('scan')
+    def dashboard(self, today):
+        """Return the dashboard figures without scanning any collection"""
+        with self._rw.read():
+            return {
+                'total_patients': len(self.patients),
+                'active_treatments': self.indexes['treatment_plans']['status'].count('Active'),
+                'today_appointments': self.indexes['appointments']['date'].count(today),
+                'recent_patients': self.indexes['patients']['recent'].newest(self.patients),
+            }
+    
+    @timed('scan')
+    def free_slots(self, provider, start_date, end_date, duration, limit=10, step=30):
+        """Return up to limit free (date, time) slots for a provider"""
+        with self._rw.read():
+            return list(self.indexes['appointments']['slots'].free_slots(
+                provider, start_date, end_date, duration, limit=limit, step=step,
+                not_before=datetime.now()))
+    
+    @timed('scan')
+    def appointments_between(self, start_date, end_date, provider=None):
+        """Return {date: [(Appointment, Patient)]} for every day from start_date to end_date.
+        
+        Dates are inclusive 'YYYY-MM-DD' strings; every day in the range is
+        a key, in order, and each day's appointments are sorted by time.
+        One slice of the by_time index covers the whole range.  Raises
+        ValueError for malformed dates.
+        """
+        first = datetime.strptime(start_date, "%Y-%m-%d")
+        last = datetime.strptime(end_date, "%Y-%m-%d")
+        days = {(first + timedelta(days=i)).strftime("%Y-%m-%d"): []
+                for i in range((last - first).days + 1)}
+        before = (last + timedelta(days=1)).strftime("%Y-%m-%d")
+        with self._rw.read():
+            patients = self.patients
+            for _, apt_id in self.indexes['appointments']['by_time'].between(start_date, before):
+                apt = self.appointments[apt_id]
+                if provider is not None and apt.provider != provider:
+                    continue
+                day = days.get(apt.date)
+                if day is not None:
+                    day.append((apt, patients.get(apt.patient_id)))
+        return days
+    
+    @timed('scan')
+    def patient_chart(self, patient_id):
+        """Return {'patient': Patient, section: [records]} for CHART_SECTIONS, or None.
+        
+        Each section comes pre-sorted from a per-patient index, so a chart
+        costs one lookup per section however long the treatment has run.
+        Lazy collections the store reads on demand are read for just this
+        patient and sorted instead.
+        """
+        from_store = {}
+        for collection, (order, reverse) in CHART_SECTIONS.items():
+            if collection in self._unloaded and self._unloaded[collection] is None:
+                sort_key = self.indexes[collection][order].sort_key
+                from_store[collection] = sorted(self.find(collection, 'patient_id', patient_id),
+                                                key=lambda record: sort_key(record) or '',
+                                                reverse=reverse)
+            else:
+                self._materialize(collection)
+        with self._rw.read():
+            patient = self.patients.get(patient_id)
+            if patient is None:
+                return None
+            chart = {'patient': patient}
+            for collection, (order, reverse) in CHART_SECTIONS.items():
+                if collection in from_store:
+                    chart[collection] = from_store[collection]
+                    continue
+                records = getattr(self, collection)
+                chart[collection] = [records[rid] for rid in
+                                     self.indexes[collection][order].ids(patient_id, reverse)]
+        return chart
+    
+    def scan(self, collection, patient_id=None, start=None, before=None, chunk=500):
+        """Yield the records of a collection for one patient and/or a [start, before) date range.
+        
+        Only the candidate ids are copied up front; records are fetched a
+        chunk at a time so a long export never blocks writers.  A lazy
+        collection that is not built yet stays unbuilt: its rows stream
+        from the store, or from the raw dicts the store loaded, and become
+        records one at a time.
+        """
+        with self._rw.read():
+            unloaded = collection in self._unloaded
+            raw = self._unloaded.get(collection)
+        if unloaded:
+            if raw is None:
+                rows = self.store.scan(collection, patient_id, start, before)
+            else:
+                rows = self._scan_raw(collection, raw, patient_id, start, before, chunk)
+            for record_id, r_data in rows:
+                record = self._build(collection, record_id, r_data)
+                if record is not None:
+                    yield record
+            return
+        
+        columns = SQLITE_COLUMNS[collection]
+        with self._rw.read():
+            records = getattr(self, collection)
+            if patient_id is None:
+                ids = list(records)
+            elif collection == 'patients':
+                ids = [patient_id] if patient_id in records else []
+            else:
+                ids = self.indexes[collection]['patient_id'].get(patient_id)
+        
+        date_field = columns['date'] if start is not None or before is not None else None
+        for i in range(0, len(ids), chunk):
+            with self._rw.read():
+                records = getattr(self, collection)
+                batch = [records[rid] for rid in ids[i:i + chunk] if rid in records]
+            for record in batch:
+                if date_field:
+                    value = getattr(record, date_field, None) or ''
+                    if (start is not None and value < start) or (before is not None and value >= before):
+                        continue
+                yield record
+    
+    def _scan_raw(self, collection, raw, patient_id, start, before, chunk):
+        """Yield matching (record_id, dict) pairs of an unbuilt collection's raw dicts"""
+        with self._rw.read():
+            ids = list(raw)
+        for i in range(0, len(ids), chunk):
+            with self._rw.read():
+                batch = [(rid, raw[rid]) for rid in ids[i:i + chunk] if rid in raw]
+            for record_id, r_data in batch:
+                if record_matches(collection, r_data, patient_id, start, before):
+                    yield record_id, r_data
+    
+    @timed('scan')
+    def all(self, collection):
+        """Return a consistent list of every record in a collection"""
+        self._materialize(collection)
+        with self._rw.read():
+            return list(getattr(self, collection).values())
+
+# Request, template and data manager timings on GET /metrics; registered
+# first so request timings include the refresh hook below
+metrics.install(app, 'orthodontics', gauges={
+    'page_cache_hits': ('Rendered pages served from the page cache', lambda: page_cache.hits),
+    'page_cache_misses': ('Page cache lookups that had to render', lambda: page_cache.misses),
+    'data_generation': ('Data changes applied since startup', lambda: data_manager.generation),
+    'pending_writes': ('Changes applied in memory but not yet written', lambda: len(data_manager._pending)),
+})
+
+# Global data manager; set ORTHO_DATABASE=orthodontics.db to use SQLite,
+# ORTHO_BINARY_SNAPSHOT=0 to keep only the JSON snapshot and
+# ORTHO_WRITE_DELAY_MS=0 to write each change before its response
+data_manager = OrthodonticsDataManager(store=open_store(
+    os.environ.get('ORTHO_DATABASE', 'orthodontics_data.json'),
+    binary_snapshot=os.environ.get('ORTHO_BINARY_SNAPSHOT', '1') != '0'),
+    write_delay=write_delay())
+
+# Rendered schedule and treatment pages, reused until the data changes
+page_cache = PageCache(maxsize=int(os.environ.get('ORTHO_PAGE_CACHE_SIZE', 256)))
+
+@app.before_request
+def refresh_data():
+    """Pick up writes made by other worker processes"""
+    data_manager.refresh()
+
+def page_args():
+    """Return (cursor entry or None, limit) from ?cursor= and ?limit=; raises ValueError"""
+    try:
+        limit = min(max(int(request.args.get('limit', PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    cursor = request.args.get('cursor')
+    return (decode_cursor(cursor) if cursor else None), limit
+
+# Fields every new record must carry, per collection accepted by the API
+REQUIRED_FIELDS = {
+    'patients': ['first_name', 'last_name', 'date_of_birth', 'phone'],
+    'appointments': ['patient_id', 'date', 'time', 'appointment_type'],
+    'treatment_plans': ['patient_id', 'diagnosis', 'treatment_type', 'start_date'],
+}
+
+def missing_field(collection, data):
+    """Return the first required field absent from data, or None"""
+    for field in REQUIRED_FIELDS[collection]:
+        if not data.get(field):
+            return field
+    return None
+
+def new_patient(patient_id, data):
+    return Patient(
+        patient_id=patient_id,
+        first_name=data['first_name'],
+        last_name=data['last_name'],
+        date_of_birth=data['date_of_birth'],
+        phone=data['phone'],
+        email=data.get('email', ''),
+        address=data.get('address', ''),
+        emergency_contact=data.get('emergency_contact', ''),
+        emergency_phone=data.get('emergency_phone', ''),
+        insurance_provider=data.get('insurance_provider', ''),
+        insurance_id=data.get('insurance_id', ''),
+        medical_history=data.get('medical_history', ''),
+        allergies=data.get('allergies', ''),
+        referral_source=data.get('referral_source', ''),
+        created_date=datetime.now().isoformat(),
+        notes=data.get('notes', '')
+    )
+
+def new_appointment(appointment_id, data):
+    # A slot the double-booking check cannot read must never be stored
+    if data['patient_id'] not in data_manager.patients:
+        raise ValueError('Invalid patient')
+    return Appointment(
+        appointment_id=appointment_id,
+        patient_id=data['patient_id'],
+        date=check_date(data['date']),
+        time=check_time(data['time']),
+        duration_minutes=check_duration(data.get('duration_minutes', 60), 'duration_minutes'),
+        appointment_type=data['appointment_type'],
+        provider=data.get('provider', 'Dr. Smith'),
+        status=data.get('status', 'Scheduled'),
+        notes=data.get('notes', ''),
+        treatment_notes=data.get('treatment_notes', ''),
+        next_appointment_recommended=data.get('next_appointment_recommended', '')
+    )
+
+def new_treatment_plan(plan_id, data):
+    return TreatmentPlan(
+        plan_id=plan_id,
+        patient_id=data['patient_id'],
+        diagnosis=data['diagnosis'],
+        treatment_type=data['treatment_type'],
+        start_date=data['start_date'],
+        estimated_duration_months=int(data.get('estimated_duration_months', 18)),
+        total_cost=float(data.get('total_cost', 0)),
+        insurance_coverage=float(data.get('insurance_coverage', 0)),
+        payment_plan=data.get('payment_plan', ''),
+        treatment_goals=data.get('treatment_goals', ''),
+        appliances_needed=data.get('appliances_needed', []),
+        phases=data.get('phases', []),
+        status=data.get('status', 'Planned'),
+        notes=data.get('notes', ''),
+        created_date=datetime.now().isoformat()
+    )
+
+# Collection -> (record builder, id field) for the create and bulk import APIs
+RECORD_BUILDERS = {
+    'patients': (new_patient, 'patient_id'),
+    'appointments': (new_appointment, 'appointment_id'),
+    'treatment_plans': (new_treatment_plan, 'plan_id'),
+}
+
+# How API errors name the JSON type a field needs
+TYPE_NAMES = {str: 'a string', int: 'a number', float: 'a number', bool: 'true or false',
+              list: 'a list', dict: 'an object'}
+
+def build_record(collection, record_id, data):
+    """Check an API row and build its record; raises ValueError with the client error.
+    
+    Nulls count as absent fields, so the builder's defaults apply.  Numbers
+    may be sent as strings; every other field needs its model's JSON type,
+    so nothing is stored that from_dict() would reject on the next load.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Request body must be a JSON object')
+    data = {key: value for key, value in data.items() if value is not None}
+    field = missing_field(collection, data)
+    if field:
+        raise ValueError(f'{field} is required')
+    types = field_types(COLLECTIONS[collection])
+    for name, value in data.items():
+        expected = types.get(name)
+        if expected is None:
+            continue
+        if expected in (int, float):
+            valid = type(value) in (int, float, str)
+        else:
+            valid = type(value) is expected
+        if not valid:
+            raise ValueError(f'{name} must be {TYPE_NAMES[expected]}')
+    builder = RECORD_BUILDERS[collection][0]
+    try:
+        return builder(record_id, data)
+    except (TypeError, ValueError) as e:
+        raise ValueError(str(e))
 
-# Global data manager
-data_manager = OrthodonticsDataManager()
+def render_page(template, rows_template, next_url, **context):
+    """Render a list page, or only the next rows when its Load more button asks"""
+    if request.args.get('partial'):
+        response = make_response(render_template(rows_template, **context))
+        if next_url:
+            response.headers['X-Next-Page'] = next_url
+        return response
+    return render_template(template, next_url=next_url, **context)
 
 # Routes
 @app.route('/')
 def index():
     """Dashboard with practice overview"""
-    total_patients = len(data_manager.patients)
-    active_treatments = len([tp for tp in data_manager.treatment_plans.values() if tp.status == "Active"])
     today = datetime.now().strftime("%Y-%m-%d")
-    today_appointments = [a for a in data_manager.appointments.values() if a.date == today]
-    
-    # Recent activity
-    recent_patients = sorted(data_manager.patients.values(), key=lambda x: x.created_date, reverse=True)[:5]
+    stats = data_manager.dashboard(today)
     
     return render_template('orthodontics/dashboard.html',
-                         total_patients=total_patients,
-                         active_treatments=active_treatments,
-                         today_appointments=len(today_appointments),
-                         recent_patients=recent_patients)
+                         total_patients=stats['total_patients'],
+                         active_treatments=stats['active_treatments'],
+                         today_appointments=stats['today_appointments'],
+                         recent_patients=stats['recent_patients'])
 
 @app.route('/patients')
 def patients():
     """Patient management"""
     search = request.args.get('search', '').lower()
+    try:
+        after, limit = page_args()
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return redirect(url_for('patients'))
     
-    filtered_patients = []
-    for patient in data_manager.patients.values():
-        if (not search or 
-            search in patient.full_name.lower() or 
-            search in patient.phone or 
-            search in patient.email.lower()):
-            filtered_patients.append(patient.to_dict())
-    
-    filtered_patients.sort(key=lambda x: f"{x['last_name']}, {x['first_name']}")
+    if search:
+        total, matches = data_manager.search_patients(search, offset, limit)
+        next_url = url_for('patients', search=search, offset=offset + limit) if offset + limit < total else None
+    else:
+        total = len(data_manager.patients)
+        matches, next_cursor = data_manager.page('patients', 'by_name', after, limit)
+        next_url = url_for('patients', cursor=next_cursor) if next_cursor else None
     
-    return render_template('orthodontics/patients.html', 
-                         patients=filtered_patients, 
-                         search=search)
+    return render_page('orthodontics/patients.html', 'orthodontics/_patient_rows.html', next_url,
+                       patients=matches,
+                       total_patients=total,
+                       search=search,
+                       page_size=limit)
 
 @app.route('/patient/<patient_id>')
 def patient_detail(patient_id):
     """Individual patient detail view"""
-    patient = data_manager.patients.get(patient_id)
-    if not patient:
+    chart = data_manager.patient_chart(patient_id)
+    if chart is None:
         return redirect(url_for('patients'))
     
-    # Get patient's treatment plans
-    patient_plans = [tp for tp in data_manager.treatment_plans.values() if tp.patient_id == patient_id]
-    
-    # Get patient's appointments
-    patient_appointments = [a for a in data_manager.appointments.values() if a.patient_id == patient_id]
-    patient_appointments.sort(key=lambda x: f"{x.date} {x.time}")
-    
-    # Get treatment records
-    treatment_records = [tr for tr in data_manager.treatment_records.values() if tr.patient_id == patient_id]
-    treatment_records.sort(key=lambda x: x.date, reverse=True)
-    
-    # Get progress photos
-    progress_photos = [pp for pp in data_manager.progress_photos.values() if pp.patient_id == patient_id]
-    progress_photos.sort(key=lambda x: x.date, reverse=True)
-    
     return render_template('orthodontics/patient_detail.html',
-                         patient=patient.to_dict(),
-                         treatment_plans=patient_plans,
-                         appointments=patient_appointments,
-                         treatment_records=treatment_records,
-                         progress_photos=progress_photos)
+                         patient=chart['patient'].to_dict(),
+                         treatment_plans=chart['treatment_plans'],
+                         appointments=chart['appointments'],
+                         treatment_records=chart['treatment_records'],
+                         progress_photos=chart['progress_photos'])
 
 @app.route('/schedule')
+@cached_page(page_cache, data_manager)
 def schedule():
     """Appointment scheduling view"""
     selected_date = request.args.get('date', datetime.now().strftime("%Y-%m-%d"))
     view_type = request.args.get('view', 'day')
     
-    if view_type == 'week':
-        # Week view
+    if view_type in ('week', 'month'):
+        # One pass over the by_time index for the whole week or month
         start_date = datetime.strptime(selected_date, "%Y-%m-%d")
-        week_appointments = {}
+        if view_type == 'month':
+            start_date = start_date.replace(day=1)
+            end_date = start_date.replace(day=calendar.monthrange(start_date.year, start_date.month)[1])
+        else:
+            end_date = start_date + timedelta(days=6)
+        days = data_manager.appointments_between(start_date.strftime("%Y-%m-%d"),
+                                                 end_date.strftime("%Y-%m-%d"),
+                                                 request.args.get('provider') or None)
         
-        for i in range(7):
-            current_date = (start_date + timedelta(days=i)).strftime("%Y-%m-%d")
-            day_appointments = []
-            
-            for apt in data_manager.appointments.values():
-                if apt.date == current_date:
-                    patient = data_manager.patients.get(apt.patient_id)
-                    if patient:
-                        apt_dict = apt.to_dict()
-                        apt_dict['patient_name'] = patient.full_name
-                        apt_dict['patient_phone'] = patient.phone
-                        day_appointments.append(apt_dict)
-            
-            day_appointments.sort(key=lambda x: x['time'])
-            week_appointments[current_date] = day_appointments
+        week_appointments = {}
+        for date, appointments in days.items():
+            week_appointments[date] = [RecordView(apt, patient_name=patient.full_name,
+                                                  patient_phone=patient.phone)
+                                       for apt, patient in appointments if patient]
         
         return render_template('orthodontics/schedule.html',
                              week_appointments=week_appointments,
@@ -317,16 +1035,13 @@ def schedule():
     else:
         # Day view
         day_appointments = []
-        for apt in data_manager.appointments.values():
-            if apt.date == selected_date:
-                patient = data_manager.patients.get(apt.patient_id)
-                if patient:
-                    apt_dict = apt.to_dict()
-                    apt_dict['patient_name'] = patient.full_name
-                    apt_dict['patient_phone'] = patient.phone
-                    day_appointments.append(apt_dict)
+        for apt in data_manager.find('appointments', 'date', selected_date):
+            patient = data_manager.patients.get(apt.patient_id)
+            if patient:
+                day_appointments.append(RecordView(apt, patient_name=patient.full_name,
+                                                   patient_phone=patient.phone))
         
-        day_appointments.sort(key=lambda x: x['time'])
+        day_appointments.sort(key=lambda x: x.time)
         
         return render_template('orthodontics/schedule.html',
                              appointments=day_appointments,
@@ -334,186 +1049,265 @@ def schedule():
                              view_type=view_type)
 
 @app.route('/treatments')
+@cached_page(page_cache, data_manager)
 def treatments():
     """Treatment planning and management"""
     status_filter = request.args.get('status', 'all')
+    try:
+        after, limit = page_args()
+    except ValueError:
+        return redirect(url_for('treatments'))
     
-    treatment_plans = list(data_manager.treatment_plans.values())
+    # Newest start date first, one page at a time
     if status_filter != 'all':
-        treatment_plans = [tp for tp in treatment_plans if tp.status.lower() == status_filter.lower()]
+        plans, next_cursor = data_manager.page('treatment_plans', 'by_status_start', after, limit,
+                                               reverse=True, group=status_filter.lower())
+    else:
+        plans, next_cursor = data_manager.page('treatment_plans', 'by_start', after, limit, reverse=True)
+    next_url = url_for('treatments', status=status_filter, cursor=next_cursor) if next_cursor else None
     
-    # Add patient names to treatment plans
-    for tp in treatment_plans:
+    # Add patient names for display without touching the shared records
+    treatment_plans = []
+    for tp in plans:
         patient = data_manager.patients.get(tp.patient_id)
-        if patient:
-            tp.patient_name = patient.full_name
-        else:
-            tp.patient_name = "Unknown Patient"
+        treatment_plans.append(RecordView(
+            tp, patient_name=patient.full_name if patient else "Unknown Patient"))
     
-    treatment_plans.sort(key=lambda x: x.start_date, reverse=True)
+    status_counts = {status: data_manager.count('treatment_plans', 'status', status)
+                     for status in ('planned', 'active', 'completed', 'discontinued')}
+    if status_filter != 'all':
+        total_plans = data_manager.count('treatment_plans', 'status', status_filter)
+    else:
+        total_plans = len(data_manager.treatment_plans)
     
-    return render_template('orthodontics/treatments.html',
-                         treatment_plans=treatment_plans,
-                         status_filter=status_filter)
+    return render_page('orthodontics/treatments.html', 'orthodontics/_treatment_rows.html', next_url,
+                       treatment_plans=treatment_plans,
+                       status_counts=status_counts,
+                       total_plans=total_plans,
+                       status_filter=status_filter)
 
 @app.route('/outcomes')
 def outcomes():
     """Treatment outcomes and analytics"""
-    outcomes_list = list(data_manager.outcomes.values())
+    try:
+        after, limit = page_args()
+    except ValueError:
+        return redirect(url_for('outcomes'))
+    
+    # Newest completion first; outcomes still in progress come first
+    page_outcomes, next_cursor = data_manager.page('outcomes', 'by_completion', after, limit, reverse=True)
+    next_url = url_for('outcomes', cursor=next_cursor) if next_cursor else None
     
     # Add patient and treatment plan info
-    for outcome in outcomes_list:
+    outcomes_list = []
+    for outcome in page_outcomes:
         patient = data_manager.patients.get(outcome.patient_id)
         treatment_plan = data_manager.treatment_plans.get(outcome.treatment_plan_id)
         
+        joined = {}
         if patient:
-            outcome.patient_name = patient.full_name
+            joined['patient_name'] = patient.full_name
         if treatment_plan:
-            outcome.treatment_type = treatment_plan.treatment_type
-    
-    # Sort by completion date, handle None values
-    outcomes_list.sort(key=lambda x: x.completion_date if x.completion_date else '9999-12-31', reverse=True)
-    
-    # Calculate statistics
-    completed_treatments = len([o for o in outcomes_list if o.completion_date])
-    if outcomes_list:
-        avg_success_rating = sum(o.treatment_success_rating for o in outcomes_list) / len(outcomes_list)
-        # Only calculate satisfaction for outcomes that have ratings
-        satisfaction_ratings = [o.patient_satisfaction for o in outcomes_list if o.patient_satisfaction]
-        avg_satisfaction = sum(satisfaction_ratings) / len(satisfaction_ratings) if satisfaction_ratings else 0
-    else:
-        avg_success_rating = 0
-        avg_satisfaction = 0
+            joined['treatment_type'] = treatment_plan.treatment_type
+        outcomes_list.append(RecordView(outcome, **joined))
     
-    # Get all patients for the outcome form
-    patients_list = list(data_manager.patients.values())
+    stats = data_manager.outcome_stats()
     
-    return render_template('orthodontics/outcomes.html',
-                         outcomes=outcomes_list,
-                         completed_treatments=completed_treatments,
-                         avg_success_rating=round(avg_success_rating, 1),
-                         avg_satisfaction=round(avg_satisfaction, 1),
-                         patients=patients_list)
+    return render_page('orthodontics/outcomes.html', 'orthodontics/_outcome_rows.html', next_url,
+                       outcomes=outcomes_list,
+                       completed_treatments=stats['completed_treatments'],
+                       avg_success_rating=round(stats['avg_success_rating'], 1),
+                       avg_satisfaction=round(stats['avg_satisfaction'], 1))
 
 # API Routes
 @app.route('/api/patients', methods=['POST'])
 def api_add_patient():
     """Add a new patient"""
-    data = request.get_json()
-    
-    # Validate required fields
-    required_fields = ['first_name', 'last_name', 'date_of_birth', 'phone']
-    for field in required_fields:
-        if not data.get(field):
-            return jsonify({'success': False, 'error': f'{field} is required'}), 400
-    
     patient_id = str(uuid.uuid4())
-    patient = Patient(
-        patient_id=patient_id,
-        first_name=data['first_name'],
-        last_name=data['last_name'],
-        date_of_birth=data['date_of_birth'],
-        phone=data['phone'],
-        email=data.get('email', ''),
-        address=data.get('address', ''),
-        emergency_contact=data.get('emergency_contact', ''),
-        emergency_phone=data.get('emergency_phone', ''),
-        insurance_provider=data.get('insurance_provider', ''),
-        insurance_id=data.get('insurance_id', ''),
-        medical_history=data.get('medical_history', ''),
-        allergies=data.get('allergies', ''),
-        referral_source=data.get('referral_source', ''),
-        created_date=datetime.now().isoformat(),
-        notes=data.get('notes', '')
-    )
-    
-    data_manager.patients[patient_id] = patient
+    try:
+        patient = build_record('patients', patient_id, request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     
-    if data_manager.save_data():
+    if data_manager.save_record('patients', patient_id, patient, durable_requested()):
         return jsonify({'success': True, 'patient': patient.to_dict()})
     else:
         return jsonify({'success': False, 'error': 'Failed to save data'}), 500
 
+@app.route('/api/patients', methods=['GET'])
+def api_list_patients():
+    """List patients by last name, one keyset page at a time"""
+    try:
+        after, limit = page_args()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    page_patients, next_cursor = data_manager.page('patients', 'by_name', after, limit)
+    
+    return jsonify({'success': True,
+                    'total': len(data_manager.patients),
+                    'patients': [patient.to_dict() for patient in page_patients],
+                    'next_cursor': next_cursor})
+
+@app.route('/api/patients/<patient_id>/chart', methods=['GET'])
+def api_patient_chart(patient_id):
+    """A patient's plans, appointments, treatment records and photos in one response"""
+    chart = data_manager.patient_chart(patient_id)
+    if chart is None:
+        return jsonify({'success': False, 'error': 'Patient not found'}), 404
+    
+    return jsonify({'success': True,
+                    'patient': chart['patient'].to_dict(),
+                    'treatment_plans': [tp.to_dict() for tp in chart['treatment_plans']],
+                    'appointments': [apt.to_dict() for apt in chart['appointments']],
+                    'treatment_records': [tr.to_dict() for tr in chart['treatment_records']],
+                    'progress_photos': [pp.to_dict() for pp in chart['progress_photos']]})
+
+@app.route('/api/patients/search', methods=['GET'])
+def api_search_patients():
+    """Type-ahead patient search with ranked, paginated results"""
+    query = request.args.get('q', '')
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'offset and limit must be integers'}), 400
+    
+    total, matches = data_manager.search_patients(query, offset, limit)
+    
+    return jsonify({'success': True,
+                    'total': total,
+                    'offset': offset,
+                    'patients': [patient.to_dict() for patient in matches]})
+
 @app.route('/api/appointments', methods=['POST'])
 def api_add_appointment():
     """Schedule a new appointment"""
-    data = request.get_json()
-    
-    required_fields = ['patient_id', 'date', 'time', 'appointment_type']
-    for field in required_fields:
-        if not data.get(field):
-            return jsonify({'success': False, 'error': f'{field} is required'}), 400
-    
     appointment_id = str(uuid.uuid4())
-    appointment = Appointment(
-        appointment_id=appointment_id,
-        patient_id=data['patient_id'],
-        date=data['date'],
-        time=data['time'],
-        duration_minutes=int(data.get('duration_minutes', 60)),
-        appointment_type=data['appointment_type'],
-        provider=data.get('provider', 'Dr. Smith'),
-        status=data.get('status', 'Scheduled'),
-        notes=data.get('notes', ''),
-        treatment_notes=data.get('treatment_notes', ''),
-        next_appointment_recommended=data.get('next_appointment_recommended', '')
-    )
+    try:
+        appointment = build_record('appointments', appointment_id, request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     
-    data_manager.appointments[appointment_id] = appointment
+    try:
+        saved = data_manager.save_record('appointments', appointment_id, appointment, durable_requested())
+    except SchedulingConflict as e:
+        return jsonify({'success': False, 'error': str(e),
+                        'conflicts': e.conflicts[appointment_id]}), 409
     
-    if data_manager.save_data():
+    if saved:
         return jsonify({'success': True, 'appointment': appointment.to_dict()})
     else:
         return jsonify({'success': False, 'error': 'Failed to save data'}), 500
 
+@app.route('/api/appointments', methods=['GET'])
+def api_list_appointments():
+    """List appointments by date and time, optionally for one patient or from a date"""
+    try:
+        after, limit = page_args()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    patient_id = request.args.get('patient_id')
+    if after is None and request.args.get('from'):
+        after = (request.args['from'],)  # sorts before every time on that date
+    
+    if patient_id:
+        page_appointments, next_cursor = data_manager.page(
+            'appointments', 'by_patient_time', after, limit, group=patient_id)
+    else:
+        page_appointments, next_cursor = data_manager.page('appointments', 'by_time', after, limit)
+    
+    return jsonify({'success': True,
+                    'appointments': [apt.to_dict() for apt in page_appointments],
+                    'next_cursor': next_cursor})
+
+@app.route('/api/calendar', methods=['GET'])
+def api_calendar():
+    """Appointments grouped by day for a date range, optionally for one provider"""
+    start_date = request.args.get('start', datetime.now().strftime("%Y-%m-%d"))
+    try:
+        end_date = request.args.get(
+            'end', (datetime.strptime(start_date, "%Y-%m-%d") + timedelta(days=6)).strftime("%Y-%m-%d"))
+        days = (datetime.strptime(end_date, "%Y-%m-%d") - datetime.strptime(start_date, "%Y-%m-%d")).days + 1
+    except ValueError:
+        return jsonify({'success': False, 'error': 'start and end must be YYYY-MM-DD dates'}), 400
+    if not 1 <= days <= MAX_CALENDAR_DAYS:
+        return jsonify({'success': False,
+                        'error': f'the range must cover 1 to {MAX_CALENDAR_DAYS} days'}), 400
+    
+    calendar_days = {}
+    for date, appointments in data_manager.appointments_between(
+            start_date, end_date, request.args.get('provider') or None).items():
+        calendar_days[date] = [dict(apt.to_dict(),
+                                    patient_name=patient.full_name if patient else 'Unknown Patient')
+                               for apt, patient in appointments]
+    
+    return jsonify({'success': True, 'start': start_date, 'end': end_date, 'days': calendar_days})
+
 @app.route('/api/treatment-plans', methods=['POST'])
 def api_add_treatment_plan():
     """Create a new treatment plan"""
-    data = request.get_json()
-    
-    required_fields = ['patient_id', 'diagnosis', 'treatment_type', 'start_date']
-    for field in required_fields:
-        if not data.get(field):
-            return jsonify({'success': False, 'error': f'{field} is required'}), 400
-    
     plan_id = str(uuid.uuid4())
-    treatment_plan = TreatmentPlan(
-        plan_id=plan_id,
-        patient_id=data['patient_id'],
-        diagnosis=data['diagnosis'],
-        treatment_type=data['treatment_type'],
-        start_date=data['start_date'],
-        estimated_duration_months=int(data.get('estimated_duration_months', 18)),
-        total_cost=float(data.get('total_cost', 0)),
-        insurance_coverage=float(data.get('insurance_coverage', 0)),
-        payment_plan=data.get('payment_plan', ''),
-        treatment_goals=data.get('treatment_goals', ''),
-        appliances_needed=data.get('appliances_needed', []),
-        phases=data.get('phases', []),
-        status=data.get('status', 'Planned'),
-        notes=data.get('notes', ''),
-        created_date=datetime.now().isoformat()
-    )
-    
-    data_manager.treatment_plans[plan_id] = treatment_plan
+    try:
+        treatment_plan = build_record('treatment_plans', plan_id, request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     
-    if data_manager.save_data():
+    if data_manager.save_record('treatment_plans', plan_id, treatment_plan, durable_requested()):
         return jsonify({'success': True, 'treatment_plan': treatment_plan.to_dict()})
     else:
         return jsonify({'success': False, 'error': 'Failed to save data'}), 500
 
 @app.route('/api/treatment-plans', methods=['GET'])
 def api_get_treatment_plans():
-    """Get treatment plans for a patient"""
+    """List treatment plans, newest start date first, for a patient or a status"""
+    try:
+        after, limit = page_args()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     patient_id = request.args.get('patient_id')
+    status = request.args.get('status')
+    
+    if patient_id and status:
+        return jsonify({'success': False, 'error': 'Filter by patient_id or status, not both'}), 400
+    if patient_id:
+        plans, next_cursor = data_manager.page('treatment_plans', 'by_patient_start', after, limit,
+                                               reverse=True, group=patient_id)
+    elif status:
+        plans, next_cursor = data_manager.page('treatment_plans', 'by_status_start', after, limit,
+                                               reverse=True, group=status.lower())
+    else:
+        plans, next_cursor = data_manager.page('treatment_plans', 'by_start', after, limit, reverse=True)
     
-    if not patient_id:
-        return jsonify({'success': False, 'error': 'patient_id is required'}), 400
+    return jsonify({'success': True,
+                    'treatment_plans': [tp.to_dict() for tp in plans],
+                    'next_cursor': next_cursor})
+
+@app.route('/api/availability', methods=['GET'])
+def api_availability():
+    """Find the first free appointment slots for a provider"""
+    start_date = request.args.get('start', datetime.now().strftime("%Y-%m-%d"))
+    try:
+        end_date = request.args.get(
+            'end', (datetime.strptime(start_date, "%Y-%m-%d") + timedelta(days=13)).strftime("%Y-%m-%d"))
+        duration = int(request.args.get('duration', 60))
+        limit = min(int(request.args.get('limit', 10)), 100)
+        step = int(request.args.get('step', 30))
+        days = (datetime.strptime(end_date, "%Y-%m-%d") - datetime.strptime(start_date, "%Y-%m-%d")).days + 1
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid date or number'}), 400
+    if duration <= 0 or step <= 0:
+        return jsonify({'success': False, 'error': 'duration and step must be positive'}), 400
+    if not 1 <= days <= MAX_SEARCH_DAYS:
+        return jsonify({'success': False,
+                        'error': f'the range must cover 1 to {MAX_SEARCH_DAYS} days'}), 400
     
-    patient_plans = [tp.to_dict() for tp in data_manager.treatment_plans.values() 
-                     if tp.patient_id == patient_id]
+    provider = request.args.get('provider', 'Dr. Smith')
+    slots = data_manager.free_slots(provider, start_date, end_date, duration, limit=limit, step=step)
     
-    return jsonify(patient_plans)
+    return jsonify({'success': True,
+                    'slots': [{'date': date, 'time': time, 'provider': provider}
+                              for date, time in slots]})
 
 @app.route('/api/outcomes', methods=['POST'])
 def api_add_outcome():
@@ -541,9 +1335,7 @@ def api_add_outcome():
         created_date=datetime.now().isoformat()
     )
     
-    data_manager.outcomes[outcome_id] = outcome
-    
-    if data_manager.save_data():
+    if data_manager.save_record('outcomes', outcome_id, outcome, durable_requested()):
         return jsonify({'success': True, 'outcome': outcome.to_dict()})
     else:
         return jsonify({'success': False, 'error': 'Failed to save data'}), 500
@@ -572,9 +1364,7 @@ def api_add_treatment_record():
         notes=data.get('notes', '')
     )
     
-    data_manager.treatment_records[record_id] = treatment_record
-    
-    if data_manager.save_data():
+    if data_manager.save_record('treatment_records', record_id, treatment_record, durable_requested()):
         return jsonify({'success': True, 'treatment_record': treatment_record.to_dict()})
     else:
         return jsonify({'success': False, 'error': 'Failed to save data'}), 500
@@ -601,12 +1391,121 @@ def api_add_progress_photo():
         created_date=datetime.now().isoformat()
     )
     
-    data_manager.progress_photos[photo_id] = progress_photo
-    
-    if data_manager.save_data():
+    if data_manager.save_record('progress_photos', photo_id, progress_photo, durable_requested()):
         return jsonify({'success': True, 'progress_photo': progress_photo.to_dict()})
     else:
         return jsonify({'success': False, 'error': 'Failed to save data'}), 500
 
+@app.route('/api/export/<collection>', methods=['GET'])
+def api_export(collection):
+    """Stream a collection as NDJSON or CSV, optionally for one patient and a date range"""
+    name = collection.replace('-', '_')
+    if name not in COLLECTIONS:
+        return jsonify({'success': False, 'error': f'Unknown collection {collection}'}), 404
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': 'format must be ndjson or csv'}), 400
+    try:
+        start, before = date_range(request.args.get('from'), request.args.get('to'))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'from and to must be YYYY-MM-DD dates'}), 400
+    
+    records = data_manager.scan(name, request.args.get('patient_id'), start, before)
+    columns = [field.name for field in fields(COLLECTIONS[name])]
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    
+    return Response(export_chunks((record.to_dict() for record in records), export_format, columns),
+                    mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={collection}.{extension}'})
+
+def read_bulk_rows():
+    """Return ([(row number, row)], [errors]) from a JSON array or NDJSON body.
+    
+    Raises ValueError if the body is neither.  NDJSON lines that are not
+    valid JSON are reported as row errors instead of failing the import.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        rows, errors = [], []
+        number = 0
+        for line in request.stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append((number, json.loads(line)))
+            except ValueError:
+                errors.append({'row': number, 'error': 'Invalid JSON'})
+            number += 1
+        return rows, errors
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        raise ValueError('Request body must be a JSON array or NDJSON (application/x-ndjson)')
+    return list(enumerate(data)), []
+
+def bulk_import(collection):
+    """Validate every row, then save the valid ones with a single store write"""
+    try:
+        rows, errors = read_bulk_rows()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    id_field = RECORD_BUILDERS[collection][1]
+    existing = getattr(data_manager, collection)
+    items = []
+    row_numbers = {}  # record id -> row number, for error reports
+    for number, data in rows:
+        if not isinstance(data, dict):
+            errors.append({'row': number, 'error': 'Row must be a JSON object'})
+            continue
+        # Rows may keep their ids so migrated records still reference each other
+        record_id = str(data.get(id_field) or uuid.uuid4())
+        if record_id in existing or record_id in row_numbers:
+            errors.append({'row': number, 'error': f'{id_field} {record_id} already exists'})
+            continue
+        try:
+            record = build_record(collection, record_id, data)
+        except ValueError as e:
+            errors.append({'row': number, 'error': str(e)})
+            continue
+        items.append((record_id, record))
+        row_numbers[record_id] = number
+    
+    # Double-booked appointments are reported and the rest are saved
+    while items:
+        try:
+            if not data_manager.save_records(collection, items, durable_requested()):
+                return jsonify({'success': False, 'error': 'Failed to save data'}), 500
+            break
+        except SchedulingConflict as e:
+            for record_id, conflicting in e.conflicts.items():
+                errors.append({'row': row_numbers[record_id], 'error': str(e), 'conflicts': conflicting})
+            items = [(record_id, record) for record_id, record in items if record_id not in e.conflicts]
+    
+    errors.sort(key=lambda error: error['row'])
+    result = {'success': not errors,
+              'imported': len(items),
+              'ids': [record_id for record_id, _ in items],
+              'errors': errors}
+    if errors and not items:
+        return jsonify(result), 400
+    return jsonify(result)
+
+@app.route('/api/bulk/patients', methods=['POST'])
+def api_bulk_patients():
+    """Import many patients at once"""
+    return bulk_import('patients')
+
+@app.route('/api/bulk/appointments', methods=['POST'])
+def api_bulk_appointments():
+    """Import many appointments at once, skipping double-booked ones"""
+    return bulk_import('appointments')
+
+@app.route('/api/bulk/treatment-plans', methods=['POST'])
+def api_bulk_treatment_plans():
+    """Import many treatment plans at once"""
+    return bulk_import('treatment_plans')
+
 if __name__ == '__main__':
+    install_signal_handlers()
     app.run(debug=True, port=5001)
@@ -0,0 +1,101 @@
+"""
+In-process cache of rendered HTML pages, invalidated by data changes.
+
+Each data manager keeps a generation counter that every mutation (and
+every reload of changes made by another worker) bumps.  A cached page
+remembers the generation it was rendered at and is served again only
+while the generation is unchanged, so there is no per-route invalidation
+to keep in sync with the write paths.
+
+Responses carry an ETag (a hash of the page) and Last-Modified (the time
+of the last data change) with Cache-Control: no-cache, so browsers and
+the front desk's auto-refresh revalidate and get 304 Not Modified when
+the data has not moved.  The ETag depends only on the page content, so it
+stays valid across worker processes.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from functools import wraps
+
+from flask import make_response, request
+
+# Response headers kept with a cached page, e.g. the Load More link
+CACHED_HEADERS = ('X-Next-Page',)
+
+
+class PageCache:
+    """Bounded LRU mapping of key -> (generation, body, headers, etag, mimetype)"""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, generation):
+        """Return the entry for key if it was rendered at generation, else None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != generation:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def cached_page(cache, data):
+    """Decorator for HTML views whose output depends only on the query string and data.
+
+    data is the app's data manager; it must provide .generation and
+    .modified (a POSIX timestamp).  Today's date is part of the key
+    because views default their date to today.  Only 200 responses are
+    cached.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (request.path, tuple(sorted(request.args.items(multi=True))),
+                   date.today().isoformat())
+            generation = data.generation
+            entry = cache.get(key, generation)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.direct_passthrough:
+                    return response
+                body = response.get_data()
+                headers = [(name, response.headers[name]) for name in CACHED_HEADERS
+                           if name in response.headers]
+                entry = (generation, body, headers, hashlib.sha1(body).hexdigest(),
+                         response.mimetype)
+                cache.put(key, entry)
+            _, body, headers, etag, mimetype = entry
+
+            response = make_response(body)
+            response.mimetype = mimetype
+            for name, value in headers:
+                response.headers[name] = value
+            response.set_etag(etag)
+            response.last_modified = datetime.fromtimestamp(data.modified, timezone.utc)
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
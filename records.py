@@ -0,0 +1,154 @@
+"""
+Helpers for compact in-memory records.
+
+slotted() rebuilds a dataclass with __slots__ so instances carry no
+per-instance __dict__ (what dataclass(slots=True) does on Python 3.10+,
+kept here because the app supports 3.7).  intern_fields() makes records
+share one string object per distinct value of low-cardinality fields such
+as status or provider.  serialized() generates a class's to_dict() and
+from_dict() from its fields.  RecordView pairs a record with display fields
+joined from other records, so route handlers never set attributes on the
+shared records the data manager holds.
+"""
+
+import sys
+from dataclasses import MISSING, fields
+
+# Field annotations from_dict() checks (List[str] counts as list)
+_CHECKED_TYPES = (str, int, float, bool, list, dict)
+
+
+def slotted(cls):
+    """Class decorator: return a copy of dataclass cls that uses __slots__"""
+    names = tuple(field.name for field in fields(cls))
+    namespace = dict(cls.__dict__)
+    for name in names:
+        # Defaults live in the generated __init__; as class attributes they
+        # would clash with the slot descriptors
+        namespace.pop(name, None)
+    namespace.pop('__dict__', None)
+    namespace.pop('__weakref__', None)
+    namespace['__slots__'] = names
+    new_cls = type(cls)(cls.__name__, cls.__bases__, namespace)
+    new_cls.__qualname__ = cls.__qualname__
+    return new_cls
+
+
+def _checked_type(annotation):
+    annotation = getattr(annotation, '__origin__', None) or annotation
+    return annotation if annotation in _CHECKED_TYPES else None
+
+
+def field_types(cls):
+    """Return {field name: checked type} for the fields of dataclass cls that have one"""
+    types = {field.name: _checked_type(field.type) for field in fields(cls)}
+    return {name: checked for name, checked in types.items() if checked is not None}
+
+
+def _nullable(field):
+    """True if a field defaults to None or an empty value, so null means 'not set'"""
+    if field.default_factory is not MISSING:
+        return field.default_factory in (list, dict)
+    return field.default is None or field.default == ''
+
+
+def _coerce(value, expected, nullable, name):
+    """Convert a loaded value of the wrong type where the old cls(**data) path kept it"""
+    kind = type(value)
+    try:
+        if value is None:
+            if nullable:
+                return None
+        elif expected is str:
+            if kind in (int, float):
+                return str(value)
+        elif expected is float:
+            if kind in (int, str):
+                return float(value)
+        elif expected is int:
+            if kind is float and value.is_integer():
+                return int(value)
+            if kind is str:
+                return int(value)
+        elif expected is bool:
+            if kind is int and value in (0, 1):
+                return bool(value)
+    except ValueError:
+        pass
+    raise TypeError(f"{name}: expected {expected.__name__}, got {kind.__name__}")
+
+
+def serialized(cls):
+    """Class decorator: generate to_dict() and from_dict() for dataclass cls.
+
+    to_dict() builds the dict field by field instead of deep-copying like
+    dataclasses.asdict, so list values are shared with the record; treat
+    the result as read-only.  from_dict() checks every field against its
+    annotation, then calls the constructor so __post_init__ still runs.
+    Values stored by older versions are converted where that loses
+    nothing: null for fields that default to None or empty, and numbers
+    or numeric strings for str, int and float fields.  It raises
+    TypeError for missing or unexpected fields and for anything else.
+    """
+    record_fields = fields(cls)
+    names = tuple(field.name for field in record_fields)
+    namespace = {'names': frozenset(names), 'coerce': _coerce}
+    to_dict = ', '.join(f'{name!r}: self.{name}' for name in names)
+    lines = [
+        'def from_dict(cls, data):',
+        '    if not names.issuperset(data):',
+        f'        raise TypeError(f"{cls.__name__}: unexpected fields {{sorted(set(data) - names)}}")',
+    ]
+    for i, field in enumerate(record_fields):
+        if field.default is not MISSING:
+            namespace[f'default_{i}'] = field.default
+            lines.append(f'    v{i} = data.get({field.name!r}, default_{i})')
+        elif field.default_factory is not MISSING:
+            namespace[f'factory_{i}'] = field.default_factory
+            lines.append(f'    v{i} = data[{field.name!r}] if {field.name!r} in data else factory_{i}()')
+        else:
+            lines += [f'    if {field.name!r} not in data:',
+                      f'        raise TypeError("{cls.__name__}: missing field {field.name}")',
+                      f'    v{i} = data[{field.name!r}]']
+        checked = _checked_type(field.type)
+        if checked is None:
+            continue
+        namespace[f'type_{i}'] = checked
+        # Exact type checks: the common case costs one comparison
+        lines += [f'    if type(v{i}) is not type_{i}:',
+                  f'        v{i} = coerce(v{i}, type_{i}, {_nullable(field)}, '
+                  f'"{cls.__name__}.{field.name}")']
+    lines.append(f"    return cls({', '.join(f'v{i}' for i in range(len(names)))})")
+    source = f'def to_dict(self):\n    return {{{to_dict}}}\n' + '\n'.join(lines) + '\n'
+    exec(compile(source, f'<serializers for {cls.__qualname__}>', 'exec'), namespace)
+    cls.to_dict = namespace['to_dict']
+    cls.from_dict = classmethod(namespace['from_dict'])
+    return cls
+
+
+def intern_fields(record, names):
+    """Replace each named str attribute with its interned copy"""
+    for name in names:
+        value = getattr(record, name)
+        if type(value) is str:
+            setattr(record, name, sys.intern(value))
+
+
+class RecordView:
+    """A record plus extra display fields, for templates.
+
+    Attribute lookups fall through to the record, so templates use it like
+    the record itself.
+    """
+
+    __slots__ = ('record', 'extra')
+
+    def __init__(self, record, **extra):
+        self.record = record
+        self.extra = extra
+
+    def __getattr__(self, name):
+        extra = self.extra
+        if name in extra:
+            return extra[name]
+        return getattr(self.record, name)
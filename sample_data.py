@@ -0,0 +1,507 @@
+"""
+Synthetic practice data at scale, for both apps.
+
+Generates a deterministic multi-year practice: patients, a treatment plan
+with phases for most of them, a consultation and then an adjustment every
+four to eight weeks for the length of treatment, a treatment record per
+completed visit, progress photos at the start, middle and end, and an
+outcome for every finished plan.  Each patient's history comes from its
+own random generator seeded with (seed, patient number), and appointments
+are booked patient by patient on a calendar per provider (one calendar
+for the scheduler schema, as app.py books), so the same seed and size
+always produce the same data and no provider is ever double-booked.  A
+visit that finds no free slot within SEARCH_DAYS days is skipped.
+
+Records are written out as they are generated, one patient at a time;
+besides one byte per provider and half-hour slot for the calendars,
+memory use does not grow with the practice.  JSON output is assembled
+from one temporary file per collection; a database target (sqlite:///
+or a .db file, as storage.open_store decides) receives batched inserts.
+
+An existing target is only replaced with --force.  The data it held,
+journal included, is then kept as the first rotated generation
+(<file>.1, see snapshots.py).
+
+    python sample_data.py --patients 10k                        # orthodontics_data.json
+    python sample_data.py --patients 1m -o big.db --seed 7
+    python sample_data.py --schema scheduler --patients 5000 --force
+
+setup.py offers the same generator when it creates sample data.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import uuid
+from datetime import date, datetime, timedelta
+
+from availability import DAY_END, DAY_START, format_minutes
+from snapshots import KEEP_GENERATIONS, fsync_dir, replace, rotate, write_temp
+from storage import COLLECTION_NAMES, JsonStore, SqliteStore, sqlite_path
+
+FIRST_NAMES = ['John', 'Emily', 'Michael', 'Sarah', 'David', 'Anna', 'James', 'Maria',
+               'Olivia', 'Liam', 'Sophia', 'Noah', 'Ava', 'Ethan', 'Mia', 'Lucas',
+               'Chloe', 'Mason', 'Grace', 'Logan', 'Zoe', 'Aiden', 'Lily', 'Caleb']
+LAST_NAMES = ['Smith', 'Davis', 'Johnson', 'Lee', 'Brown', 'Garcia', 'Miller', 'Wilson',
+              'Martinez', 'Anderson', 'Taylor', 'Thomas', 'Moore', 'Jackson', 'White',
+              'Harris', 'Clark', 'Lewis', 'Walker', 'Young', 'Allen', 'King', 'Wright', 'Scott']
+STREETS = ['Main St', 'Oak Ave', 'Pine St', 'Maple Dr', 'Cedar Ln', 'Elm St', 'Lakeview Rd']
+INSURERS = ['Delta Dental', 'Dental Plus Insurance', 'HealthCare Partners', 'SmileCare Insurance',
+            'MetLife Dental', 'Cigna Dental', '']
+REFERRALS = ['Online Search', 'Family Dentist', 'Friend', 'Dr. Johnson', 'School Screening', '']
+HISTORIES = ['No significant medical history', 'Asthma, controlled', 'Diabetes Type 2, well controlled',
+             'Seasonal allergies', '']
+ALLERGIES = ['None known', 'Penicillin', 'Latex', 'None']
+
+# treatment type -> (appliances, phase names, months range)
+TREATMENTS = {
+    'Braces': (['Metal brackets', 'Archwires', 'Elastics', 'Retainers'],
+               ['Leveling and alignment', 'Space closure', 'Bite correction', 'Finishing', 'Retention'],
+               (18, 30)),
+    'Invisalign': (['Invisalign aligners', 'Attachments', 'Vivera retainers'],
+                   ['Initial alignment', 'Refinement', 'Bite correction', 'Retention'],
+                   (12, 20)),
+    'Clear Braces': (['Ceramic brackets', 'Archwires', 'Retainers'],
+                     ['Leveling and alignment', 'Space closure', 'Finishing', 'Retention'],
+                     (18, 26)),
+    'Phase I Interceptive': (['Palatal expander', 'Partial braces'],
+                             ['Expansion', 'Alignment', 'Observation'],
+                             (9, 15)),
+}
+DIAGNOSES = ['Class I crowding', 'Class II malocclusion with crowding', 'Class III malocclusion',
+             'Deep overbite', 'Open bite', 'Crossbite', 'Spacing', 'Moderate crowding with mild overbite']
+RETAINERS = ['Hawley retainer', 'Essix retainer', 'Bonded lingual retainer', 'Vivera retainers']
+# Appointments start on the half hour within the booking form's day
+SLOT_MINUTES = 30
+SLOTS = (DAY_END - DAY_START) // SLOT_MINUTES
+SEARCH_DAYS = 14  # how far a visit is pushed back before it is skipped
+
+DISCONTINUED_SHARE = 0.03  # plans stopped early
+MISSED_SHARE = 0.05  # past appointments marked No-Show
+CANCELLED_SHARE = 0.05
+
+SCHEMAS = ('orthodontics', 'scheduler')
+DEFAULT_OUTPUT = {'orthodontics': 'orthodontics_data.json', 'scheduler': 'np_scheduler_data.json'}
+
+
+def parse_count(text):
+    """'5000', '10k' or '1m' -> int"""
+    text = text.strip().lower()
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def _id(rnd):
+    return str(uuid.UUID(int=rnd.getrandbits(128), version=4))
+
+
+def _day(day):
+    return day.strftime('%Y-%m-%d')
+
+
+def providers_for(patients):
+    """About one provider per 500 patients, at least four"""
+    count = max(4, patients // 500)
+    names = [f'Dr. {name}' for name in LAST_NAMES]
+    return [names[i % len(names)] + (f' {i // len(names) + 1}' if i >= len(names) else '')
+            for i in range(count)]
+
+
+class Calendar:
+    """Booked half-hour slots per provider and day, so no appointments overlap.
+
+    Each provider has a bytearray with one byte per slot, day after day
+    from first_day.  A day with no free slot left is chained to the next
+    day, so a fully booked stretch is skipped in one step.
+    """
+
+    def __init__(self, first_day):
+        self.first_day = first_day
+        self._slots = {}  # provider -> bytearray
+        self._full = {}  # provider -> {full day: a later day to try}
+
+    @staticmethod
+    def _open_day(full, day):
+        root = day
+        while root in full:
+            root = full[root]
+        while day in full and full[day] != root:
+            full[day], day = root, full[day]  # shorten the chain
+        return root
+
+    def book(self, rnd, provider, day, minutes):
+        """Book a random free slot on day or the first later day with one.
+
+        Returns (date, 'HH:MM'), or None if the provider has no room for
+        minutes within SEARCH_DAYS days.
+        """
+        need = max(1, -(-minutes // SLOT_MINUTES))
+        starts = SLOTS - need + 1
+        slots = self._slots.setdefault(provider, bytearray())
+        full = self._full.setdefault(provider, {})
+        first = (day - self.first_day).days
+        index = first
+        while True:
+            index = self._open_day(full, index)
+            if index >= first + SEARCH_DAYS:
+                return None
+            base = index * SLOTS
+            if len(slots) < base + SLOTS:
+                slots.extend(bytes(base + SLOTS - len(slots)))
+            start = rnd.randrange(starts)
+            if slots.find(1, base + start, base + start + need) != -1:
+                free = [s for s in range(starts) if slots.find(1, base + s, base + s + need) == -1]
+                if not free:
+                    index += 1
+                    continue
+                start = rnd.choice(free)
+            slots[base + start:base + start + need] = b'\x01' * need
+            if slots.find(0, base, base + SLOTS) == -1:
+                full[index] = index + 1
+            return (self.first_day + timedelta(days=index),
+                    format_minutes(DAY_START + start * SLOT_MINUTES))
+
+
+def patient_history(seed, number, first_day, last_day, providers, calendar):
+    """Yield (collection, record_id, record) for one patient's whole history"""
+    rnd = random.Random(f'{seed}:{number}')
+    span = (last_day - first_day).days
+    joined = first_day + timedelta(days=rnd.randrange(span))
+    age = rnd.choice([rnd.randint(9, 17)] * 3 + [rnd.randint(18, 55)])
+    patient_id = _id(rnd)
+    first, last = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+    provider = rnd.choice(providers)  # patients mostly see one provider
+
+    yield 'patients', patient_id, {
+        'patient_id': patient_id, 'first_name': first, 'last_name': last,
+        'date_of_birth': _day(joined - timedelta(days=age * 365 + rnd.randrange(365))),
+        'phone': f'({rnd.randint(200, 989)}) {rnd.randint(200, 999)}-{rnd.randint(0, 9999):04d}',
+        'email': f'{first.lower()}.{last.lower()}{number}@email.com',
+        'address': f'{rnd.randint(1, 9999)} {rnd.choice(STREETS)}, City, State {rnd.randint(10000, 99999)}',
+        'emergency_contact': f'{rnd.choice(FIRST_NAMES)} {last}',
+        'emergency_phone': f'({rnd.randint(200, 989)}) {rnd.randint(200, 999)}-{rnd.randint(0, 9999):04d}',
+        'insurance_provider': rnd.choice(INSURERS), 'insurance_id': f'INS{rnd.getrandbits(32):010d}',
+        'medical_history': rnd.choice(HISTORIES), 'allergies': rnd.choice(ALLERGIES),
+        'referral_source': rnd.choice(REFERRALS),
+        'created_date': f'{_day(joined)}T{rnd.randint(8, 17):02d}:{rnd.randrange(60):02d}:00', 'notes': '',
+    }
+
+    def appointment(day, kind, minutes, notes=''):
+        """Return (id, record) for a visit booked on or after day, or (None, None)"""
+        booked = calendar.book(rnd, provider, day, minutes)
+        if booked is None:
+            return None, None
+        day, time = booked
+        if day > last_day:
+            status = 'Scheduled'
+        else:
+            roll = rnd.random()
+            status = ('No-Show' if roll < MISSED_SHARE
+                      else 'Cancelled' if roll < MISSED_SHARE + CANCELLED_SHARE else 'Completed')
+        apt_id = _id(rnd)
+        return apt_id, {
+            'appointment_id': apt_id, 'patient_id': patient_id, 'date': _day(day),
+            'time': time, 'duration_minutes': minutes, 'appointment_type': kind,
+            'provider': provider, 'status': status, 'notes': notes,
+            'treatment_notes': '', 'next_appointment_recommended': '',
+        }
+
+    apt_id, consult = appointment(joined, 'Consultation', 60, 'Initial consultation')
+    if consult is not None:
+        yield 'appointments', apt_id, consult
+    if rnd.random() < 0.15:
+        return  # consulted but never started treatment
+
+    treatment = rnd.choice(list(TREATMENTS))
+    appliances, phase_names, (shortest, longest) = TREATMENTS[treatment]
+    months = rnd.randint(shortest, longest)
+    start = joined + timedelta(days=rnd.randint(7, 45))
+    finish = start + timedelta(days=months * 30)
+    if rnd.random() < DISCONTINUED_SHARE:
+        finish = start + timedelta(days=rnd.randint(60, months * 20))
+        status = 'Discontinued' if finish <= last_day else 'Active'
+    elif start > last_day:
+        status = 'Planned'
+    else:
+        status = 'Completed' if finish <= last_day else 'Active'
+
+    plan_id = _id(rnd)
+    phase_months = [months // len(phase_names)] * len(phase_names)
+    phase_months[0] += months - sum(phase_months)
+    cost = round(rnd.uniform(3000, 7500), -1)
+    yield 'treatment_plans', plan_id, {
+        'plan_id': plan_id, 'patient_id': patient_id, 'diagnosis': rnd.choice(DIAGNOSES),
+        'treatment_type': treatment, 'start_date': _day(start),
+        'estimated_duration_months': months, 'total_cost': cost,
+        'insurance_coverage': round(cost * rnd.choice([0, 0.2, 0.25, 0.3]), -1),
+        'payment_plan': f'Monthly payments of ${round(cost / months, -1):.0f}',
+        'treatment_goals': 'Correct alignment and bite', 'appliances_needed': appliances,
+        'phases': [{'name': name, 'duration_months': length}
+                   for name, length in zip(phase_names, phase_months)],
+        'status': status, 'notes': '', 'created_date': f'{_day(joined)}T12:00:00',
+    }
+
+    def photos(day, label):
+        ids = []
+        for kind in ('Intraoral', 'Extraoral', 'X-ray')[:rnd.randint(2, 3)]:
+            photo_id = _id(rnd)
+            ids.append(photo_id)
+            yield 'progress_photos', photo_id, {
+                'photo_id': photo_id, 'patient_id': patient_id, 'date': _day(day),
+                'photo_type': kind, 'file_path': f'photos/{patient_id}/{photo_id}.jpg',
+                'description': f'{label} {kind.lower()} photo',
+            }
+        return ids
+
+    if start <= last_day:
+        yield from photos(start, 'Initial')
+
+    # Recurring adjustments every 4-8 weeks; the next one is booked ahead
+    day = start
+    midpoint_taken = False
+    while day <= finish and day <= last_day + timedelta(weeks=8):
+        kind = 'Bonding' if day == start else 'Adjustment'
+        apt_id, apt = appointment(day, kind, 60 if day == start else 30)
+        if apt is not None:
+            yield 'appointments', apt_id, apt
+        if apt is not None and apt['status'] == 'Completed':
+            record_id = _id(rnd)
+            took_photos = not midpoint_taken and day >= start + (finish - start) / 2
+            yield 'treatment_records', record_id, {
+                'record_id': record_id, 'patient_id': patient_id, 'appointment_id': apt_id,
+                'date': apt['date'], 'treatment_type': treatment,
+                'appliances_adjusted': rnd.sample(appliances, rnd.randint(1, min(2, len(appliances)))),
+                'procedures_performed': [kind], 'progress_notes': 'Progressing as planned',
+                'photos_taken': took_photos, 'x_rays_taken': took_photos and rnd.random() < 0.5,
+                'impressions_taken': rnd.random() < 0.05, 'next_steps': 'Continue current phase',
+                'provider': provider,
+            }
+            if took_photos:
+                midpoint_taken = True
+                yield from photos(day, 'Progress')
+        day += timedelta(weeks=rnd.randint(4, 8))
+
+    if status == 'Completed':
+        final = yield from photos(finish, 'Final')
+        outcome_id = _id(rnd)
+        yield 'outcomes', outcome_id, {
+            'outcome_id': outcome_id, 'patient_id': patient_id, 'treatment_plan_id': plan_id,
+            'completion_date': _day(finish), 'final_photos': final,
+            'treatment_success_rating': rnd.choice([7, 8, 8, 9, 9, 9, 10, 10]),
+            'patient_satisfaction': rnd.choice([6, 7, 8, 8, 9, 9, 10, 10]),
+            'retention_appliance': rnd.choice(RETAINERS),
+            'follow_up_schedule': 'Retainer checks at 3, 6 and 12 months', 'notes': '',
+        }
+
+
+def practice(patients, seed=1, years=3, end='2025-12-31', providers=None):
+    """Yield (collection, record_id, record) for a whole practice, patient by patient"""
+    last_day = datetime.strptime(end, '%Y-%m-%d').date()
+    first_day = last_day - timedelta(days=int(years * 365))
+    providers = providers or providers_for(patients)
+    calendar = Calendar(first_day)
+    for number in range(patients):
+        yield from patient_history(seed, number, first_day, last_day, providers, calendar)
+
+
+def scheduler_practice(patients, seed=1, years=3, end='2025-12-31'):
+    """The same practice in app.py's schema: integer ids, one name field, appointments only"""
+    patient_ids = {}
+    next_apt_id = 1
+    # app.py books every appointment on one calendar
+    for collection, record_id, record in practice(patients, seed, years, end, ['Nurse Practitioner']):
+        if collection == 'patients':
+            number = patient_ids[record_id] = len(patient_ids) + 1
+            yield 'patients', number, {
+                'patient_id': number, 'name': f"{record['first_name']} {record['last_name']}",
+                'phone': record['phone'], 'email': record['email'], 'dob': record['date_of_birth'],
+                'insurance': record['insurance_provider'], 'notes': record['notes'],
+            }
+        elif collection == 'appointments':
+            status = {'No-Show': 'No Show'}.get(record['status'], record['status'])
+            yield 'appointments', next_apt_id, {
+                'apt_id': next_apt_id, 'patient_id': patient_ids[record['patient_id']],
+                'date': record['date'], 'time': record['time'],
+                'duration': record['duration_minutes'], 'reason': record['appointment_type'],
+                'status': status, 'notes': record['notes'],
+            }
+            next_apt_id += 1
+
+
+def write_json(path, collections, rows, trailer=None):
+    """Stream rows into a {collection: {id: record}} JSON file next to path.
+
+    Each collection goes to its own temporary file first, so the output is
+    assembled without holding any collection in memory.  trailer(counts),
+    called once every row is written, returns extra top-level keys.  Returns
+    (per-collection counts, path of the finished temporary file).
+    """
+    directory = tempfile.mkdtemp(prefix='sample_data_', dir=os.path.dirname(os.path.abspath(path)))
+    counts = dict.fromkeys(collections, 0)
+    try:
+        parts = {name: open(os.path.join(directory, name), 'w') for name in collections}
+        try:
+            for collection, record_id, record in rows:
+                out = parts[collection]
+                out.write(',\n' if counts[collection] else '\n')
+                out.write(f'{json.dumps(str(record_id))}: {json.dumps(record)}')
+                counts[collection] += 1
+        finally:
+            for out in parts.values():
+                out.close()
+
+        extra = trailer(counts) if trailer else {}
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'w') as out:
+            out.write('{')
+            for i, name in enumerate(collections):
+                out.write(f'{"," if i else ""}\n"{name}": {{')
+                with open(os.path.join(directory, name)) as part:
+                    shutil.copyfileobj(part, out)
+                out.write('\n}')
+            for key, value in extra.items():
+                out.write(f',\n{json.dumps(key)}: {json.dumps(value)}')
+            out.write('\n}\n')
+            out.flush()
+            os.fsync(out.fileno())
+    finally:
+        shutil.rmtree(directory)
+    return counts, tmp_file
+
+
+def _refuse_overwrite(path, force):
+    if os.path.exists(path) and not force:
+        raise FileExistsError(f'{path} already exists; use --force to replace it')
+
+
+def _retire_database(db_file):
+    """Keep an existing SQLite database as db_file.1 and remove the live one"""
+    store = SqliteStore(db_file)
+    with store.lock():
+        store.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')  # everything in the main file
+        store.close()
+        rotate(db_file)
+        for path in (db_file, db_file + '-wal', db_file + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _replace_snapshot(store, tmp_file):
+    """Move tmp_file over the store's snapshot the way a checkpoint does.
+
+    The previous snapshot, with its journal folded in, becomes the first
+    rotated generation; the journal and binary snapshot describe that
+    previous data, so they go.
+    """
+    location = store.data_file
+    if not store.begin_checkpoint():
+        os.remove(tmp_file)
+        raise RuntimeError(f'{location} is being compacted by a running app; try again')
+    try:
+        with store.lock():
+            store.journal.rotate()  # anything written since begin_checkpoint
+            old = store.load() if os.path.exists(store.journal.rotated_path) else None
+            rotate(location, store.generations)
+            if old is not None and store.generations:
+                previous = location + '.1'
+                os.replace(write_temp(previous, lambda f: json.dump(old, f, indent=2)), previous)
+            os.replace(tmp_file, location)
+            fsync_dir(location)
+            store.journal.discard_rotated()
+            if store.binary_file and os.path.exists(store.binary_file):
+                os.remove(store.binary_file)
+    finally:
+        store.end_checkpoint()
+
+
+def write_orthodontics(location, patients, seed=1, years=3, end='2025-12-31', batch=5000,
+                       force=False):
+    """Write a synthetic practice to a JSON data file or an SQLite database.
+
+    The target is routed as storage.open_store does.  An existing target
+    raises FileExistsError unless force is set, in which case it is kept
+    as <target>.1.
+    """
+    rows = practice(patients, seed, years, end)
+    db_file = sqlite_path(location)
+    if db_file is not None:
+        _refuse_overwrite(db_file, force)
+        if os.path.exists(db_file):
+            _retire_database(db_file)
+        store = SqliteStore(db_file)
+        counts = dict.fromkeys(COLLECTION_NAMES, 0)
+        pending = {name: [] for name in COLLECTION_NAMES}
+        try:
+            with store.lock():
+                for collection, record_id, record in rows:
+                    pending[collection].append((record_id, record))
+                    counts[collection] += 1
+                    if len(pending[collection]) >= batch:
+                        store.put(collection, pending[collection])
+                        pending[collection] = []
+                for collection, items in pending.items():
+                    if items:
+                        store.put(collection, items)
+        finally:
+            store.close()
+        return counts
+
+    store = JsonStore(location)
+    for path in (location, store.journal.path, store.journal.rotated_path):
+        _refuse_overwrite(path, force)
+    counts, tmp_file = write_json(location, COLLECTION_NAMES, rows)
+    _replace_snapshot(store, tmp_file)
+    return counts
+
+
+def write_scheduler(path, patients, seed=1, years=3, end='2025-12-31', force=False):
+    """Write a synthetic practice in app.py's np_scheduler_data.json format.
+
+    An existing file raises FileExistsError unless force is set, in which
+    case it is kept as <path>.1.
+    """
+    def next_ids(counts):
+        return {'next_patient_id': counts['patients'] + 1, 'next_apt_id': counts['appointments'] + 1}
+
+    _refuse_overwrite(path, force)
+    written, tmp_file = write_json(path, ('patients', 'appointments'),
+                                   scheduler_practice(patients, seed, years, end), next_ids)
+    replace(tmp_file, path, KEEP_GENERATIONS)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic practice for either app')
+    parser.add_argument('--patients', type=parse_count, default=1000, help='e.g. 1000, 10k, 1m')
+    parser.add_argument('--schema', choices=SCHEMAS, default='orthodontics')
+    parser.add_argument('-o', '--output',
+                        help='data file, or a .db file or sqlite:///file.db (orthodontics only)')
+    parser.add_argument('--force', action='store_true',
+                        help='replace an existing output, keeping it as <output>.1')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--years', type=float, default=3, help='years of history before --end')
+    parser.add_argument('--end', default='2025-12-31', help='last day of history, YYYY-MM-DD')
+    args = parser.parse_args()
+
+    try:
+        date.fromisoformat(args.end)
+    except ValueError:
+        parser.error('--end must be a YYYY-MM-DD date')
+    output = args.output or DEFAULT_OUTPUT[args.schema]
+    if args.schema == 'scheduler' and sqlite_path(output) is not None:
+        parser.error('the scheduler schema is written as JSON only')
+
+    write = write_orthodontics if args.schema == 'orthodontics' else write_scheduler
+    try:
+        counts = write(output, args.patients, args.seed, args.years, args.end, force=args.force)
+    except (FileExistsError, RuntimeError) as e:
+        parser.error(str(e))
+    print(f"Wrote {output}: " + ', '.join(f"{count:,} {name}" for name, count in counts.items()))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
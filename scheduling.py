@@ -4,6 +4,11 @@ from datetime import datetime, timedelta
 import json
 import os
 
+from search_index import PatientSearchIndex
+
+# Rows shown for a non-empty search; the full list is shown when it is empty
+SEARCH_RESULTS_LIMIT = 500
+
 class Patient:
     def __init__(self, patient_id, name, phone, email, dob, insurance=""):
         self.patient_id = patient_id
@@ -36,9 +41,11 @@ class NPScheduler:
         self.appointments = {}
         self.next_patient_id = 1
         self.next_apt_id = 1
+        self.search_index = PatientSearchIndex(('name', 'email'), ('phone',), sort_key=lambda p: p.name)
         
         # Load data
         self.load_data()
+        self.search_index.rebuild(self.patients)
         
         # Create GUI
         self.create_widgets()
@@ -193,6 +200,7 @@ class NPScheduler:
                 dialog.result['insurance']
             )
             self.patients[self.next_patient_id] = patient
+            self.search_index.add(self.next_patient_id, patient)
             self.next_patient_id += 1
             self.refresh_patients()
             self.refresh_patient_combo()
@@ -214,6 +222,7 @@ class NPScheduler:
             patient.email = dialog.result['email']
             patient.dob = dialog.result['dob']
             patient.insurance = dialog.result['insurance']
+            self.search_index.add(patient_id, patient)
             self.refresh_patients()
             self.refresh_patient_combo()
             self.save_data()
@@ -229,6 +238,7 @@ class NPScheduler:
         
         if messagebox.askyesno("Confirm Delete", f"Delete patient {patient_name}?"):
             del self.patients[patient_id]
+            self.search_index.remove(patient_id)
             self.refresh_patients()
             self.refresh_patient_combo()
             self.save_data()
@@ -338,20 +348,21 @@ class NPScheduler:
         # Filter patients based on search
         search_term = self.patient_search.get().lower()
         
-        for patient in self.patients.values():
-            if (not search_term or 
-                search_term in patient.name.lower() or 
-                search_term in patient.phone or 
-                search_term in patient.email.lower()):
-                
-                self.patients_tree.insert('', 'end', values=(
-                    patient.patient_id,
-                    patient.name,
-                    patient.phone,
-                    patient.email,
-                    patient.dob,
-                    patient.insurance
-                ))
+        if search_term:
+            _, ids = self.search_index.search(search_term, limit=SEARCH_RESULTS_LIMIT)
+            matches = [self.patients[pid] for pid in ids]
+        else:
+            matches = self.patients.values()
+        
+        for patient in matches:
+            self.patients_tree.insert('', 'end', values=(
+                patient.patient_id,
+                patient.name,
+                patient.phone,
+                patient.email,
+                patient.dob,
+                patient.insurance
+            ))
     
     def filter_patients(self, *args):
         self.refresh_patients()
@@ -0,0 +1,167 @@
+"""
+Inverted index for patient type-ahead search.
+
+Names and emails are split into lowercase words kept in a sorted
+vocabulary with a posting set per word, so every query word is a prefix
+lookup (bisect plus a walk over the matching words).  Phone numbers are
+reduced to their digits and every suffix is indexed the same way, so a
+digit query matches anywhere in the number
+regardless of punctuation: "5551234", "555-1234" and "(555) 123" all find
+"(555) 123-4567".
+
+Used by both Flask apps and the tkinter scheduler; it follows the
+FieldIndex protocol (add/remove/rebuild) so the data managers maintain it
+on every insert, edit and delete.
+"""
+
+import heapq
+import re
+from bisect import bisect_left, insort
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+NON_DIGIT_RE = re.compile(r'\D')
+
+EXACT_SCORE = 2  # query word equals a whole token
+PREFIX_SCORE = 1  # query word is a prefix of a token
+PHONE_SCORE = 2
+
+
+def tokenize(text):
+    # Values loaded from older data may be numbers
+    return TOKEN_RE.findall(str(text).lower()) if text else []
+
+
+class _PrefixIndex:
+    """Sorted vocabulary of terms with a posting set of record ids per term"""
+
+    def __init__(self):
+        self.vocab = []  # sorted unique terms
+        self.postings = {}  # term -> {record_id}
+
+    def add(self, term, record_id):
+        ids = self.postings.get(term)
+        if ids is None:
+            insort(self.vocab, term)
+            ids = self.postings[term] = set()
+        ids.add(record_id)
+
+    def remove(self, term, record_id):
+        ids = self.postings.get(term)
+        if ids is None:
+            return
+        ids.discard(record_id)
+        if not ids:
+            del self.postings[term]
+            del self.vocab[bisect_left(self.vocab, term)]
+
+    def load(self, postings):
+        self.postings = postings
+        self.vocab = sorted(postings)
+
+    def matches(self, prefix):
+        """Yield (term, ids) for every term starting with prefix"""
+        vocab = self.vocab
+        i = bisect_left(vocab, prefix)
+        while i < len(vocab) and vocab[i].startswith(prefix):
+            yield vocab[i], self.postings[vocab[i]]
+            i += 1
+
+
+class PatientSearchIndex:
+    def __init__(self, text_fields, phone_fields=('phone',), sort_key=None):
+        self.text_fields = text_fields
+        self.phone_fields = phone_fields
+        self.sort_key = sort_key  # record -> key for ordering equal scores
+        self._words = _PrefixIndex()  # name and email words
+        self._digits = _PrefixIndex()  # every suffix of every phone number
+        self._entries = {}  # record_id -> (words, digit suffixes)
+        self._records = {}  # record_id -> record, for tie-break ordering
+
+    def _extract(self, record):
+        words = set()
+        for field in self.text_fields:
+            words.update(tokenize(getattr(record, field, '')))
+        digits = set()
+        for field in self.phone_fields:
+            number = NON_DIGIT_RE.sub('', str(getattr(record, field, '') or ''))
+            digits.update(number[i:] for i in range(len(number)))
+        return words, digits
+
+    def add(self, record_id, record):
+        self.remove(record_id)
+        words, digits = self._extract(record)
+        for word in words:
+            self._words.add(word, record_id)
+        for suffix in digits:
+            self._digits.add(suffix, record_id)
+        self._entries[record_id] = (words, digits)
+        self._records[record_id] = record
+
+    def remove(self, record_id):
+        if record_id not in self._entries:
+            return
+        words, digits = self._entries.pop(record_id)
+        for word in words:
+            self._words.remove(word, record_id)
+        for suffix in digits:
+            self._digits.remove(suffix, record_id)
+        del self._records[record_id]
+
+    def rebuild(self, records):
+        words_postings, digit_postings = {}, {}
+        self._entries, self._records = {}, {}
+        for record_id, record in records.items():
+            words, digits = self._extract(record)
+            for word in words:
+                words_postings.setdefault(word, set()).add(record_id)
+            for suffix in digits:
+                digit_postings.setdefault(suffix, set()).add(record_id)
+            self._entries[record_id] = (words, digits)
+            self._records[record_id] = record
+        self._words.load(words_postings)
+        self._digits.load(digit_postings)
+
+    def _word_scores(self, word):
+        scores = {}
+        for term, ids in self._words.matches(word):
+            if term == word:
+                scores.update(dict.fromkeys(ids, EXACT_SCORE))
+            else:
+                for record_id in ids:
+                    if record_id not in scores:
+                        scores[record_id] = PREFIX_SCORE
+        return scores
+
+    def search(self, query, offset=0, limit=None):
+        """Return (total, [record_id, ...]) for a query, best matches first.
+
+        Every query word must prefix-match a name or email word.  A query
+        made only of digits and phone punctuation also matches phone
+        numbers containing those digits.
+        """
+        words = tokenize(query)
+        if not words:
+            return 0, []
+
+        # Intersect starting from the most selective word
+        word_scores = sorted((self._word_scores(word) for word in words), key=len)
+        scores = word_scores[0]
+        for other in word_scores[1:]:
+            scores = {rid: s + other[rid] for rid, s in scores.items() if rid in other}
+
+        digits = NON_DIGIT_RE.sub('', query)
+        if digits and not re.search(r'[a-zA-Z]', query):
+            for _, ids in self._digits.matches(digits):
+                for record_id in ids:
+                    scores[record_id] = max(scores.get(record_id, 0), PHONE_SCORE)
+
+        if self.sort_key is None:
+            key = lambda rid: (-scores[rid], str(rid))
+        else:
+            records, sort_key = self._records, self.sort_key
+            key = lambda rid: (-scores[rid], sort_key(records[rid]))
+        if limit is None:
+            ranked = sorted(scores, key=key)[offset:]
+        else:
+            ranked = heapq.nsmallest(offset + limit, scores, key=key)[offset:]
+        return len(scores), ranked
@@ -30,10 +30,25 @@ def install_dependencies():
         print("❌ Failed to install dependencies")
         return False
 
-def create_sample_data():
-    """Create sample data for demonstration"""
+def create_sample_data(patients=None, seed=1):
+    """Create sample data for demonstration.
+    
+    With a patient count, generate a synthetic multi-year practice of that
+    size instead of the two hand-written patients (see sample_data.py).
+    """
     print("\n📝 Creating sample data...")
     
+    if patients:
+        from sample_data import write_orthodontics
+        try:
+            # Asked for explicitly; existing data is kept as orthodontics_data.json.1
+            counts = write_orthodontics("orthodontics_data.json", patients, seed, force=True)
+            print("✅ Sample data created: " + ", ".join(f"{count:,} {name}" for name, count in counts.items()))
+            return True
+        except Exception as e:
+            print(f"❌ Failed to create sample data: {e}")
+            return False
+    
     sample_data = {
         "patients": {
             "1": {
@@ -149,7 +164,13 @@ def main():
     # Ask about sample data
     response = input("\n❓ Would you like to create sample data for testing? (y/n): ").lower()
     if response in ['y', 'yes']:
-        create_sample_data()
+        size = input("❓ How many patients? (Enter for the small demo set, or e.g. 1000, 10k): ").strip()
+        try:
+            from sample_data import parse_count
+            create_sample_data(parse_count(size) if size else None)
+        except ValueError:
+            print("❌ Not a number; creating the small demo set")
+            create_sample_data()
     
     # Ask about starting the application
     response = input("\n❓ Would you like to start the application now? (y/n): ").lower()
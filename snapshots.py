@@ -0,0 +1,177 @@
+"""
+Crash-safe snapshot files with rotated generations.
+
+A snapshot is written to a temporary file next to the live one, fsynced,
+and renamed over it with os.replace, so a crash leaves either the old or
+the new file complete, never a truncated one.  The directory is fsynced
+after the rename so the rename itself survives a power cut.
+
+Before each replace the live file is kept as <name>.1, the previous .1
+becomes .2 and so on, up to ORTHO_SNAPSHOT_GENERATIONS (default 3).
+load_newest() reads the live file and, if it is damaged, falls back to
+the newest generation that still parses.
+"""
+
+import json
+import os
+import shutil
+import threading
+
+from metrics import timed_section
+
+KEEP_GENERATIONS = int(os.environ.get('ORTHO_SNAPSHOT_GENERATIONS', 3))
+
+
+def generation_paths(path, keep=KEEP_GENERATIONS):
+    """Return the live path followed by its rotated generations, newest first"""
+    return [path] + [f'{path}.{n}' for n in range(1, keep + 1)]
+
+
+def fsync_dir(path):
+    """Make a rename inside path's directory durable"""
+    if os.name == 'nt':
+        return  # directories cannot be opened, and NTFS renames are journaled
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_temp(path, dump, binary=False, sync=True):
+    """Write path + '.tmp' with dump(f) and fsync it; return the temp name"""
+    tmp = path + '.tmp'
+    with open(tmp, 'wb' if binary else 'w') as f:
+        dump(f)
+        f.flush()
+        if sync:
+            with timed_section('fsync', os.path.basename(path)):
+                os.fsync(f.fileno())
+    return tmp
+
+
+def rotate(path, keep=KEEP_GENERATIONS):
+    """Keep the live file as path.1, shifting older generations up to path.<keep>"""
+    if keep < 1 or not os.path.exists(path):
+        return
+    for n in range(keep - 1, 0, -1):
+        if os.path.exists(f'{path}.{n}'):
+            os.replace(f'{path}.{n}', f'{path}.{n + 1}')
+    try:
+        os.link(path, f'{path}.1')  # the live name stays in place until the replace
+    except OSError:
+        shutil.copy2(path, f'{path}.1')
+
+
+def replace(tmp, path, keep=KEEP_GENERATIONS, sync=True):
+    """Rotate path's generations and atomically move tmp over it"""
+    rotate(path, keep)
+    os.replace(tmp, path)
+    if sync:
+        with timed_section('fsync', os.path.basename(path)):
+            fsync_dir(path)
+
+
+def write_atomic(path, dump, keep=KEEP_GENERATIONS, binary=False):
+    """Write a snapshot with dump(f): temp file, fsync, rotate, rename"""
+    replace(write_temp(path, dump, binary), path, keep)
+
+
+def load_newest(path, read, keep=KEEP_GENERATIONS):
+    """Return (read(f), source path) for the newest generation read() accepts.
+
+    read() should raise on a damaged file.  Returns (None, None) if the
+    live file does not exist (a new install) or no generation is readable.
+    """
+    if not os.path.exists(path):
+        return None, None
+    for candidate in generation_paths(path, keep):
+        try:
+            with open(candidate, 'r') as f:
+                return read(f), candidate
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            print(f"Load error: {candidate}: {e}")
+    return None, None
+
+
+def read_json_object(f):
+    """json.load that rejects anything but an object, e.g. a truncated or emptied file"""
+    data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError('snapshot is not a JSON object')
+    return data
+
+
+class FragmentCache:
+    """Per-record JSON for snapshot writes, re-encoded only when a record changes.
+
+    Writers call invalidate() for every record they change or remove, and
+    clear() when the whole data set is replaced.  encode() returns the
+    same text json.dumps(data, indent=2) would, re-encoding only those
+    records and reusing whole sections for collections that did not
+    change.  Call take_dirty() while the data is consistent (under the
+    writers' lock) and pass the result to encode(); one encode() runs at
+    a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirty = {}  # collection -> ids changed since the last take_dirty()
+        self._cleared = True
+        self._records = {}  # collection -> {id: (record dict, encoded line)}
+        self._sections = {}  # collection -> ({id: record dict}, section JSON)
+
+    def invalidate(self, collection, record_id):
+        with self._lock:
+            if not self._cleared:  # until the next encode() everything is re-encoded
+                self._dirty.setdefault(collection, set()).add(record_id)
+
+    def clear(self):
+        with self._lock:
+            self._dirty, self._cleared = {}, True
+
+    def take_dirty(self):
+        with self._lock:
+            changes = self._dirty, self._cleared
+            self._dirty, self._cleared = {}, False
+        return changes
+
+    def encode(self, collections, changes, extra=None):
+        """Return ({collection: {id: dict}}, JSON text) for {collection: [(id, record)]}.
+
+        Records are objects with to_dict() or plain dicts; extra holds
+        further top-level values written after the collections.
+        """
+        dirty, cleared = changes
+        if cleared:
+            self._records, self._sections = {}, {}
+        data, parts = {}, []
+        for name, items in collections.items():
+            ids = dirty.get(name)
+            if ids or name not in self._sections:
+                self._sections[name] = self._encode_section(name, items, ids)
+            data[name], section = self._sections[name]
+            parts.append(f'  {json.dumps(name)}: {section}')
+        for key, value in (extra or {}).items():
+            fragment = json.dumps(value, indent=2).replace('\n', '\n  ')
+            parts.append(f'  {json.dumps(str(key))}: {fragment}')
+        return data, '{\n' + ',\n'.join(parts) + '\n}' if parts else '{}'
+
+    def _encode_section(self, name, items, ids):
+        cached = self._records.setdefault(name, {})
+        ids = ids or ()
+        records, lines = {}, []
+        for record_id, record in items:
+            entry = cached.get(record_id)
+            if entry is None or record_id in ids:
+                record_dict = record if isinstance(record, dict) else record.to_dict()
+                fragment = json.dumps(record_dict, indent=2).replace('\n', '\n    ')
+                entry = cached[record_id] = (record_dict, f'    {json.dumps(str(record_id))}: {fragment}')
+            records[record_id] = entry[0]
+            lines.append(entry[1])
+        for record_id in ids:
+            if record_id not in records:
+                cached.pop(record_id, None)  # removed
+        return records, '{\n' + ',\n'.join(lines) + '\n  }' if lines else '{}'
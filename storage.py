@@ -0,0 +1,486 @@
+"""
+Storage backends for OrthodonticsDataManager.
+
+The data manager talks to a store through a small interface and never
+needs to know which backend is active:
+
+    lazy_loading              True if load() can skip collections and
+                              load_patient() reads one patient's rows
+    lock()                    context manager excluding writers in other processes
+    load(collections=None)    -> {collection: {record_id: record_dict}}
+    load_patient(coll, id)    -> {record_id: record_dict} (lazy_loading stores)
+    put(collection, rows)     insert or replace (record_id, record_dict) rows
+    delete(collection, id)    remove one record
+    write(changes, sync)      apply (op, collection, id, record) changes in one
+                              write; sync also forces them to disk
+    has_changes()             cheap check for writes made by other processes
+    changes()                 -> (full_data or None, [(op, collection, id, record)])
+    needs_checkpoint()        True when the manager should call checkpoint
+    begin_checkpoint()        True if a full snapshot should be written
+    write_checkpoint(data, text=None)
+                              persist a full {collection: {id: dict}} snapshot;
+                              text is data already encoded as JSON, if known
+    end_checkpoint()          always called after a started checkpoint
+    scan(collection, ...)     stream (record_id, record_dict) for offline tools
+    close()
+
+load(), put(), delete() and changes() must be called under lock(), after
+changes() has been applied, so several processes can share one store.
+
+JsonStore keeps the original orthodontics_data.json snapshot plus an
+append-only journal.  Each checkpoint also writes a marshal copy of the
+snapshot (orthodontics_data.marshal) that loads several times faster; it
+is only used while it matches the JSON file, so editing or replacing the
+JSON by hand falls back to it automatically.  marshal, unlike pickle,
+only builds plain values and never runs code from the file, but it is not
+hardened against crafted input either: the data directory must be as
+trusted as the JSON it holds.  Snapshots are written crash-safely
+with rotated generations (see snapshots.py).  SqliteStore keeps one table per collection with
+indexed patient_id, date, status and treatment_type columns.
+
+Migrate an existing JSON data file with:
+
+    python storage.py migrate orthodontics_data.json orthodontics.db
+"""
+
+import argparse
+import json
+import marshal
+import os
+import sqlite3
+import threading
+
+from concurrency import FileLock
+from journal import Journal
+from snapshots import KEEP_GENERATIONS, load_newest, read_json_object, replace, write_temp
+
+COLLECTION_NAMES = ('patients', 'treatment_plans', 'appointments',
+                    'treatment_records', 'progress_photos', 'outcomes')
+
+# Indexed SQLite column -> source field, per collection
+SQLITE_COLUMNS = {
+    'patients': {'patient_id': 'patient_id', 'date': 'created_date'},
+    'treatment_plans': {'patient_id': 'patient_id', 'date': 'start_date',
+                        'status': 'status', 'treatment_type': 'treatment_type'},
+    'appointments': {'patient_id': 'patient_id', 'date': 'date', 'status': 'status',
+                     'treatment_type': 'appointment_type'},
+    'treatment_records': {'patient_id': 'patient_id', 'date': 'date',
+                          'treatment_type': 'treatment_type'},
+    'progress_photos': {'patient_id': 'patient_id', 'date': 'date'},
+    'outcomes': {'patient_id': 'patient_id', 'date': 'completion_date'},
+}
+
+INDEXED_COLUMNS = ('patient_id', 'date', 'status', 'treatment_type')
+
+SNAPSHOT_SCHEMA = 2  # bump when the binary snapshot layout changes
+
+
+def record_matches(collection, record, patient_id=None, start=None, before=None):
+    """True if a record dict belongs to patient_id and its date is in [start, before)"""
+    columns = SQLITE_COLUMNS[collection]
+    if patient_id is not None and record.get(columns['patient_id']) != patient_id:
+        return False
+    if start is not None or before is not None:
+        value = record.get(columns['date']) or ''
+        if (start is not None and value < start) or (before is not None and value >= before):
+            return False
+    return True
+
+
+class JsonStore:
+    """Pretty-printed JSON snapshot plus an append-only journal"""
+
+    lazy_loading = False  # the snapshot can only be parsed whole
+
+    def __init__(self, data_file, compact_after=500, binary_snapshot=True, generations=KEEP_GENERATIONS):
+        self.data_file = data_file
+        self.generations = generations  # older snapshots kept as <data_file>.1, .2, ...
+        base = os.path.splitext(data_file)[0]
+        self.binary_file = base + '.marshal' if binary_snapshot else None
+        self.journal = Journal(base + '.journal')
+        self.compact_after = compact_after  # journal entries before compaction
+        self._lock = FileLock(base + '.lock')
+        self._compact_lock = FileLock(base + '.compact.lock')
+        self._compacting = None
+        self._snapshot_stamp = None  # identifies the snapshot we loaded
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def lock(self):
+        return self._lock.hold()
+
+    def _read_binary(self):
+        """Return the binary snapshot if it was written with the current JSON one"""
+        try:
+            with open(self.binary_file, 'rb') as f:
+                snapshot = marshal.loads(f.read())  # marshal.load(f) reads piecemeal, far slower
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Binary snapshot error: {e}")
+            return None
+        if (not isinstance(snapshot, dict) or snapshot.get('schema') != SNAPSHOT_SCHEMA
+                or snapshot.get('json_stamp') != self._snapshot_stamp):
+            return None
+        return snapshot['data']
+
+    def load(self, collections=None):
+        # Always loads every collection; see lazy_loading
+        data = {name: {} for name in COLLECTION_NAMES}
+        self._snapshot_stamp = self._stamp(self.data_file)
+        try:
+            if self._snapshot_stamp is not None:
+                snapshot = self._read_binary() if self.binary_file else None
+                if snapshot is None:
+                    snapshot, source = load_newest(self.data_file, read_json_object, self.generations)
+                    if source not in (None, self.data_file):
+                        print(f"Load warning: {self.data_file} is unreadable; using {source}")
+                    snapshot = snapshot or {}
+                for name in COLLECTION_NAMES:
+                    data[name].update(snapshot.get(name, {}))
+        except Exception as e:
+            print(f"Load error: {e}")
+
+        try:
+            for op, collection, record_id, record in self.journal.replay():
+                if op == 'put':
+                    data[collection][record_id] = record
+                elif op == 'delete':
+                    data[collection].pop(record_id, None)
+        except Exception as e:
+            print(f"Journal replay error: {e}")
+        return data
+
+    def put(self, collection, rows):
+        self.journal.append_many([('put', collection, rid, record) for rid, record in rows])
+
+    def delete(self, collection, record_id):
+        self.journal.append('delete', collection, record_id)
+
+    def write(self, changes, sync=False):
+        self.journal.append_many(changes, sync=sync)
+
+    def has_changes(self):
+        return (self._stamp(self.data_file) != self._snapshot_stamp
+                or self.journal.has_new())
+
+    def changes(self):
+        # A new snapshot means another process compacted: start over
+        if self._stamp(self.data_file) != self._snapshot_stamp:
+            return self.load(), []
+        entries = self.journal.read_new()
+        if entries is None:
+            return self.load(), []
+        return None, entries
+
+    def needs_checkpoint(self):
+        return self.journal.entries >= self.compact_after
+
+    def begin_checkpoint(self):
+        # Only one process compacts at a time; the others keep journaling
+        self._compacting = self._compact_lock.try_acquire()
+        if self._compacting is None:
+            return False
+        # New mutations go to a fresh journal while the snapshot is written
+        self.journal.rotate()
+        return True
+
+    def write_checkpoint(self, data, text=None):
+        if text is None:
+            tmp_file = write_temp(self.data_file, lambda f: json.dump(data, f, indent=2))
+        else:
+            tmp_file = write_temp(self.data_file, lambda f: f.write(text))
+        binary_tmp = None
+        if self.binary_file:
+            # Tag the binary copy with the JSON file it mirrors; os.replace
+            # keeps inode, mtime and size, so the tag still matches afterwards.
+            # It is only a cache of the JSON, so it is not fsynced or rotated.
+            stamp = self._stamp(tmp_file)
+            try:
+                binary_tmp = write_temp(self.binary_file, lambda f: f.write(marshal.dumps(
+                    {'schema': SNAPSHOT_SCHEMA, 'json_stamp': stamp, 'data': data})),
+                    binary=True, sync=False)
+            except Exception as e:
+                print(f"Binary snapshot error: {e}")
+                binary_tmp = None
+        with self._lock.hold():
+            replace(tmp_file, self.data_file, self.generations)
+            if binary_tmp:
+                os.replace(binary_tmp, self.binary_file)
+            self.journal.discard_rotated()
+            self._snapshot_stamp = self._stamp(self.data_file)
+
+    def end_checkpoint(self):
+        if self._compacting is not None:
+            self._compact_lock.release(self._compacting)
+            self._compacting = None
+
+    def scan(self, collection, patient_id=None, start=None, before=None):
+        """Yield (record_id, record) for matching records of one collection.
+        
+        The JSON snapshot can only be parsed whole, so this holds the full
+        data set while it runs; SqliteStore.scan streams from disk.
+        """
+        with self.lock():
+            records = self.load()[collection]
+        for record_id, record in records.items():
+            if record_matches(collection, record, patient_id, start, before):
+                yield record_id, record
+
+    def close(self):
+        pass
+
+
+class SqliteStore:
+    """One SQLite table per collection, in WAL mode.
+
+    Every write also appends (collection, id) to a changes table in the
+    same transaction so other processes can reload just those rows.
+    """
+
+    keep_changes = 10000  # change-log rows kept for lagging processes
+    trim_every = 1000  # changes between trims of the change log
+    lazy_loading = True
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        # Callers serialise writes, so one connection is shared by all threads
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._lock = FileLock(db_file + '.lock')
+        self._create_tables()
+        # Per-patient reads happen outside the writers' lock, on their own
+        # connection so they only ever see committed rows
+        self._reader = sqlite3.connect(db_file, check_same_thread=False)
+        self._reader_lock = threading.Lock()
+        self.last_change = 0
+        self.data_version = None
+        self._reader_version = None  # data_version last seen by has_changes
+        self._trimmed_at = 0  # last_change when this process last trimmed
+
+    def _create_tables(self):
+        with self.conn:
+            for name in COLLECTION_NAMES:
+                self.conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS {name} ('
+                    'id TEXT PRIMARY KEY, patient_id TEXT, date TEXT, '
+                    'status TEXT, treatment_type TEXT, data TEXT NOT NULL)')
+                for column in SQLITE_COLUMNS[name]:
+                    self.conn.execute(
+                        f'CREATE INDEX IF NOT EXISTS {name}_{column} ON {name} ({column})')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS changes ('
+                'seq INTEGER PRIMARY KEY AUTOINCREMENT, collection TEXT, id TEXT)')
+
+    def _row(self, collection, record_id, record):
+        columns = SQLITE_COLUMNS[collection]
+        values = [record.get(columns[c]) if c in columns else None for c in INDEXED_COLUMNS]
+        return (record_id, *values, json.dumps(record, separators=(',', ':')))
+
+    def _data_version(self):
+        return self.conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def _log_changes(self, changed):
+        """Record (collection, id) pairs for other processes; caller is in a transaction"""
+        self.conn.executemany('INSERT INTO changes (collection, id) VALUES (?, ?)', changed)
+        self.last_change = self.conn.execute('SELECT MAX(seq) FROM changes').fetchone()[0]
+
+    def lock(self):
+        return self._lock.hold()
+
+    def load(self, collections=None):
+        self.data_version = self._data_version()
+        self.last_change = self.conn.execute(
+            'SELECT COALESCE(MAX(seq), 0) FROM changes').fetchone()[0]
+        data = {}
+        for name in collections or COLLECTION_NAMES:
+            data[name] = {rid: json.loads(raw)
+                          for rid, raw in self.conn.execute(f'SELECT id, data FROM {name}')}
+        return data
+
+    def load_patient(self, collection, patient_id):
+        with self._reader_lock:
+            rows = self._reader.execute(
+                f'SELECT id, data FROM {collection} WHERE patient_id = ?', (patient_id,)).fetchall()
+        return {rid: json.loads(raw) for rid, raw in rows}
+
+    def put(self, collection, rows):
+        rows = [self._row(collection, rid, record) for rid, record in rows]
+        with self.conn:
+            self.conn.executemany(
+                f'INSERT OR REPLACE INTO {collection} '
+                '(id, patient_id, date, status, treatment_type, data) VALUES (?, ?, ?, ?, ?, ?)',
+                rows)
+            self._log_changes([(collection, row[0]) for row in rows])
+
+    def delete(self, collection, record_id):
+        with self.conn:
+            self.conn.execute(f'DELETE FROM {collection} WHERE id = ?', (record_id,))
+            self._log_changes([(collection, record_id)])
+
+    def write(self, changes, sync=False):
+        if sync:
+            # NORMAL only syncs the WAL at checkpoints
+            self.conn.execute('PRAGMA synchronous=FULL')
+        try:
+            with self.conn:
+                for op, collection, record_id, record in changes:
+                    if op == 'put':
+                        self.conn.execute(
+                            f'INSERT OR REPLACE INTO {collection} '
+                            '(id, patient_id, date, status, treatment_type, data) '
+                            'VALUES (?, ?, ?, ?, ?, ?)', self._row(collection, record_id, record))
+                    else:
+                        self.conn.execute(f'DELETE FROM {collection} WHERE id = ?', (record_id,))
+                self._log_changes([(collection, record_id) for _, collection, record_id, _ in changes])
+        finally:
+            if sync:
+                self.conn.execute('PRAGMA synchronous=NORMAL')
+
+    def has_changes(self):
+        # Runs without the store lock, so it must not touch self.conn while a
+        # writer thread uses it. The reader's data_version moves on every
+        # commit, this process's included; the change log tells them apart.
+        with self._reader_lock:
+            version = self._reader.execute('PRAGMA data_version').fetchone()[0]
+            if version == self._reader_version:
+                return False
+            newest = self._reader.execute('SELECT COALESCE(MAX(seq), 0) FROM changes').fetchone()[0]
+            if newest != self.last_change:
+                return True
+            self._reader_version = version  # caught up until the next commit
+            return False
+
+    def changes(self):
+        version = self._data_version()
+        if version == self.data_version:
+            return None, []
+        oldest = self.conn.execute('SELECT MIN(seq) FROM changes').fetchone()[0]
+        if oldest is not None and oldest > self.last_change + 1:
+            return self.load(), []  # fell behind the trimmed change log
+
+        entries = []
+        changed = self.conn.execute(
+            'SELECT seq, collection, id FROM changes WHERE seq > ? ORDER BY seq',
+            (self.last_change,)).fetchall()
+        for seq, collection, record_id in changed:
+            row = self.conn.execute(
+                f'SELECT data FROM {collection} WHERE id = ?', (record_id,)).fetchone()
+            if row is None:
+                entries.append(('delete', collection, record_id, None))
+            else:
+                entries.append(('put', collection, record_id, json.loads(row[0])))
+            self.last_change = seq
+        self.data_version = version
+        return None, entries
+
+    def needs_checkpoint(self):
+        # Writes are durable already; checkpoints only trim the change log
+        return self.last_change - self._trimmed_at >= self.trim_every
+
+    def begin_checkpoint(self):
+        # Trim the change log to keep_changes rows and fold the WAL into
+        # the database; no snapshot is needed
+        with self.conn:
+            self.conn.execute('DELETE FROM changes WHERE seq <= ?',
+                              (self.last_change - self.keep_changes,))
+        self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        self._trimmed_at = self.last_change
+        return False
+
+    def write_checkpoint(self, data, text=None):
+        pass
+
+    def end_checkpoint(self):
+        pass
+
+    def scan(self, collection, patient_id=None, start=None, before=None):
+        """Yield (record_id, record) for matching records, in date order.
+
+        Reads on a connection of its own, so a long scan sees one
+        consistent snapshot and never shares a cursor with writers.
+        """
+        clauses, params = [], []
+        if patient_id is not None:
+            clauses.append('patient_id = ?')
+            params.append(patient_id)
+        if start is not None:
+            clauses.append('date >= ?')
+            params.append(start)
+        if before is not None:
+            clauses.append('date < ?')
+            params.append(before)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        conn = sqlite3.connect(self.db_file)
+        try:
+            for record_id, raw in conn.execute(
+                    f'SELECT id, data FROM {collection}{where} ORDER BY date, id', params):
+                yield record_id, json.loads(raw)
+        finally:
+            conn.close()
+
+    def close(self):
+        self._reader.close()
+        self.conn.close()
+
+
+def sqlite_path(location):
+    """Return the database path if location names an SQLite store, else None"""
+    if location.startswith('sqlite:///'):
+        return location[len('sqlite:///'):]
+    if location.endswith(('.db', '.sqlite', '.sqlite3')):
+        return location
+    return None
+
+
+def open_store(location, compact_after=500, binary_snapshot=True):
+    """Open a store from a file name or an sqlite:/// URL"""
+    db_file = sqlite_path(location)
+    if db_file is not None:
+        return SqliteStore(db_file)
+    return JsonStore(location, compact_after=compact_after, binary_snapshot=binary_snapshot)
+
+
+def migrate(source, target):
+    """Copy every record from one store location into another"""
+    src = open_store(source)
+    dst = open_store(target)
+    with src.lock():
+        data = src.load()
+    with dst.lock():
+        dst.load()
+        for name in COLLECTION_NAMES:
+            dst.put(name, data[name].items())
+    try:
+        if dst.begin_checkpoint():
+            dst.write_checkpoint(data)
+    finally:
+        dst.end_checkpoint()
+    src.close()
+    dst.close()
+    return {name: len(records) for name, records in data.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Orthodontics data store tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    migrate_parser = subparsers.add_parser('migrate', help='Copy all records between stores')
+    migrate_parser.add_argument('source', help='e.g. orthodontics_data.json')
+    migrate_parser.add_argument('target', help='e.g. orthodontics.db')
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        counts = migrate(args.source, args.target)
+        for name, count in counts.items():
+            print(f"✅ {name}: {count} records")
+
+
+if __name__ == '__main__':
+    main()
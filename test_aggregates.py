@@ -0,0 +1,79 @@
+"""Dashboard figures: the recent-records heap and the counts behind the dashboard"""
+
+from types import SimpleNamespace
+
+from aggregates import RecentRecords
+from orthodontics_app import OrthodonticsDataManager
+from storage import JsonStore
+from test_records import appointment, patient, treatment_plan
+
+
+def created(**dates):
+    return {rid: SimpleNamespace(created_date=date) for rid, date in dates.items()}
+
+
+def test_keeps_the_newest_records():
+    records = created(p1='2025-01-01', p2='2025-03-01', p3='2025-02-01', p4='2025-04-01')
+    recent = RecentRecords('created_date', size=2, slack=1)
+    for rid, record in records.items():
+        recent.add(rid, record)
+    assert recent.newest(records) == [records['p4'], records['p2']]
+
+
+def test_update_moves_a_record():
+    records = created(p1='2025-01-01', p2='2025-02-01')
+    recent = RecentRecords('created_date', size=1)
+    recent.rebuild(records)
+    records['p1'] = SimpleNamespace(created_date='2025-05-01')
+    recent.add('p1', records['p1'])
+    assert recent.newest(records) == [records['p1']]
+
+
+def test_deleting_below_size_rebuilds_from_the_records():
+    records = created(p1='2025-01-01', p2='2025-02-01', p3='2025-03-01')
+    recent = RecentRecords('created_date', size=2, slack=1)
+    recent.rebuild(records)  # holds p3 and p2 only
+    recent.remove('p3')
+    del records['p3']
+    # p1 was never in the heap, but belongs in the top two now
+    assert recent.newest(records) == [records['p2'], records['p1']]
+
+
+def test_missing_values_sort_oldest():
+    records = {'p1': SimpleNamespace(created_date=None), 'p2': SimpleNamespace(created_date='2025-01-01')}
+    recent = RecentRecords('created_date', size=1)
+    recent.rebuild(records)
+    assert recent.newest(records) == [records['p2']]
+
+
+def test_dashboard_follows_saves_and_deletes(data_file):
+    manager = OrthodonticsDataManager(store=JsonStore(data_file))
+    for n in range(7):
+        manager.save_record('patients', f'p{n}', patient(f'p{n}', created_date=f'2025-01-0{n + 1}T09:00:00'))
+    manager.save_record('treatment_plans', 't1', treatment_plan('t1'))
+    manager.save_record('treatment_plans', 't2', treatment_plan('t2', status='Completed'))
+    manager.save_record('appointments', 'a1', appointment('a1', date='2025-03-04'))
+    manager.save_record('appointments', 'a2', appointment('a2', date='2025-03-05', time='11:00'))
+
+    stats = manager.dashboard('2025-03-04')
+    assert stats['total_patients'] == 7
+    assert stats['active_treatments'] == 1
+    assert stats['today_appointments'] == 1
+    assert [p.patient_id for p in stats['recent_patients']] == ['p6', 'p5', 'p4', 'p3', 'p2']
+
+    manager.save_record('treatment_plans', 't2', treatment_plan('t2', status='active'))
+    manager.delete_record('patients', 'p6')
+    manager.delete_record('appointments', 'a1')
+    stats = manager.dashboard('2025-03-04')
+    assert stats['total_patients'] == 6
+    assert stats['active_treatments'] == 2
+    assert stats['today_appointments'] == 0
+    assert [p.patient_id for p in stats['recent_patients']] == ['p5', 'p4', 'p3', 'p2', 'p1']
+
+
+def test_dashboard_page_renders(client):
+    client.post('/api/patients', json={'first_name': 'Dash', 'last_name': 'Boardman',
+                                       'date_of_birth': '2011-05-05', 'phone': '555-0101'})
+    response = client.get('/')
+    assert response.status_code == 200
+    assert 'Boardman' in response.get_data(as_text=True)
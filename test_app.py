@@ -0,0 +1,90 @@
+"""NP scheduler API: appointments are checked before they are booked or moved"""
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Test client for app.py on an empty data file"""
+    data = app.SchedulerData(str(tmp_path / 'np_scheduler_data.json'))
+    monkeypatch.setattr(app, 'scheduler_data', data)
+    client = app.app.test_client()
+    patient = client.post('/api/patients', json={'name': 'Ada Lovelace'}).get_json()['patient']
+    client.patient_id = patient['patient_id']
+    return client
+
+
+def book(client, time, date='2025-03-04', duration=30):
+    response = client.post('/api/appointments', json={
+        'patient_id': client.patient_id, 'date': date, 'time': time, 'duration': duration})
+    return response.get_json()['appointment']['apt_id']
+
+
+def test_uncancelling_into_a_taken_slot_is_rejected(client):
+    first = book(client, '09:00')
+    client.put(f'/api/appointments/{first}', json={'status': 'Cancelled'})
+    second = book(client, '09:00')
+
+    response = client.put(f'/api/appointments/{first}', json={'status': 'Scheduled'})
+    assert response.status_code == 409
+    assert response.get_json()['conflicts'] == [second]
+    assert app.scheduler_data.appointments[first].status == 'Cancelled'
+
+
+def test_moving_onto_another_booking_is_rejected(client):
+    first = book(client, '09:00')
+    book(client, '10:00', duration=60)
+
+    response = client.put(f'/api/appointments/{first}', json={'time': '10:30'})
+    assert response.status_code == 409
+    assert app.scheduler_data.appointments[first].time == '09:00'
+
+    response = client.put(f'/api/appointments/{first}', json={'date': '2025-03-05', 'time': '10:30'})
+    assert response.status_code == 200
+    assert response.get_json()['appointment']['date'] == '2025-03-05'
+
+
+def test_editing_in_place_does_not_conflict_with_itself(client):
+    first = book(client, '09:00', duration=60)
+
+    response = client.put(f'/api/appointments/{first}', json={'duration': 90, 'notes': 'longer'})
+    assert response.status_code == 200
+    assert app.scheduler_data.slots.conflicts([(0, app.scheduler_data.appointments[first])]) == {0: [first]}
+
+
+@pytest.mark.parametrize('changes, error', [
+    ({'time': '9:00 AM'}, 'time must be a 24-hour HH:MM time'),
+    ({'date': 'Jan 2'}, 'date must be a YYYY-MM-DD date'),
+    ({'duration': 'long'}, 'duration must be between 1 and 1440 minutes'),
+])
+def test_unreadable_slots_are_rejected(client, changes, error):
+    response = client.post('/api/appointments', json=dict(
+        {'patient_id': client.patient_id, 'date': '2025-03-04', 'time': '09:00'}, **changes))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+
+    first = book(client, '09:00')
+    response = client.put(f'/api/appointments/{first}', json=changes)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+    # Still on the calendar, so the slot stays taken
+    assert app.scheduler_data.slots.conflicts([(0, app.scheduler_data.appointments[first])])
+
+
+def test_availability_range_is_capped(client):
+    assert client.get('/api/availability?start=0001-01-01&end=2031-01-01').status_code == 400
+    response = client.get('/api/availability?start=2031-01-01&end=2031-01-07&limit=1')
+    assert response.get_json()['slots'] == [{'date': '2031-01-01', 'time': '08:00'}]
+
+
+def test_stats_endpoint_follows_bookings(client):
+    book(client, '09:00', duration=60)
+    book(client, '10:00', duration=60)
+    response = client.get('/api/appointments/stats?start=2025-03-04&end=2025-03-04')
+    stats = response.get_json()['stats']
+    assert stats['appointments'] == 2 and stats['booked_minutes'] == 120
+    assert stats['utilization'] == round(120 / 600, 4)
+
+    assert client.get('/api/appointments/stats?start=March').status_code == 400
@@ -0,0 +1,171 @@
+"""Double-booking checks, slot validation and free-slot search"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from availability import (IntervalIndex, check_date, check_duration, check_time, format_minutes,
+                          parse_minutes)
+
+
+def booking(time, duration=30, provider='Dr. Smith', date='2025-03-04', status='Scheduled'):
+    return SimpleNamespace(provider=provider, date=date, time=time,
+                           duration_minutes=duration, status=status)
+
+
+def index_with(**bookings):
+    index = IntervalIndex()
+    index.rebuild(bookings)
+    return index
+
+
+def test_minutes_round_trip():
+    assert parse_minutes('09:30') == 570
+    assert parse_minutes('09:30:00') == 570
+    assert format_minutes(570) == '09:30'
+
+
+def test_overlaps_are_conflicts():
+    index = index_with(a1=booking('09:00', 60))
+    assert index.conflicts([('a2', booking('09:30'))]) == {'a2': ['a1']}
+    assert index.conflicts([('a2', booking('08:30', 60))]) == {'a2': ['a1']}
+    assert index.conflicts([('a2', booking('08:00', 180))]) == {'a2': ['a1']}
+
+
+def test_adjacent_and_elsewhere_are_not():
+    index = index_with(a1=booking('09:00', 60))
+    assert index.conflicts([('a2', booking('10:00')),
+                            ('a3', booking('08:30')),
+                            ('a4', booking('09:00', provider='Dr. Jones')),
+                            ('a5', booking('09:00', date='2025-03-05'))]) == {}
+
+
+def test_long_booking_earlier_in_the_day_is_found():
+    index = index_with(a1=booking('08:00', 240), a2=booking('11:00'), a3=booking('11:30'))
+    assert index.conflicts([('a4', booking('11:45'))]) == {'a4': ['a3', 'a1']}
+
+
+def test_cancelled_bookings_free_their_slot():
+    index = index_with(a1=booking('09:00', status='Cancelled'))
+    assert index.conflicts([('a2', booking('09:00'))]) == {}
+    assert index.conflicts([('a2', booking('09:00', status='cancelled'))]) == {}
+
+
+def test_a_record_never_conflicts_with_itself():
+    index = index_with(a1=booking('09:00', 60))
+    assert index.conflicts([('a1', booking('09:30', 60))]) == {}
+
+
+def test_a_batch_cannot_double_book_itself():
+    index = IntervalIndex()
+    found = index.conflicts([('a1', booking('09:00')), ('a2', booking('09:15'))])
+    assert found == {'a2': ['a1']}
+
+
+def test_remove_frees_the_slot():
+    index = index_with(a1=booking('09:00'))
+    index.remove('a1')
+    assert index.conflicts([('a2', booking('09:00'))]) == {}
+
+
+def test_single_calendar_ignores_provider():
+    index = IntervalIndex(provider_field=None, duration_field='duration')
+    index.add('1', SimpleNamespace(date='2025-03-04', time='09:00', duration=30, status='Scheduled'))
+    other = SimpleNamespace(date='2025-03-04', time='09:00', duration=30, status='Scheduled')
+    assert index.conflicts([('2', other)]) == {'2': ['1']}
+
+
+def test_free_slots_skip_bookings():
+    index = index_with(a1=booking('08:00', 60), a2=booking('09:30'))
+    slots = list(index.free_slots('Dr. Smith', '2025-03-04', '2025-03-04', 30, limit=3))
+    assert slots == [('2025-03-04', '09:00'), ('2025-03-04', '10:00'), ('2025-03-04', '10:30')]
+
+
+def test_free_slots_fit_the_duration_and_the_day():
+    index = index_with(a1=booking('09:00'))
+    slots = list(index.free_slots('Dr. Smith', '2025-03-04', '2025-03-04', 90, limit=20))
+    assert ('2025-03-04', '08:00') not in slots  # runs into the 09:00 booking
+    assert slots[0] == ('2025-03-04', '09:30')
+    assert slots[-1] == ('2025-03-04', '16:30')  # ends at 18:00
+    assert len(slots) == 15
+
+
+def test_free_slots_start_after_not_before():
+    index = IntervalIndex()
+    slots = index.free_slots('Dr. Smith', '2025-03-03', '2025-03-05', 30, limit=1,
+                             not_before=datetime(2025, 3, 4, 10, 10))
+    assert list(slots) == [('2025-03-04', '10:30')]
+
+
+@pytest.mark.parametrize('check, value', [
+    (check_date, 'Jan 2'), (check_date, '2025-2-30'), (check_date, '2025-02-30'), (check_date, None),
+    (check_time, '9:00 AM'), (check_time, '9:00'), (check_time, '24:00'), (check_time, 900),
+    (check_duration, 'long'), (check_duration, 0), (check_duration, 24 * 60 + 1),
+])
+def test_unreadable_slots_are_rejected(check, value):
+    with pytest.raises(ValueError):
+        check(value)
+
+
+def test_conflicts_refuse_what_they_cannot_read():
+    index = index_with(a1=booking('09:00'))
+    with pytest.raises(ValueError):
+        index.conflicts([('a2', booking('9:00 AM'))])
+    # ...while a stored record like that still loads, just off the calendar
+    index.add('a3', booking('9:00 AM'))
+    assert index.conflicts([('a4', booking('09:00'))]) == {'a4': ['a1']}
+
+
+@pytest.fixture
+def patient_id(client):
+    response = client.post('/api/patients', json={
+        'first_name': 'Ada', 'last_name': 'Slot', 'date_of_birth': '2010-12-10', 'phone': '555-0100'})
+    return response.get_json()['patient']['patient_id']
+
+
+def new_appointment(patient, **changes):
+    return dict({'patient_id': patient, 'date': '2031-05-06', 'time': '09:00',
+                 'appointment_type': 'Adjustment', 'provider': f'Dr. {patient}'}, **changes)
+
+
+def test_api_books_a_slot_once(client, patient_id):
+    assert client.post('/api/appointments', json=new_appointment(patient_id)).status_code == 200
+    assert client.post('/api/appointments', json=new_appointment(patient_id)).status_code == 409
+
+
+@pytest.mark.parametrize('changes, error', [
+    ({'time': '9:00 AM'}, 'time must be a 24-hour HH:MM time'),
+    ({'date': 'Jan 2'}, 'date must be a YYYY-MM-DD date'),
+    ({'duration_minutes': 0}, 'duration_minutes must be between 1 and 1440 minutes'),
+    ({'patient_id': 'nobody'}, 'Invalid patient'),
+])
+def test_api_rejects_unreadable_appointments(client, patient_id, changes, error):
+    response = client.post('/api/appointments', json=new_appointment(patient_id, **changes))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+
+
+def test_bulk_import_rejects_unreadable_rows(client, patient_id):
+    response = client.post('/api/bulk/appointments', json=[
+        new_appointment(patient_id, time='10:00'), new_appointment(patient_id, time='10 AM')])
+    result = response.get_json()
+    assert result['imported'] == 1
+    assert result['errors'] == [{'row': 1, 'error': 'time must be a 24-hour HH:MM time'}]
+
+
+@pytest.mark.parametrize('query', [
+    'start=0001-01-01&end=2031-01-01',
+    'start=2031-01-10&end=2031-01-01',
+    'start=2031-01-01&end=2031-04-03',
+    'start=Jan&end=2031-01-01',
+])
+def test_availability_range_is_capped(client, query):
+    response = client.get(f'/api/availability?{query}')
+    assert response.status_code == 400
+
+
+def test_availability_within_the_cap(client):
+    response = client.get('/api/availability?start=2031-01-01&end=2031-04-02&provider=Dr. Cap&limit=2')
+    assert response.status_code == 200
+    assert response.get_json()['slots'][0] == {'date': '2031-01-01', 'time': '08:00', 'provider': 'Dr. Cap'}
@@ -0,0 +1,74 @@
+"""Bulk import from NDJSON: per-row errors, kept ids and double-booking reports"""
+
+import json
+import uuid
+
+from orthodontics_app import data_manager
+
+
+def ndjson(*rows):
+    return '\n'.join(row if isinstance(row, str) else json.dumps(row) for row in rows)
+
+
+def post(client, path, body):
+    return client.post(path, data=body, content_type='application/x-ndjson')
+
+
+def new_patient(**changes):
+    return dict({'first_name': 'Bulk', 'last_name': 'Loader', 'date_of_birth': '2010-01-01',
+                 'phone': '555-0110'}, **changes)
+
+
+def test_ndjson_rows_are_imported_and_bad_lines_reported(client):
+    kept = f'bulk-{uuid.uuid4()}'
+    response = post(client, '/api/bulk/patients', ndjson(
+        new_patient(patient_id=kept),
+        '',  # blank lines are skipped and not numbered
+        '{"first_name": "Torn',
+        '[1, 2]',
+        new_patient(last_name='Second'),
+        new_patient(patient_id=kept),
+    ))
+    result = response.get_json()
+    assert response.status_code == 200
+    assert result['imported'] == 2 and not result['success']
+    assert result['ids'][0] == kept
+    assert result['errors'] == [
+        {'row': 1, 'error': 'Invalid JSON'},
+        {'row': 2, 'error': 'Row must be a JSON object'},
+        {'row': 4, 'error': f'patient_id {kept} already exists'},
+    ]
+    assert data_manager.patients[kept].last_name == 'Loader'
+    assert data_manager.patients[result['ids'][1]].last_name == 'Second'
+
+
+def test_jsonl_mimetype_is_accepted(client):
+    response = client.post('/api/bulk/patients', data=ndjson(new_patient()),
+                           content_type='application/jsonl')
+    assert response.get_json()['imported'] == 1
+
+
+def test_nothing_importable_is_a_bad_request(client):
+    response = post(client, '/api/bulk/patients', ndjson('not json', new_patient(phone=None)))
+    assert response.status_code == 400
+    assert [error['row'] for error in response.get_json()['errors']] == [0, 1]
+
+
+def test_body_that_is_neither_format_is_rejected(client):
+    response = client.post('/api/bulk/patients', data='{"a": 1}', content_type='application/json')
+    assert response.status_code == 400
+    assert 'NDJSON' in response.get_json()['error']
+
+
+def test_double_booked_rows_are_reported_and_the_rest_saved(client):
+    patient_id = post(client, '/api/bulk/patients', ndjson(new_patient())).get_json()['ids'][0]
+    provider = f'Dr. {patient_id}'
+    rows = [{'patient_id': patient_id, 'date': '2031-07-01', 'time': time,
+             'duration_minutes': 30, 'appointment_type': 'Adjustment', 'provider': provider}
+            for time in ('09:00', '09:30', '09:15')]
+    result = post(client, '/api/bulk/appointments', ndjson(*rows)).get_json()
+    assert result['imported'] == 2
+    [error] = result['errors']
+    assert error['row'] == 2 and len(error['conflicts']) == 2
+    booked = {data_manager.appointments[apt_id].time for apt_id in result['ids']}
+    assert booked == {'09:00', '09:30'}
@@ -0,0 +1,85 @@
+"""Calendar queries: appointments_between, the month view and /api/calendar"""
+
+import pytest
+
+from orthodontics_app import OrthodonticsDataManager
+from storage import JsonStore
+from test_records import appointment, patient
+
+
+@pytest.fixture
+def manager(data_file):
+    manager = OrthodonticsDataManager(store=JsonStore(data_file))
+    manager.save_record('patients', 'p1', patient())
+    manager.save_records('appointments', [
+        ('a1', appointment('a1', date='2025-03-04', time='14:00')),
+        ('a2', appointment('a2', date='2025-03-04', time='09:00')),
+        ('a3', appointment('a3', date='2025-03-06', time='09:00', provider='Dr. Jones')),
+        ('a4', appointment('a4', date='2025-03-08', time='09:00')),
+    ])
+    return manager
+
+
+def ids_by_day(days):
+    return {date: [apt.appointment_id for apt, _ in appointments] for date, appointments in days.items()}
+
+
+def test_every_day_is_listed_with_appointments_in_time_order(manager):
+    days = manager.appointments_between('2025-03-03', '2025-03-07')
+    assert ids_by_day(days) == {'2025-03-03': [], '2025-03-04': ['a2', 'a1'], '2025-03-05': [],
+                                '2025-03-06': ['a3'], '2025-03-07': []}
+    assert days['2025-03-04'][0][1].patient_id == 'p1'
+
+
+def test_provider_filter(manager):
+    days = manager.appointments_between('2025-03-01', '2025-03-31', provider='Dr. Jones')
+    assert [ids for ids in ids_by_day(days).values() if ids] == [['a3']]
+    assert len(days) == 31
+
+
+def test_moves_and_deletes_are_followed(manager):
+    manager.save_record('appointments', 'a2', appointment('a2', date='2025-03-05', time='09:00'))
+    manager.delete_record('appointments', 'a1')
+    days = ids_by_day(manager.appointments_between('2025-03-04', '2025-03-05'))
+    assert days == {'2025-03-04': [], '2025-03-05': ['a2']}
+
+
+def test_malformed_dates_raise(manager):
+    with pytest.raises(ValueError):
+        manager.appointments_between('March', '2025-03-05')
+
+
+@pytest.fixture
+def booked(client):
+    patient_id = client.post('/api/patients', json={
+        'first_name': 'Cal', 'last_name': 'Endar', 'date_of_birth': '2010-01-01',
+        'phone': '555-0140'}).get_json()['patient']['patient_id']
+    for date, time in (('2031-10-01', '10:00'), ('2031-10-01', '08:00'), ('2031-10-31', '09:00')):
+        client.post('/api/appointments', json={
+            'patient_id': patient_id, 'date': date, 'time': time, 'duration_minutes': 30,
+            'appointment_type': 'Adjustment', 'provider': f'Dr. {patient_id}'})
+    return patient_id
+
+
+def test_month_view_shows_the_whole_month(client, booked):
+    page = client.get(f'/schedule?view=month&date=2031-10-15&provider=Dr. {booked}')
+    assert page.status_code == 200
+    assert page.get_data(as_text=True).count('Cal Endar') == 3
+
+
+def test_api_calendar_groups_by_day(client, booked):
+    result = client.get(f'/api/calendar?start=2031-10-01&end=2031-10-31&provider=Dr. {booked}').get_json()
+    assert len(result['days']) == 31
+    assert [apt['time'] for apt in result['days']['2031-10-01']] == ['08:00', '10:00']
+    assert result['days']['2031-10-31'][0]['patient_name'] == 'Cal Endar'
+
+
+def test_api_calendar_defaults_to_a_week(client):
+    result = client.get('/api/calendar?start=2031-10-01').get_json()
+    assert result['end'] == '2031-10-07' and len(result['days']) == 7
+
+
+@pytest.mark.parametrize('query', ['start=Oct', 'start=2031-10-10&end=2031-10-01',
+                                   'start=2031-01-01&end=2031-12-31'])
+def test_api_calendar_rejects_bad_ranges(client, query):
+    assert client.get(f'/api/calendar?{query}').status_code == 400
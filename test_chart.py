@@ -0,0 +1,86 @@
+"""Patient chart: every section for one patient, sorted, on both stores and the API"""
+
+import pytest
+
+from orthodontics_app import OrthodonticsDataManager, ProgressPhoto, data_manager
+from storage import JsonStore, SqliteStore
+from test_lazy_loading import treatment_record
+from test_records import appointment, patient, treatment_plan
+
+
+def photo(photo_id, date, patient_id='p1'):
+    return ProgressPhoto(photo_id=photo_id, patient_id=patient_id, date=date, photo_type='Intraoral',
+                         file_path=f'photos/{photo_id}.jpg', description='')
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def manager(request, tmp_path):
+    """A reopened manager, so the lazy sections start unbuilt"""
+    def store():
+        if request.param == 'sqlite':
+            return SqliteStore(str(tmp_path / 'ortho.db'))
+        return JsonStore(str(tmp_path / 'orthodontics_data.json'))
+
+    writer = OrthodonticsDataManager(store=store())
+    writer.save_records('patients', [('p1', patient('p1')), ('p2', patient('p2'))])
+    writer.save_records('treatment_plans', [
+        ('t2', treatment_plan('t2', start_date='2025-06-01')),
+        ('t1', treatment_plan('t1', start_date='2025-01-15')),
+        ('t3', treatment_plan('t3', patient_id='p2'))])
+    writer.save_records('appointments', [
+        ('a2', appointment('a2', date='2025-03-04', time='10:00')),
+        ('a1', appointment('a1', date='2025-03-04', time='09:00')),
+        ('a3', appointment('a3', date='2025-02-01', time='15:00')),
+        ('a4', appointment('a4', patient_id='p2', date='2025-03-05'))])
+    writer.save_records('treatment_records', [
+        ('r1', treatment_record('r1', date='2025-02-01')),
+        ('r2', treatment_record('r2', date='2025-03-04')),
+        ('r3', treatment_record('r3', patient_id='p2'))])
+    writer.save_records('progress_photos', [
+        ('f1', photo('f1', '2025-01-15')), ('f2', photo('f2', '2025-06-01')),
+        ('f3', photo('f3', '2025-03-01', patient_id='p2'))])
+    return OrthodonticsDataManager(store=store())
+
+
+def ids(records, field):
+    return [getattr(record, field) for record in records]
+
+
+def test_chart_sections_are_the_patients_in_order(manager):
+    chart = manager.patient_chart('p1')
+    assert chart['patient'].patient_id == 'p1'
+    assert ids(chart['treatment_plans'], 'plan_id') == ['t1', 't2']
+    assert ids(chart['appointments'], 'appointment_id') == ['a3', 'a1', 'a2']
+    assert ids(chart['treatment_records'], 'record_id') == ['r2', 'r1']  # newest first
+    assert ids(chart['progress_photos'], 'photo_id') == ['f2', 'f1']
+
+
+def test_chart_follows_changes(manager):
+    manager.save_record('treatment_records', 'r4', treatment_record('r4', date='2025-09-01'))
+    manager.delete_record('appointments', 'a3')
+    chart = manager.patient_chart('p1')
+    assert ids(chart['treatment_records'], 'record_id') == ['r4', 'r2', 'r1']
+    assert ids(chart['appointments'], 'appointment_id') == ['a1', 'a2']
+
+
+def test_chart_of_an_unknown_patient(manager):
+    assert manager.patient_chart('nobody') is None
+
+
+def test_chart_api(client):
+    patient_id = client.post('/api/patients', json={
+        'first_name': 'Chart', 'last_name': 'Reader', 'date_of_birth': '2010-01-01',
+        'phone': '555-0150'}).get_json()['patient']['patient_id']
+    for time in ('11:00', '09:00'):
+        client.post('/api/appointments', json={
+            'patient_id': patient_id, 'date': '2031-11-04', 'time': time, 'duration_minutes': 30,
+            'appointment_type': 'Adjustment', 'provider': f'Dr. {patient_id}'})
+    data_manager.save_record('treatment_records', f'r-{patient_id}',
+                             treatment_record(f'r-{patient_id}', patient_id=patient_id))
+
+    chart = client.get(f'/api/patients/{patient_id}/chart').get_json()
+    assert chart['patient']['last_name'] == 'Reader'
+    assert [apt['time'] for apt in chart['appointments']] == ['09:00', '11:00']
+    assert len(chart['treatment_records']) == 1
+    assert chart['treatment_plans'] == [] and chart['progress_photos'] == []
+    assert client.get('/api/patients/nobody/chart').status_code == 404
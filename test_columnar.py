@@ -0,0 +1,80 @@
+"""Column-oriented appointments: range queries and stats, with and without NumPy"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import columnar
+from columnar import AppointmentColumns
+
+
+@pytest.fixture(params=['array', 'numpy'], autouse=True)
+def backend(request, monkeypatch):
+    """Run every test on the array.array fallback and, when installed, on NumPy"""
+    if request.param == 'numpy':
+        monkeypatch.setattr(columnar, 'np', pytest.importorskip('numpy'))
+    else:
+        monkeypatch.setattr(columnar, 'np', None)
+
+
+def booking(date, time, duration=30, status='Scheduled', provider='Dr. Smith'):
+    return SimpleNamespace(date=date, time=time, duration_minutes=duration,
+                           status=status, provider=provider)
+
+
+def columns_with(**bookings):
+    columns = AppointmentColumns()
+    columns.rebuild(bookings)
+    return columns
+
+
+def test_range_is_inclusive_and_ordered():
+    columns = columns_with(a1=booking('2025-03-05', '09:00'), a2=booking('2025-03-04', '14:00'),
+                           a3=booking('2025-03-04', '08:30'), a4=booking('2025-03-07', '09:00'))
+    assert columns.ids_between('2025-03-04', '2025-03-05') == ['a3', 'a2', 'a1']
+    assert columns.ids_between('2025-03-06', '2025-03-06') == []
+
+
+def test_provider_filter():
+    columns = columns_with(a1=booking('2025-03-04', '09:00'),
+                           a2=booking('2025-03-04', '10:00', provider='Dr. Jones'))
+    assert columns.ids_between('2025-03-04', '2025-03-04', 'Dr. Jones') == ['a2']
+    assert columns.ids_between('2025-03-04', '2025-03-04', 'Dr. Nobody') == []
+
+
+def test_updates_and_removals_keep_rows_dense():
+    columns = AppointmentColumns()
+    for n in range(40):  # past the initial NumPy capacity
+        columns.add(f'a{n}', booking(f'2025-03-{n % 28 + 1:02d}', '09:00'))
+    columns.remove('a0')
+    columns.add('a1', booking('2025-04-01', '09:00'))
+    columns.add('bad', booking('not a date', '09:00'))  # undated: left out
+    assert len(columns) == 39
+    assert columns.ids_between('2025-04-01', '2025-04-30') == ['a1']
+    assert 'a0' not in columns.ids_between('2025-03-01', '2025-03-31')
+    assert len(columns.ids_between('2025-03-01', '2025-03-31')) == 38
+
+
+def test_stats_count_utilization_and_no_shows():
+    columns = columns_with(a1=booking('2025-03-04', '09:00', 60),
+                           a2=booking('2025-03-04', '10:00', 30, status='No-Show'),
+                           a3=booking('2025-03-04', '11:00', 90, status='Cancelled'),
+                           a4=booking('2025-03-05', '09:00', 30, provider='Dr. Jones'))
+    stats = columns.stats('2025-03-04', '2025-03-05')
+    assert stats['appointments'] == 4
+    assert stats['by_status'] == {'Scheduled': 2, 'No-Show': 1, 'Cancelled': 1}
+    assert stats['booked_minutes'] == 120  # the cancellation frees its slot
+    assert stats['capacity_minutes'] == 2 * 600 * 2  # two days, two providers
+    assert stats['utilization'] == round(120 / 2400, 4)
+    assert stats['no_shows'] == 1
+    assert stats['no_show_rate'] == round(1 / 3, 4)  # cancellations were not due
+
+    smith = columns.stats('2025-03-04', '2025-03-04', provider='Dr. Smith')
+    assert smith['capacity_minutes'] == 600 and smith['booked_minutes'] == 90
+
+
+def test_stats_of_an_empty_range():
+    stats = AppointmentColumns().stats('2025-03-04', '2025-03-10')
+    assert stats['appointments'] == 0
+    assert stats['utilization'] == 0.0 and stats['no_show_rate'] == 0.0
+
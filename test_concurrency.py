@@ -0,0 +1,101 @@
+"""Reader/writer lock and the inter-process file lock"""
+
+import threading
+import time
+
+import pytest
+
+from concurrency import FileLock, RWLock
+
+TIMEOUT = 5
+
+
+def in_thread(func):
+    thread = threading.Thread(target=func, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_readers_share_the_lock():
+    lock, inside = RWLock(), threading.Barrier(3, timeout=TIMEOUT)
+
+    def reader():
+        with lock.read():
+            inside.wait()  # only passes if all three hold the lock at once
+    threads = [in_thread(reader) for _ in range(3)]
+    for thread in threads:
+        thread.join(TIMEOUT)
+    assert not inside.broken
+
+
+def holder(lock_context, entered, release):
+    """Thread body: hold lock_context until release is set"""
+    def hold():
+        with lock_context():
+            entered.set()
+            release.wait(TIMEOUT)
+    return hold
+
+
+@pytest.mark.parametrize('mode', ['read', 'write'])
+def test_writer_excludes_readers_and_writers(mode):
+    lock, entered, release = RWLock(), threading.Event(), threading.Event()
+    with lock.write():
+        thread = in_thread(holder(getattr(lock, mode), entered, release))
+        assert not entered.wait(0.05)
+    assert entered.wait(TIMEOUT)
+    release.set()
+    thread.join(TIMEOUT)
+
+
+def test_waiting_writer_goes_before_new_readers():
+    lock, order = RWLock(), []
+    reading, writer_waiting = threading.Event(), threading.Event()
+
+    def writer():
+        writer_waiting.set()
+        with lock.write():
+            order.append('write')
+
+    def late_reader():
+        with lock.read():
+            order.append('late read')
+
+    with lock.read():
+        first = in_thread(writer)
+        writer_waiting.wait(TIMEOUT)
+        time.sleep(0.05)  # the writer is queued behind this reader
+        second = in_thread(late_reader)
+        time.sleep(0.05)
+        assert order == []  # the new reader waits for the writer
+    first.join(TIMEOUT)
+    second.join(TIMEOUT)
+    assert order == ['write', 'late read']
+
+
+def test_an_exception_releases_the_lock():
+    lock = RWLock()
+    with pytest.raises(ValueError):
+        with lock.write():
+            raise ValueError
+    with pytest.raises(ValueError):
+        with lock.read():
+            raise ValueError
+    entered, release = threading.Event(), threading.Event()
+    thread = in_thread(holder(lock.write, entered, release))
+    assert entered.wait(TIMEOUT)
+    release.set()
+    thread.join(TIMEOUT)
+
+
+def test_file_lock_excludes_other_holders(tmp_path):
+    path = str(tmp_path / 'data.lock')
+    first, second = FileLock(path), FileLock(path)
+    handle = first.acquire()
+    assert second.try_acquire() is None
+    first.release(handle)
+    handle = second.try_acquire()
+    assert handle is not None
+    second.release(handle)
+    with first.hold():
+        assert second.try_acquire() is None
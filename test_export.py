@@ -0,0 +1,96 @@
+"""Streaming NDJSON/CSV export: chunking, date ranges, the API and the CLI"""
+
+import csv
+import io
+import json
+import sys
+
+import pytest
+
+import export
+from export import csv_chunks, date_range, export_chunks, ndjson_chunks
+from storage import open_store
+
+
+def test_date_range_makes_the_end_inclusive():
+    assert date_range('2025-03-01', '2025-03-31') == ('2025-03-01', '2025-04-01')
+    assert date_range() == (None, None)
+    with pytest.raises(ValueError):
+        date_range('March')
+
+
+def test_ndjson_round_trips_in_chunks(monkeypatch):
+    monkeypatch.setattr(export, 'CHUNK_SIZE', 100)
+    rows = [{'n': n, 'notes': 'x' * 30} for n in range(20)]
+    chunks = list(ndjson_chunks(iter(rows)))
+    assert len(chunks) > 1
+    assert [json.loads(line) for line in ''.join(chunks).splitlines()] == rows
+
+
+def test_csv_writes_nested_values_as_json(monkeypatch):
+    monkeypatch.setattr(export, 'CHUNK_SIZE', 50)
+    rows = [{'id': f'r{n}', 'tags': ['a', 'b'], 'notes': None} for n in range(10)]
+    chunks = list(csv_chunks(iter(rows), ['id', 'tags', 'notes']))
+    assert len(chunks) > 1
+    table = list(csv.reader(io.StringIO(''.join(chunks))))
+    assert table[0] == ['id', 'tags', 'notes']
+    assert table[1] == ['r0', '["a","b"]', '']
+    assert len(table) == 11
+
+
+def test_csv_header_comes_from_the_first_row_or_is_empty():
+    assert ''.join(export_chunks(iter([{'b': 1, 'a': 2}]), 'csv')).splitlines() == ['b,a', '1,2']
+    assert ''.join(export_chunks(iter([]), 'csv')) == '\r\n'
+
+
+@pytest.fixture
+def booked(client):
+    patient_id = client.post('/api/patients', json={
+        'first_name': 'Ex', 'last_name': 'Porter', 'date_of_birth': '2010-01-01',
+        'phone': '555-0120'}).get_json()['patient']['patient_id']
+    for date in ('2031-08-01', '2031-08-31', '2031-09-01'):
+        client.post('/api/appointments', json={
+            'patient_id': patient_id, 'date': date, 'time': '09:00', 'duration_minutes': 30,
+            'appointment_type': 'Adjustment', 'provider': f'Dr. {patient_id}'})
+    return patient_id
+
+
+def test_api_exports_one_patient_and_month_as_ndjson(client, booked):
+    response = client.get(f'/api/export/appointments?patient_id={booked}&from=2031-08-01&to=2031-08-31')
+    assert response.mimetype == 'application/x-ndjson'
+    assert 'appointments.ndjson' in response.headers['Content-Disposition']
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(row['date'] for row in rows) == ['2031-08-01', '2031-08-31']
+
+
+def test_api_exports_csv_with_every_field(client, booked):
+    response = client.get(f'/api/export/appointments?patient_id={booked}&format=csv')
+    table = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(table) == 3
+    assert {'appointment_id', 'treatment_notes', 'next_appointment_recommended'} <= set(table[0])
+
+
+@pytest.mark.parametrize('url, status', [
+    ('/api/export/invoices', 404),
+    ('/api/export/appointments?format=xml', 400),
+    ('/api/export/appointments?from=Aug', 400),
+])
+def test_api_rejects_bad_requests(client, url, status):
+    assert client.get(url).status_code == status
+
+
+def test_cli_streams_from_the_store(tmp_path, monkeypatch, capsys):
+    location = str(tmp_path / 'ortho.db')
+    store = open_store(location)
+    with store.lock():
+        store.load()
+        store.put('appointments', [
+            ('a1', {'appointment_id': 'a1', 'patient_id': 'p1', 'date': '2025-03-04'}),
+            ('a2', {'appointment_id': 'a2', 'patient_id': 'p2', 'date': '2025-03-04'})])
+    store.close()
+
+    monkeypatch.setattr(sys, 'argv', ['export.py', 'appointments', '--data', location,
+                                      '--patient', 'p1', '--format', 'csv'])
+    export.main()
+    assert capsys.readouterr().out.splitlines() == ['appointment_id,patient_id,date',
+                                                    'a1,p1,2025-03-04']
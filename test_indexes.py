@@ -0,0 +1,115 @@
+"""Field lookups and keyset (cursor) pagination"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from indexes import FieldIndex, SortedIndex, decode_cursor, encode_cursor
+from orthodontics_app import OrthodonticsDataManager
+from storage import JsonStore
+from test_records import appointment, patient
+
+
+def by_name():
+    index = SortedIndex(lambda p: p.name)
+    index.rebuild({f'p{n:02d}': SimpleNamespace(name=name)
+                   for n, name in enumerate(['Cole', 'Abel', 'Baker', 'Abel', 'Drew'])})
+    return index
+
+
+def walk(index, limit, reverse=False):
+    """Every record id, one page at a time through encoded cursors"""
+    ids, cursor = [], None
+    while True:
+        entries, more = index.page(decode_cursor(cursor) if cursor else None, limit, reverse)
+        ids += [record_id for _, record_id in entries]
+        if not more:
+            return ids
+        cursor = encode_cursor(entries[-1])
+
+
+def test_field_index_follows_updates():
+    index = FieldIndex('status', key=str.lower)
+    index.add('t1', SimpleNamespace(status='Active'))
+    index.add('t2', SimpleNamespace(status='active'))
+    index.add('t1', SimpleNamespace(status='Completed'))
+    assert index.get('ACTIVE') == ['t2']
+    assert index.get('completed') == ['t1']
+    index.remove('t2')
+    assert index.count('active') == 0
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 5, 10])
+def test_pages_cover_every_record_once(limit):
+    index = by_name()
+    expected = ['p01', 'p03', 'p02', 'p00', 'p04']  # ties broken by id
+    assert walk(index, limit) == expected
+    assert walk(index, limit, reverse=True) == expected[::-1]
+
+
+def test_page_can_start_at_a_key():
+    entries, more = by_name().page(('B',), limit=2)
+    assert [record_id for _, record_id in entries] == ['p02', 'p00']
+    assert more
+
+
+def test_pages_stay_consistent_while_records_change():
+    index = by_name()
+    entries, _ = index.page(limit=2)
+    index.remove('p01')  # already shown
+    index.add('p05', SimpleNamespace(name='Aaron'))  # sorts before the cursor
+    entries, _ = index.page(entries[-1], limit=10)
+    assert [record_id for _, record_id in entries] == ['p02', 'p00', 'p04']
+
+
+def test_groups_page_separately():
+    index = SortedIndex(lambda a: a.date, group_field='patient_id')
+    index.rebuild({'a1': SimpleNamespace(patient_id='p1', date='2025-03-01'),
+                   'a2': SimpleNamespace(patient_id='p2', date='2025-02-01'),
+                   'a3': SimpleNamespace(patient_id='p1', date='2025-01-01')})
+    entries, more = index.page(group='p1')
+    assert [record_id for _, record_id in entries] == ['a3', 'a1'] and not more
+    assert index.count('p2') == 1
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', encode_cursor(('a',)), 'WzEsMl0'])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_manager_pages_by_cursor(data_file):
+    manager = OrthodonticsDataManager(store=JsonStore(data_file))
+    for n in range(7):
+        manager.save_record('patients', f'p{n}', patient(f'p{n}', last_name=f'Name{6 - n}'))
+        manager.save_record('appointments', f'a{n}',
+                            appointment(f'a{n}', date=f'2025-03-0{n + 1}', provider=f'Dr. {n}'))
+
+    names, cursor = [], None
+    while True:
+        page, cursor = manager.page('patients', 'by_name',
+                                    decode_cursor(cursor) if cursor else None, limit=3)
+        names += [p.last_name for p in page]
+        if cursor is None:
+            break
+    assert names == [f'Name{n}' for n in range(7)]
+
+    page, cursor = manager.page('appointments', 'by_time', ('2025-03-05',), limit=10)
+    assert [a.appointment_id for a in page] == ['a4', 'a5', 'a6'] and cursor is None
+
+
+def test_api_pages_to_the_end(client):
+    added = [client.post('/api/patients', json={
+        'first_name': 'Page', 'last_name': f'Walker{n}', 'date_of_birth': '2012-01-01',
+        'phone': '555-0100'}).get_json()['patient']['patient_id'] for n in range(3)]
+    response = client.get('/api/patients?limit=1')
+    seen = []
+    while True:
+        body = response.get_json()
+        seen += [p['patient_id'] for p in body['patients']]
+        if not body['next_cursor']:
+            break
+        response = client.get(f"/api/patients?limit=1&cursor={body['next_cursor']}")
+    assert len(seen) == len(set(seen))
+    assert set(added) <= set(seen)
+    assert client.get('/api/patients?cursor=bogus').status_code == 400
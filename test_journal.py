@@ -0,0 +1,113 @@
+"""Journal replay, rotation and JsonStore compaction"""
+
+import json
+
+from journal import Journal
+from storage import JsonStore
+
+
+def put(number, **fields):
+    return ('put', 'patients', f'p{number}', dict({'patient_id': f'p{number}'}, **fields))
+
+
+def test_replay_returns_entries_in_order(tmp_path):
+    journal = Journal(str(tmp_path / 'data.journal'))
+    journal.append_many([put(1), put(2)])
+    journal.append('delete', 'patients', 'p1')
+
+    assert Journal(journal.path).replay() == [put(1), put(2), ('delete', 'patients', 'p1', None)]
+
+
+def test_replay_skips_a_line_torn_by_a_crash(tmp_path):
+    journal = Journal(str(tmp_path / 'data.journal'))
+    journal.append_many([put(1)])
+    with open(journal.path, 'a') as f:
+        f.write('{"op": "put", "collection": "pati')  # power cut mid-append
+    journal.append_many([put(2)])
+
+    assert Journal(journal.path).replay() == [put(1), put(2)]
+
+
+def test_rotated_journal_replays_before_the_live_one(tmp_path):
+    journal = Journal(str(tmp_path / 'data.journal'))
+    journal.append_many([put(1, first_name='old')])
+    assert journal.rotate()
+    journal.append_many([put(1, first_name='new')])
+
+    assert [entry[3]['first_name'] for entry in Journal(journal.path).replay()] == ['old', 'new']
+    journal.discard_rotated()
+    assert Journal(journal.path).replay() == [put(1, first_name='new')]
+
+
+def test_rotating_twice_keeps_the_unfinished_compaction(tmp_path):
+    journal = Journal(str(tmp_path / 'data.journal'))
+    journal.append_many([put(1)])
+    journal.rotate()  # a compaction that never finished
+    journal.append_many([put(2)])
+    journal.rotate()
+
+    assert Journal(journal.path).replay() == [put(1), put(2)]
+
+
+def test_read_new_returns_only_other_processes_entries(tmp_path):
+    path = str(tmp_path / 'data.journal')
+    mine, theirs = Journal(path), Journal(path)
+    mine.append_many([put(1)])
+    theirs.replay()
+    assert theirs.read_new() == []
+
+    mine.append_many([put(2)])
+    assert theirs.read_new() == [put(2)]
+    assert theirs.entries == 2
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(data_file):
+    store = JsonStore(data_file)
+    with store.lock():
+        store.load()
+        store.write([put(1), put(2), ('delete', 'patients', 'p1', None)])
+
+    assert store.begin_checkpoint()
+    with store.lock():
+        data = store.load()
+    store.write_checkpoint(data)
+    store.end_checkpoint()
+
+    with open(data_file) as f:
+        assert json.load(f)['patients'] == {'p2': {'patient_id': 'p2'}}
+    assert Journal(store.journal.path).replay() == []
+    assert JsonStore(data_file).load()['patients'] == {'p2': {'patient_id': 'p2'}}
+
+
+def test_writes_during_compaction_survive_it(data_file):
+    store = JsonStore(data_file)
+    store.write([put(1)])
+
+    assert store.begin_checkpoint()
+    with store.lock():
+        data = store.load()
+    store.write([put(2)])  # another request while the snapshot is written
+    store.write_checkpoint(data)
+    store.end_checkpoint()
+
+    assert set(JsonStore(data_file).load()['patients']) == {'p1', 'p2'}
+
+
+def test_interrupted_compaction_loses_nothing(data_file):
+    store = JsonStore(data_file)
+    store.write([put(1)])
+    assert store.begin_checkpoint()
+    store.end_checkpoint()  # crashed before write_checkpoint
+
+    store.write([put(2)])
+    assert set(JsonStore(data_file).load()['patients']) == {'p1', 'p2'}
+
+
+def test_one_compaction_at_a_time(data_file):
+    first, second = JsonStore(data_file), JsonStore(data_file)
+    first.write([put(1)])
+    assert first.begin_checkpoint()
+    assert not second.begin_checkpoint()
+    first.end_checkpoint()
+    assert second.begin_checkpoint()
+    second.end_checkpoint()
@@ -0,0 +1,75 @@
+"""Lazy collections: left unbuilt at startup, read per patient and streamed by scan"""
+
+import pytest
+
+from orthodontics_app import OrthodonticsDataManager, TreatmentRecord
+from storage import JsonStore, SqliteStore
+
+
+def treatment_record(record_id, patient_id='p1', date='2025-03-04'):
+    return TreatmentRecord(record_id=record_id, patient_id=patient_id, appointment_id='a1',
+                           date=date, treatment_type='Adjustment', appliances_adjusted=['upper'],
+                           procedures_performed=[], progress_notes='', photos_taken=False,
+                           x_rays_taken=False, impressions_taken=False, next_steps='',
+                           provider='Dr. Smith')
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def open_manager(request, tmp_path):
+    """Opens a manager on one data location, with a few treatment records saved"""
+    def store():
+        if request.param == 'sqlite':
+            return SqliteStore(str(tmp_path / 'ortho.db'))
+        return JsonStore(str(tmp_path / 'orthodontics_data.json'))
+
+    manager = OrthodonticsDataManager(store=store())
+    manager.save_records('treatment_records', [
+        ('t1', treatment_record('t1')),
+        ('t2', treatment_record('t2', date='2025-04-01')),
+        ('t3', treatment_record('t3', patient_id='p2')),
+    ])
+    return lambda: OrthodonticsDataManager(store=store())
+
+
+def test_lazy_collections_start_unbuilt(open_manager):
+    manager = open_manager()
+    assert 'treatment_records' in manager._unloaded
+    assert manager.treatment_records == {}
+
+    assert sorted(r.record_id for r in manager.all('treatment_records')) == ['t1', 't2', 't3']
+    assert 'treatment_records' not in manager._unloaded
+    assert manager._materialized == {'treatment_records'}
+
+
+def test_find_by_patient(open_manager):
+    manager = open_manager()
+    assert sorted(r.record_id for r in manager.find('treatment_records', 'patient_id', 'p1')) == ['t1', 't2']
+    if manager.store.lazy_loading:
+        assert 'treatment_records' in manager._unloaded  # one patient read from the store
+
+
+@pytest.mark.parametrize('args, expected', [
+    ((), ['t1', 't2', 't3']),
+    (('p1',), ['t1', 't2']),
+    (('p1', '2025-04-01'), ['t2']),
+    ((None, '2025-03-01', '2025-04-01'), ['t1', 't3']),
+])
+def test_scan_streams_without_building(open_manager, args, expected):
+    manager = open_manager()
+    assert sorted(r.record_id for r in manager.scan('treatment_records', *args)) == expected
+    assert 'treatment_records' in manager._unloaded
+    assert not manager._materialized
+
+
+def test_scan_sees_writes_to_an_unbuilt_collection(open_manager):
+    manager = open_manager()
+    manager.save_record('treatment_records', 't4', treatment_record('t4', patient_id='p2'))
+    manager.delete_record('treatment_records', 't3')
+    assert [r.record_id for r in manager.scan('treatment_records', 'p2')] == ['t4']
+    assert 'treatment_records' in manager._unloaded
+
+
+def test_scan_of_a_built_collection_uses_the_indexes(open_manager):
+    manager = open_manager()
+    manager.all('treatment_records')
+    assert sorted(r.record_id for r in manager.scan('treatment_records', 'p1')) == ['t1', 't2']
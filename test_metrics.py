@@ -0,0 +1,60 @@
+"""Prometheus text output on /metrics, and per-request profiling"""
+
+import os
+
+from flask import Flask
+
+import metrics
+from metrics import Histogram
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('demo_seconds', 'Demo', ('route',), buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(seconds, '/a "quoted"')
+    assert histogram.render() == [
+        '# HELP demo_seconds Demo',
+        '# TYPE demo_seconds histogram',
+        'demo_seconds_bucket{route="/a \\"quoted\\"",le="0.1"} 1',
+        'demo_seconds_bucket{route="/a \\"quoted\\"",le="1.0"} 3',
+        'demo_seconds_bucket{route="/a \\"quoted\\"",le="+Inf"} 4',
+        'demo_seconds_sum{route="/a \\"quoted\\""} 6.050000',
+        'demo_seconds_count{route="/a \\"quoted\\""} 4',
+    ]
+
+
+def scrape(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type == metrics.CONTENT_TYPE
+    return response.get_data(as_text=True)
+
+
+def test_metrics_cover_routes_templates_data_and_gauges(client):
+    client.get('/patients')
+    client.get('/patient/nobody')
+    text = scrape(client)
+    assert 'http_request_duration_seconds_count{app="orthodontics",route="/patients",method="GET",status="200"}' in text
+    assert 'route="/patient/<patient_id>"' in text  # the rule, not each URL
+    assert 'template_render_duration_seconds_count{template="orthodontics/patients.html"}' in text
+    assert 'data_section_duration_seconds_count{section="scan",operation="page"}' in text
+    assert '# TYPE page_cache_hits gauge' in text
+    assert 'data_generation{app="orthodontics"}' in text
+    assert 'route="/metrics"' not in scrape(client)  # scrapes are not timed
+
+
+def test_profiled_request_writes_stats(tmp_path, monkeypatch):
+    monkeypatch.setenv('ORTHO_PROFILE_DIR', str(tmp_path))
+    app = Flask(__name__)
+    metrics.install(app, 'profiled')
+
+    @app.route('/work')
+    def work():
+        return str(sum(range(1000)))
+
+    client = app.test_client()
+    assert 'X-Profile' not in client.get('/work').headers
+    path = client.get('/work', headers={'X-Profile': '1'}).headers['X-Profile']
+    assert os.path.dirname(path) == str(tmp_path) and os.path.basename(path).startswith('work-')
+    assert os.path.getsize(path) > 0
+    assert not metrics._profiling.locked()
@@ -0,0 +1,94 @@
+"""Rendered page cache: ETag revalidation and invalidation by data generation"""
+
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from page_cache import PageCache, cached_page
+
+
+@pytest.fixture
+def page():
+    """A tiny app with one cached view; .renders counts real renders"""
+    app = Flask(__name__)
+    cache = PageCache(maxsize=2)
+    data = SimpleNamespace(generation=0, modified=1735725600.0)
+    state = SimpleNamespace(app=app, cache=cache, data=data, renders=0, status=200)
+
+    @app.route('/view')
+    @cached_page(cache, data)
+    def view():
+        state.renders += 1
+        return f'render {state.renders} for {data.generation}', state.status, {'X-Next-Page': '/view?page=2'}
+
+    state.client = app.test_client()
+    return state
+
+
+def test_repeat_requests_are_served_from_the_cache(page):
+    first = page.client.get('/view')
+    second = page.client.get('/view')
+    assert page.renders == 1
+    assert second.get_data() == first.get_data()
+    assert second.headers['X-Next-Page'] == '/view?page=2'
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert 'no-cache' in second.headers['Cache-Control']
+    assert page.cache.hits == 1 and page.cache.misses == 1
+
+
+def test_matching_etag_gets_304(page):
+    etag = page.client.get('/view').headers['ETag']
+    response = page.client.get('/view', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert page.client.get('/view', headers={'If-None-Match': '"other"'}).status_code == 200
+
+
+def test_a_data_change_invalidates_every_page(page):
+    etag = page.client.get('/view').headers['ETag']
+    page.data.generation += 1
+    response = page.client.get('/view', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_data() == b'render 2 for 1'
+    assert page.renders == 2
+
+
+def test_query_strings_are_cached_separately(page):
+    page.client.get('/view?date=2025-03-04')
+    page.client.get('/view?date=2025-03-05')
+    page.client.get('/view?date=2025-03-04')
+    assert page.renders == 2
+
+
+def test_least_recently_used_page_is_evicted(page):
+    for query in ('a=1', 'a=2', 'a=1', 'a=3', 'a=1', 'a=2'):
+        page.client.get(f'/view?{query}')
+    assert page.renders == 4  # a=2 was evicted by a=3
+    assert len(page.cache) == 2
+
+
+def test_errors_are_not_cached(page):
+    page.status = 500
+    page.client.get('/view')
+    page.client.get('/view')
+    assert page.renders == 2 and len(page.cache) == 0
+
+
+def test_app_pages_revalidate_until_data_changes(client):
+    url = '/schedule?date=2031-02-03'
+    etag = client.get(url).headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    patient_id = client.post('/api/patients', json={
+        'first_name': 'Cache', 'last_name': 'Buster', 'date_of_birth': '2010-01-01',
+        'phone': '555-0130'}).get_json()['patient']['patient_id']
+    # A new generation re-renders; the page is unchanged, so the ETag still matches
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    client.post('/api/appointments', json={
+        'patient_id': patient_id, 'date': '2031-02-03', 'time': '09:00', 'duration_minutes': 30,
+        'appointment_type': 'Adjustment', 'provider': 'Dr. Cache'})
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert 'Buster' in response.get_data(as_text=True)
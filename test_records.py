@@ -0,0 +1,139 @@
+"""Generated serializers: round trips, loading older data and API type checks"""
+
+import pytest
+
+from orthodontics_app import COLLECTIONS, Appointment, OrthodonticsDataManager, Patient, TreatmentPlan
+from sample_data import practice
+from storage import JsonStore
+
+
+def patient(patient_id='p1', **changes):
+    data = dict(patient_id=patient_id, first_name='Ada', last_name='Lovelace',
+                date_of_birth='2010-12-10', phone='555-0100', email='ada@example.com',
+                address='', emergency_contact='', emergency_phone='', insurance_provider='Delta',
+                insurance_id='', medical_history='', allergies='', referral_source='',
+                created_date='2025-01-02T09:00:00')
+    data.update(changes)
+    return Patient(**data)
+
+
+def appointment(appointment_id='a1', **changes):
+    data = dict(appointment_id=appointment_id, patient_id='p1', date='2025-03-04',
+                time='09:00', duration_minutes=30, appointment_type='Adjustment',
+                provider='Dr. Smith')
+    data.update(changes)
+    return Appointment(**data)
+
+
+def treatment_plan(plan_id='t1', **changes):
+    data = dict(plan_id=plan_id, patient_id='p1', diagnosis='Class II', treatment_type='Braces',
+                start_date='2025-01-15', estimated_duration_months=18, total_cost=5000.0,
+                insurance_coverage=1500.0, payment_plan='Monthly', treatment_goals='',
+                appliances_needed=[], phases=[], status='Active')
+    data.update(changes)
+    return TreatmentPlan(**data)
+
+
+def reopen(data_file):
+    return OrthodonticsDataManager(store=JsonStore(data_file))
+
+
+def test_to_dict_matches_fields():
+    record = appointment(notes='bring retainer')
+    assert Appointment.from_dict(record.to_dict()) == record
+    assert set(record.to_dict()) == {name for name in Appointment.__slots__}
+
+
+@pytest.mark.parametrize('collection', list(COLLECTIONS))
+def test_every_model_round_trips(collection):
+    cls = COLLECTIONS[collection]
+    rows = [record for name, _, record in practice(40) if name == collection]
+    assert rows
+    for row in rows:
+        record = cls.from_dict(row)
+        assert record.to_dict() == row
+        assert cls.from_dict(record.to_dict()) == record
+
+
+@pytest.mark.parametrize('checkpoint', [False, True])
+def test_null_optional_field_survives_save_and_reload(data_file, checkpoint):
+    manager = reopen(data_file)
+    # What the API stored for "email": null and "notes": null before it checked types
+    manager.save_record('patients', 'p1', patient(email=None))
+    manager.save_record('appointments', 'a1', appointment(notes=None))
+    if checkpoint:
+        assert manager.save_data()
+
+    reloaded = reopen(data_file)
+    assert reloaded.patients['p1'] == patient(email=None)
+    assert reloaded.appointments['a1'] == appointment(notes=None)
+    # ...and a checkpoint written after the reload still has them
+    assert reloaded.save_data()
+    assert reopen(data_file).patients['p1'] == patient(email=None)
+
+
+def test_from_dict_converts_old_scalars():
+    data = patient(phone=5550100).to_dict()
+    assert Patient.from_dict(data).phone == '5550100'
+
+    plan = {'plan_id': 't1', 'patient_id': 'p1', 'diagnosis': 'Class II', 'treatment_type': 'Braces',
+            'start_date': '2025-01-01', 'estimated_duration_months': '18', 'total_cost': 5000,
+            'insurance_coverage': 1500.0, 'payment_plan': 'Monthly', 'treatment_goals': '',
+            'appliances_needed': [], 'phases': [], 'notes': None}
+    loaded = TreatmentPlan.from_dict(plan)
+    assert loaded.estimated_duration_months == 18
+    assert type(loaded.total_cost) is float
+    assert loaded.notes is None
+
+
+@pytest.mark.parametrize('changes', [
+    {'phone': ['555']},
+    {'first_name': None},  # no empty default
+    {'nickname': 'Ada'},
+])
+def test_from_dict_rejects_what_it_cannot_convert(changes):
+    data = dict(patient().to_dict(), **changes)
+    with pytest.raises(TypeError):
+        Patient.from_dict(data)
+
+
+def test_load_keeps_records_from_dict_rejects(data_file):
+    manager = reopen(data_file)
+    manager.save_record('appointments', 'a1', appointment(notes=['see chart']))
+
+    assert reopen(data_file).appointments['a1'].notes == ['see chart']
+
+
+NEW_PATIENT = {'first_name': 'Grace', 'last_name': 'Hopper', 'date_of_birth': '2011-12-09',
+               'phone': '555-0101'}
+
+
+def test_api_treats_null_as_absent(client):
+    response = client.post('/api/patients', json=dict(NEW_PATIENT, email=None))
+    assert response.status_code == 200
+    assert response.get_json()['patient']['email'] == ''
+
+
+@pytest.mark.parametrize('changes, error', [
+    ({'phone': 5550101}, 'phone must be a string'),
+    ({'email': ['a@b']}, 'email must be a string'),
+    ({'first_name': None}, 'first_name is required'),
+])
+def test_api_rejects_mistyped_fields(client, changes, error):
+    response = client.post('/api/patients', json=dict(NEW_PATIENT, **changes))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
+
+
+def test_api_rejects_non_numeric_numbers(client):
+    response = client.post('/api/treatment-plans', json={
+        'patient_id': 'p1', 'diagnosis': 'Class II', 'treatment_type': 'Braces',
+        'start_date': '2025-01-01', 'total_cost': 'a lot'})
+    assert response.status_code == 400
+
+
+def test_bulk_import_reports_mistyped_rows(client):
+    response = client.post('/api/bulk/patients', json=[NEW_PATIENT, dict(NEW_PATIENT, phone=1)])
+    result = response.get_json()
+    assert result['imported'] == 1
+    assert result['errors'] == [{'row': 1, 'error': 'phone must be a string'}]
@@ -0,0 +1,67 @@
+"""Synthetic practices: no double-booking, repeatable output, safe overwrites"""
+
+import json
+import os
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from availability import IntervalIndex
+from orthodontics_app import Appointment
+from sample_data import practice, scheduler_practice, write_orthodontics, write_scheduler
+from storage import JsonStore
+
+
+def test_no_provider_is_double_booked():
+    appointments = [(record_id, Appointment.from_dict(record))
+                    for collection, record_id, record in practice(300, years=1)
+                    if collection == 'appointments']
+    assert len(appointments) > 1000
+    assert IntervalIndex().conflicts(appointments) == {}
+
+
+def test_scheduler_calendar_is_not_double_booked():
+    appointments = [(apt_id, SimpleNamespace(**record))
+                    for collection, apt_id, record in scheduler_practice(300, years=1)
+                    if collection == 'appointments']
+    assert len(appointments) > 500
+    index = IntervalIndex(provider_field=None, duration_field='duration')
+    assert index.conflicts(appointments) == {}
+
+
+def test_same_seed_same_practice():
+    assert list(practice(50, seed=3)) == list(practice(50, seed=3))
+    assert list(practice(50, seed=3)) != list(practice(50, seed=4))
+
+
+def test_existing_data_needs_force(data_file):
+    write_orthodontics(data_file, 20)
+    with pytest.raises(FileExistsError):
+        write_orthodontics(data_file, 20, seed=2)
+    with pytest.raises(FileExistsError):
+        write_scheduler(data_file, 20)
+
+
+def test_force_keeps_previous_data_and_journal(data_file):
+    write_orthodontics(data_file, 20)
+    store = JsonStore(data_file)
+    store.put('patients', [('mine', {'patient_id': 'mine'})])
+    before = store.load()
+
+    write_orthodontics(data_file, 20, seed=2, force=True)
+
+    with open(data_file + '.1') as f:
+        assert json.load(f) == before
+    assert not os.path.exists(store.journal.path)
+    assert 'mine' not in JsonStore(data_file).load()['patients']
+
+
+def test_db_output_is_sqlite(tmp_path):
+    db_file = str(tmp_path / 'big.db')
+    counts = write_orthodontics(db_file, 20)
+    write_orthodontics(db_file, 20, seed=2, force=True)
+
+    for path in (db_file, db_file + '.1'):
+        with sqlite3.connect(path) as conn:
+            assert conn.execute('SELECT COUNT(*) FROM patients').fetchone()[0] == counts['patients']
@@ -0,0 +1,94 @@
+"""Patient search index, and keeping indexes consistent when one rejects a record"""
+
+import pytest
+
+from orthodontics_app import OrthodonticsDataManager
+from search_index import PatientSearchIndex, tokenize
+from storage import JsonStore
+from test_records import patient
+
+
+def search_index():
+    return PatientSearchIndex(('first_name', 'last_name', 'email'), ('phone',))
+
+
+def test_prefix_and_phone_digit_matches():
+    index = search_index()
+    index.add('p1', patient('p1', phone='(555) 123-4567'))
+    index.add('p2', patient('p2', first_name='Adam', phone='555-9999'))
+
+    assert index.search('ada lov') == (2, ['p1', 'p2'])
+    assert index.search('adam') == (1, ['p2'])
+    assert index.search('123-45') == (1, ['p1'])
+    index.remove('p2')
+    assert index.search('adam') == (0, [])
+
+
+def test_non_string_values_are_indexed_as_text():
+    assert tokenize(42) == ['42']
+    index = search_index()
+    index.add('p1', patient(phone=5551234567, last_name=1984))
+
+    assert index.search('1984') == (1, ['p1'])
+    assert index.search('1234') == (1, ['p1'])
+
+
+class Rejects:
+    """An index that fails on add, like one given a value it cannot handle"""
+
+    def add(self, record_id, record):
+        raise TypeError('rejected')
+
+    def remove(self, record_id):
+        pass
+
+    def rebuild(self, records):
+        pass
+
+
+@pytest.fixture
+def manager(data_file):
+    return OrthodonticsDataManager(store=JsonStore(data_file))
+
+
+def test_rejected_record_is_neither_stored_nor_half_indexed(manager, data_file):
+    manager.save_record('patients', 'p1', patient('p1'))
+    manager.indexes['patients']['rejects'] = Rejects()
+
+    with pytest.raises(TypeError):
+        manager.save_record('patients', 'p2', patient('p2'))
+    with pytest.raises(TypeError):
+        manager.save_record('patients', 'p1', patient('p1', last_name='Byron'))
+
+    assert manager.patients == {'p1': patient('p1')}
+    assert manager.indexes['patients']['by_name'].count() == 1
+    assert manager.search_patients('byron') == (0, [])
+    assert manager.search_patients('lovelace')[0] == 1
+    assert set(OrthodonticsDataManager(store=JsonStore(data_file)).patients) == {'p1'}
+
+
+def test_failed_write_is_undone_in_memory(manager, monkeypatch):
+    manager.save_record('patients', 'p1', patient('p1'))
+
+    def fail(changes, sync=False):
+        raise OSError('disk full')
+    monkeypatch.setattr(manager.store, 'write', fail)
+
+    assert not manager.save_record('patients', 'p2', patient('p2'))
+    assert not manager.delete_record('patients', 'p1')
+    assert set(manager.patients) == {'p1'}
+    assert manager.indexes['patients']['by_name'].count() == 1
+
+
+def test_patients_page_can_be_refilled_from_the_search_api(client):
+    added = client.post('/api/patients', json={
+        'first_name': 'Zelda', 'last_name': 'Quillfeather', 'date_of_birth': '2012-01-01',
+        'phone': '555-0199'}).get_json()['patient']
+    page = client.get('/patients?search=nobody-by-this-name').get_data(as_text=True)
+    # The table stays in the page, hidden, for the live search to fill
+    assert 'id="patientsTableBody"' in page and 'id="noPatients"' in page
+
+    result = client.get('/api/patients/search?q=quillf&limit=50').get_json()
+    assert [p['patient_id'] for p in result['patients']] == [added['patient_id']]
+    assert result['total'] == 1
+    assert client.get('/api/patients?limit=1').get_json()['total'] >= 1
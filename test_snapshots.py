@@ -0,0 +1,101 @@
+"""Snapshot files: rotated generations, fallback when damaged, and cached record encoding"""
+
+import json
+
+from snapshots import FragmentCache, generation_paths, load_newest, read_json_object, write_atomic
+from test_records import appointment, patient
+
+
+def write_json(path, data, keep=3):
+    write_atomic(path, lambda f: json.dump(data, f), keep=keep)
+
+
+def test_each_write_keeps_the_previous_generations(tmp_path):
+    path = str(tmp_path / 'data.json')
+    for version in range(5):
+        write_json(path, {'version': version})
+    versions = []
+    for candidate in generation_paths(path, keep=3):
+        with open(candidate) as f:
+            versions.append(json.load(f)['version'])
+    assert versions == [4, 3, 2, 1]
+    assert not (tmp_path / 'data.json.4').exists()
+    assert not (tmp_path / 'data.json.tmp').exists()
+
+
+def test_damaged_live_file_falls_back_to_the_newest_good_generation(tmp_path, capsys):
+    path = str(tmp_path / 'data.json')
+    for version in range(3):
+        write_json(path, {'version': version})
+    with open(path, 'w') as f:
+        f.write('{"version": 2, "patie')  # torn write
+    with open(path + '.1', 'w') as f:
+        f.write('[]')  # parses, but is not a snapshot
+
+    data, source = load_newest(path, read_json_object)
+    assert data == {'version': 0} and source == path + '.2'
+    assert 'Load error' in capsys.readouterr().out
+
+
+def test_missing_or_unreadable_snapshots_load_nothing(tmp_path):
+    path = str(tmp_path / 'data.json')
+    assert load_newest(path, read_json_object) == (None, None)  # new install
+
+    with open(path, 'w') as f:
+        f.write('')
+    assert load_newest(path, read_json_object) == (None, None)
+
+
+def encode(cache, data, extra=None):
+    items = {name: list(records.items()) for name, records in data.items()}
+    return cache.encode(items, cache.take_dirty(), extra)[1]
+
+
+def expected(data, extra=None):
+    as_dicts = {name: {rid: r if isinstance(r, dict) else r.to_dict() for rid, r in records.items()}
+                for name, records in data.items()}
+    return json.dumps(dict(as_dicts, **(extra or {})), indent=2)
+
+
+def test_fragments_match_json_dumps_through_puts_and_deletes():
+    cache = FragmentCache()
+    data = {'patients': {f'p{n}': patient(f'p{n}', allergies=['latex'] if n % 2 else '')
+                         for n in range(4)},
+            'appointments': {'a1': appointment('a1', notes='"quoted" \u00e9')},
+            'outcomes': {}}
+    extra = {'next_id': 7, 'settings': {'open': '08:00'}}
+    assert encode(cache, data, extra) == expected(data, extra)
+
+    data['patients']['p1'] = patient('p1', first_name='Changed')
+    cache.invalidate('patients', 'p1')
+    data['patients']['p9'] = patient('p9')
+    cache.invalidate('patients', 'p9')
+    del data['patients']['p2']
+    cache.invalidate('patients', 'p2')
+    assert encode(cache, data, extra) == expected(data, extra)
+
+    del data['appointments']['a1']
+    cache.invalidate('appointments', 'a1')
+    data['outcomes']['o1'] = {'outcome_id': 'o1', 'ratings': [1, 2]}
+    cache.invalidate('outcomes', 'o1')
+    assert encode(cache, data) == expected(data)
+
+
+def test_unchanged_records_are_not_re_encoded():
+    cache = FragmentCache()
+    data = {'patients': {'p1': patient('p1'), 'p2': patient('p2')}}
+    encode(cache, data)
+    # A change nobody invalidated is not picked up: the cached text is reused
+    data['patients']['p2'] = patient('p2', first_name='Unseen')
+    data['patients']['p1'] = patient('p1', first_name='Seen')
+    cache.invalidate('patients', 'p1')
+    text = encode(cache, data)
+    assert '"Seen"' in text and '"Unseen"' not in text
+
+    cache.clear()  # the data set was replaced: everything is encoded again
+    assert encode(cache, data) == expected(data)
+
+
+def test_empty_data_encodes_like_json_dumps():
+    assert FragmentCache().encode({}, ({}, True)) == ({}, '{}')
+    assert encode(FragmentCache(), {'patients': {}}) == expected({'patients': {}})
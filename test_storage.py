@@ -0,0 +1,207 @@
+"""Store round trips on both backends, the SQLite change log and the binary snapshot"""
+
+import os
+import pickle
+import threading
+
+import pytest
+
+from storage import JsonStore, SqliteStore, migrate, open_store
+
+
+def patient_row(number):
+    return (f'p{number}', {'patient_id': f'p{number}', 'created_date': '2025-01-01',
+                           'first_name': f'Patient {number}'})
+
+
+def change_count(store):
+    return store.conn.execute('SELECT COUNT(*) FROM changes').fetchone()[0]
+
+
+def appointment_row(number, patient_id, date):
+    return (f'a{number}', {'appointment_id': f'a{number}', 'patient_id': patient_id,
+                           'date': date, 'status': 'Scheduled', 'appointment_type': 'Adjustment'})
+
+
+@pytest.fixture(params=['orthodontics_data.json', 'orthodontics.db'])
+def store_location(request, tmp_path):
+    """A JSON and an SQLite location; open_store picks the backend"""
+    return str(tmp_path / request.param)
+
+
+def reopened(location):
+    store = open_store(location)
+    with store.lock():
+        data = store.load()
+    store.close()
+    return data
+
+
+def test_put_delete_and_write_round_trip(store_location):
+    store = open_store(store_location)
+    with store.lock():
+        store.load()
+        store.put('patients', [patient_row(1), patient_row(2)])
+        store.put('appointments', [appointment_row(1, 'p1', '2025-03-04')])
+        store.delete('patients', 'p2')
+        store.write([('put', 'patients', *patient_row(3)), ('delete', 'appointments', 'a1', None)])
+    store.close()
+
+    data = reopened(store_location)
+    assert data['patients'] == dict([patient_row(1), patient_row(3)])
+    assert data['appointments'] == {}
+
+
+def test_checkpoint_round_trip(store_location):
+    store = open_store(store_location)
+    with store.lock():
+        store.load()
+        store.put('patients', [patient_row(number) for number in range(20)])
+    if store.begin_checkpoint():
+        with store.lock():
+            data = store.load()
+        store.write_checkpoint(data)
+    store.end_checkpoint()
+    store.close()
+
+    assert reopened(store_location)['patients'] == dict(patient_row(n) for n in range(20))
+
+
+def test_other_process_sees_changes(store_location):
+    writer, reader = open_store(store_location), open_store(store_location)
+    with reader.lock():
+        reader.load()
+    with writer.lock():
+        writer.load()
+        writer.put('patients', [patient_row(1)])
+        writer.delete('patients', 'p0')
+
+    assert reader.has_changes()
+    with reader.lock():
+        full, changes = reader.changes()
+    if full is None:
+        assert ('put', 'patients', *patient_row(1)) in changes
+        assert ('delete', 'patients', 'p0', None) in changes
+    else:
+        assert full['patients'] == dict([patient_row(1)])
+    writer.close()
+    reader.close()
+
+
+def test_scan_filters_by_patient_and_date(store_location):
+    store = open_store(store_location)
+    with store.lock():
+        store.load()
+        store.put('appointments', [appointment_row(1, 'p1', '2025-03-04'),
+                                   appointment_row(2, 'p1', '2025-05-01'),
+                                   appointment_row(3, 'p2', '2025-03-05')])
+
+    found = store.scan('appointments', patient_id='p1', start='2025-03-01', before='2025-04-01')
+    assert [record_id for record_id, _ in found] == ['a1']
+    assert sorted(rid for rid, _ in store.scan('appointments', start='2025-03-01')) == ['a1', 'a2', 'a3']
+    store.close()
+
+
+def test_sqlite_loads_one_patient(tmp_path):
+    store = SqliteStore(str(tmp_path / 'ortho.db'))
+    with store.lock():
+        store.put('appointments', [appointment_row(1, 'p1', '2025-03-04'),
+                                   appointment_row(2, 'p2', '2025-03-05')])
+    assert list(store.load_patient('appointments', 'p1')) == ['a1']
+    store.close()
+
+
+def test_migrate_copies_every_record(data_file, tmp_path):
+    source = JsonStore(data_file)
+    source.write([('put', 'patients', *patient_row(n)) for n in range(5)])
+    target = str(tmp_path / 'ortho.db')
+
+    migrate(data_file, target)
+    assert reopened(target)['patients'] == dict(patient_row(n) for n in range(5))
+
+
+def test_sqlite_change_log_stays_bounded(tmp_path):
+    store = SqliteStore(str(tmp_path / 'ortho.db'))
+    store.keep_changes, store.trim_every = 50, 20
+    with store.lock():
+        store.load()
+    for number in range(500):
+        with store.lock():
+            store.write([('put', 'patients', *patient_row(number))])
+        if store.needs_checkpoint():
+            assert not store.begin_checkpoint()  # no snapshot to write
+            store.end_checkpoint()
+        assert change_count(store) <= store.keep_changes + store.trim_every
+    assert len(store.load()['patients']) == 500
+    store.close()
+
+
+def test_process_behind_the_trimmed_log_reloads(tmp_path):
+    path = str(tmp_path / 'ortho.db')
+    writer, reader = SqliteStore(path), SqliteStore(path)
+    writer.keep_changes, writer.trim_every = 5, 5
+    with reader.lock():
+        reader.load()
+    for number in range(30):
+        with writer.lock():
+            writer.write([('put', 'patients', *patient_row(number))])
+        if writer.needs_checkpoint():
+            writer.begin_checkpoint()
+
+    with reader.lock():
+        full, changes = reader.changes()
+    assert changes == [] and len(full['patients']) == 30
+    writer.close()
+    reader.close()
+
+
+def test_sqlite_change_check_ignores_own_writes_and_runs_beside_them(tmp_path):
+    path = str(tmp_path / 'ortho.db')
+    store, other = SqliteStore(path), SqliteStore(path)
+    with store.lock():
+        store.load()
+        store.write([('put', 'patients', *patient_row(1))])
+    assert not store.has_changes()
+
+    with other.lock():
+        other.load()
+        other.write([('put', 'patients', *patient_row(2))])
+    assert store.has_changes()
+    assert store.has_changes()  # still pending until changes() catches up
+    with store.lock():
+        store.changes()
+    assert not store.has_changes()
+
+    # A request thread polls while the write-behind thread commits
+    writer = threading.Thread(target=lambda: [
+        store.write([('put', 'patients', *patient_row(n))]) for n in range(3, 200)])
+    writer.start()
+    while writer.is_alive():
+        store.has_changes()
+    writer.join()
+    assert not store.has_changes()
+    store.close()
+    other.close()
+
+
+class MakesDirectory:
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        return os.mkdir, (self.path,)
+
+
+def test_binary_snapshot_never_runs_code(data_file, tmp_path):
+    data = {'patients': dict([patient_row(1)])}
+    JsonStore(data_file).write_checkpoint(data)
+    store = JsonStore(data_file)
+    assert store.load()['patients'] == data['patients']
+    assert store._read_binary() == data  # the fast path is in use
+
+    # Someone swaps in a pickle that would run code when unpickled
+    marker = str(tmp_path / 'pwned')
+    with open(store.binary_file, 'wb') as f:
+        pickle.dump(MakesDirectory(marker), f)
+    assert JsonStore(data_file).load()['patients'] == data['patients']
+    assert not os.path.exists(marker)
@@ -0,0 +1,71 @@
+"""Write-behind saves: coalescing, durability and the cross-process booking check"""
+
+import signal
+
+import pytest
+
+import write_behind
+from availability import SchedulingConflict
+from orthodontics_app import OrthodonticsDataManager
+from storage import JsonStore
+from test_records import appointment, patient
+
+
+@pytest.fixture
+def open_manager(data_file):
+    """Open managers on one data file, each with its own store as in separate workers"""
+    managers = []
+
+    def open_manager(write_delay=10):
+        manager = OrthodonticsDataManager(store=JsonStore(data_file), write_delay=write_delay)
+        managers.append(manager)
+        return manager
+    yield open_manager
+    for manager in managers:
+        manager.close()
+
+
+def test_changes_are_queued_until_flushed(open_manager, data_file):
+    manager = open_manager()
+    manager.save_record('patients', 'p1', patient())
+    assert len(manager._pending) == 1
+    assert 'p1' not in OrthodonticsDataManager(store=JsonStore(data_file)).patients
+
+    assert manager.flush()
+    assert 'p1' in OrthodonticsDataManager(store=JsonStore(data_file)).patients
+
+
+def test_durable_change_is_written_before_returning(open_manager, data_file):
+    manager = open_manager()
+    manager.save_record('patients', 'p1', patient())
+    manager.save_record('patients', 'p2', patient('p2'), durable=True)
+    assert manager._pending == []
+    assert set(OrthodonticsDataManager(store=JsonStore(data_file)).patients) == {'p1', 'p2'}
+
+
+def test_appointments_are_checked_against_other_workers(open_manager):
+    first, second = open_manager(), open_manager()
+    first.save_record('appointments', 'a1', appointment())
+    assert first._pending == []
+
+    with pytest.raises(SchedulingConflict):
+        second.save_record('appointments', 'a2', appointment('a2', time='09:15'))
+    assert 'a2' not in first.appointments
+
+
+def test_sigterm_handler_is_installed_only_on_request(open_manager):
+    previous = signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    try:
+        open_manager()
+        assert signal.getsignal(signal.SIGTERM) == signal.SIG_DFL
+
+        write_behind.install_signal_handlers()
+        handler = signal.getsignal(signal.SIGTERM)
+        with pytest.raises(SystemExit):
+            handler(signal.SIGTERM, None)
+
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)  # e.g. a server's own handler
+        write_behind.install_signal_handlers()
+        assert signal.getsignal(signal.SIGTERM) == signal.SIG_IGN
+    finally:
+        signal.signal(signal.SIGTERM, previous)
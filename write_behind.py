@@ -0,0 +1,123 @@
+"""
+Write-behind persistence shared by both Flask apps.
+
+A data manager applies each mutation in memory, queues what has to reach
+disk, and calls WriteBehind.request().  A background thread waits up to
+max_delay for the rest of the burst and then calls the manager's flush
+once, so a run of API calls costs one write instead of one per call and
+no response waits for the disk.
+
+A request sent with ?durable=1 or the header "X-Durable: 1" is written
+(and fsynced) before its response instead; the write also covers every
+change queued before it.  A failed background flush is printed and
+retried.  Queued changes are flushed when the process exits normally
+(atexit); an app run as a script calls install_signal_handlers() so a
+plain SIGTERM is a normal exit too.  A crash or SIGKILL loses at most
+max_delay of acknowledged changes.
+Set ORTHO_WRITE_DELAY_MS=0 to write every change before its response.
+"""
+
+import atexit
+import os
+import signal
+import threading
+
+from flask import has_request_context, request
+
+# Pause after a failed flush before trying again
+RETRY_DELAY = 1.0
+
+
+def write_delay():
+    """Return the configured max delay in seconds, or None for synchronous writes"""
+    delay = float(os.environ.get('ORTHO_WRITE_DELAY_MS', 50)) / 1000
+    return delay if delay > 0 else None
+
+
+def _exit_on_sigterm(signum, frame):
+    raise SystemExit(128 + signum)
+
+
+def install_signal_handlers():
+    """Turn a plain SIGTERM into a normal exit, so atexit flushes queued writes.
+
+    Call it from a script's main thread.  A handler something else
+    installed, such as a server's graceful shutdown, is left alone.
+    """
+    if signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+        signal.signal(signal.SIGTERM, _exit_on_sigterm)
+
+
+def durable_requested():
+    """True if the current request asked to be on disk before its response"""
+    if not has_request_context():
+        return False
+    return (request.args.get('durable') in ('1', 'true')
+            or request.headers.get('X-Durable') in ('1', 'true'))
+
+
+class WriteBehind:
+    """Background thread that coalesces flush requests.
+
+    flush() must write everything queued so far and return True on
+    success; it runs on the background thread, at most max_delay seconds
+    after the first request of a burst.
+    """
+
+    def __init__(self, flush, max_delay=0.05, name='write-behind'):
+        self._flush = flush
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._requested = 0  # requests made so far
+        self._flushed = 0  # requests covered by a successful flush
+        self._closed = False
+        self.flushes = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def pending(self):
+        """Requests not yet covered by a successful flush"""
+        return self._requested - self._flushed
+
+    def request(self):
+        """Schedule a flush of everything queued so far"""
+        with self._cond:
+            self._requested += 1
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._requested > self._flushed or self._closed)
+                if self._requested == self._flushed:
+                    return  # closed with nothing left to write
+                if not self._closed:
+                    # Let the rest of the burst queue up behind the first change
+                    self._cond.wait_for(lambda: self._closed, self.max_delay)
+                target = self._requested
+            try:
+                ok = self._flush()
+            except Exception as e:
+                print(f"Save error: {e}")
+                ok = False
+            with self._cond:
+                if ok:
+                    self._flushed = max(self._flushed, target)
+                    self.flushes += 1
+                    self._cond.notify_all()
+                    continue
+                self.errors += 1
+                if self._closed:
+                    return
+                self._cond.wait_for(lambda: self._closed, RETRY_DELAY)
+
+    def close(self, timeout=10):
+        """Flush what is queued and stop the thread; safe to call twice"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        atexit.unregister(self.close)